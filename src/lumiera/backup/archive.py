@@ -0,0 +1,76 @@
+# src/lumiera/backup/archive.py
+"""
+Tarball writer for `"mode": "archive"` backup jobs.
+"""
+
+import hashlib
+import os
+import stat
+import tarfile
+from pathlib import Path
+
+from lumiera.backup.codecs import Codec, is_incompressible
+from lumiera.backup.members import member_record, write_members
+from lumiera.backup.parallel import BlockWriter
+from lumiera.backup.sources import walk_sources
+
+
+class _HashingReader:
+    """File wrapper that feeds everything tar reads from it into a SHA256."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fp.read(size)
+        self.hash.update(data)
+        return data
+
+
+def write_archive(archive_path: Path, sources: list[Path], codec: Codec, level: int, jobs: int = 1,
+                  include: set[str] | None = None, index_path: Path | None = None) -> dict:
+    """
+    Write sources into archive_path as a tar compressed with codec, in the same member
+    order tar.add() uses. Already-compressed files go into blocks at the codec's store_level.
+    With include, only regular files whose arcname is in it are written (directories and
+    symlinks always are). With index_path, a member index (see lumiera.backup.members)
+    is written alongside, with the SHA256 of every regular member. The archive appears
+    atomically once complete. Returns byte/member counts.
+    """
+    tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+    store = codec.compressor(codec.store_level) if codec.store_level != level else None
+    members = []
+    try:
+        with open(tmp_path, 'wb') as raw, \
+                BlockWriter(raw, codec.compressor(level), jobs=jobs, store=store) as writer:
+            with tarfile.open(fileobj=writer, mode="w") as tar:
+                for path, arcname, st in walk_sources(sources):
+                    if include is not None and stat.S_ISREG(st.st_mode) and arcname not in include:
+                        continue
+                    tarinfo = tar.gettarinfo(str(path), arcname=arcname)
+                    if tarinfo is None:
+                        # sockets and the like, tar.add() skips them too
+                        continue
+                    offset = writer.tell()
+                    digest = None
+                    if stat.S_ISREG(st.st_mode) and tarinfo.isreg():
+                        writer.set_store(is_incompressible(path, st.st_size))
+                        with open(path, 'rb') as f:
+                            reader = _HashingReader(f)
+                            tar.addfile(tarinfo, reader)
+                        digest = reader.hash.hexdigest()
+                    else:
+                        tar.addfile(tarinfo)
+                    record = member_record(tarinfo, offset, writer.tell())
+                    if digest is not None:
+                        record["sha256"] = digest
+                    members.append(record)
+                writer.set_store(False)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, archive_path)
+    if index_path is not None:
+        write_members(index_path, codec.name, writer.blocks, members)
+    return {"members": len(members), "bytes_read": writer.bytes_in, "bytes_written": writer.bytes_out}
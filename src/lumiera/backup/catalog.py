@@ -0,0 +1,123 @@
+# src/lumiera/backup/catalog.py
+"""
+Append-only version catalog, one per destination (`<destination>/.catalog.jsonl`).
+
+Each line is an event: {"op": "add", "job", "version", "file", "kind", "created", "bytes", ...}
+or {"op": "remove", "job", "version"}. Replaying the file gives the live versions of every
+job without listing the destination directory. Backups also record "source_hash",
+"files", "bytes_read", "bytes_written", "duration" and "compression" on their add events.
+"""
+
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+CATALOG_NAME = ".catalog.jsonl"
+
+_VERSION_FILE = re.compile(r"^(?P<job>.+)-(?P<version>\d+)\.(?P<ext>tar(?:\.(?:gz|bz2|xz|zst))?|manifest\.json)$")
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def sidecars(dest: Path, job_name: str, version: int) -> list[Path]:
+    """Files that belong to a version besides the archive/manifest itself."""
+    return [dest / f"{job_name}-{version}.meta.json", dest / f"{job_name}-{version}.members.json"]
+
+
+class Catalog:
+    def __init__(self, dest: Path):
+        self.dest = dest
+        self.path = dest / CATALOG_NAME
+        self._versions: dict[str, dict[int, dict]] = {}
+        # highest version ever added per job, so pruned numbers are never reused
+        self._last: dict[str, int] = {}
+        if self.path.exists():
+            self._load()
+        else:
+            self._bootstrap()
+
+    def _load(self) -> None:
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # a torn last line from a crash mid-append
+                    continue
+                self._apply(event)
+
+    def _apply(self, event: dict) -> None:
+        versions = self._versions.setdefault(event["job"], {})
+        if event.get("op") == "remove":
+            versions.pop(event["version"], None)
+        else:
+            record = {k: v for k, v in event.items() if k != "op"}
+            versions[event["version"]] = record
+            self._last[event["job"]] = max(self._last.get(event["job"], 0), event["version"])
+
+    def _bootstrap(self) -> None:
+        """Seed a missing catalog from the version files already in the destination."""
+        found = []
+        for f in self.dest.iterdir() if self.dest.exists() else []:
+            m = _VERSION_FILE.match(f.name)
+            if not m:
+                continue
+            job, version = m.group("job"), int(m.group("version"))
+            st = f.stat()
+            size = st.st_size + sum(p.stat().st_size for p in sidecars(self.dest, job, version) if p.exists())
+            kind = "chunked" if m.group("ext") == "manifest.json" else "full"
+            meta = self.dest / f"{job}-{version}.meta.json"
+            if kind == "full" and meta.exists():
+                with open(meta, 'r') as mf:
+                    kind = json.load(mf).get("kind", "full")
+            found.append({
+                "op": "add", "job": job, "version": version, "file": f.name, "kind": kind,
+                "created": datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat(timespec="seconds"),
+                "bytes": size,
+            })
+        found.sort(key=lambda e: (e["job"], e["version"]))
+        for event in found:
+            self._apply(event)
+        self._append(found)
+
+    def _append(self, events: list[dict]) -> None:
+        self.dest.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def versions(self, job_name: str) -> list[dict]:
+        """Live version records of a job, oldest first."""
+        return [v for _, v in sorted(self._versions.get(job_name, {}).items())]
+
+    def get(self, job_name: str, version: int) -> dict | None:
+        return self._versions.get(job_name, {}).get(version)
+
+    def latest(self, job_name: str) -> dict | None:
+        versions = self._versions.get(job_name)
+        return versions[max(versions)] if versions else None
+
+    def next_version(self, job_name: str) -> int:
+        return self._last.get(job_name, 0) + 1
+
+    def jobs(self) -> list[str]:
+        return sorted(job for job, versions in self._versions.items() if versions)
+
+    def add(self, record: dict) -> None:
+        event = {"op": "add", **record}
+        self._apply(event)
+        self._append([event])
+
+    def remove(self, job_name: str, version: int) -> None:
+        event = {"op": "remove", "job": job_name, "version": version}
+        self._apply(event)
+        self._append([event])
@@ -0,0 +1,261 @@
+# src/lumiera/backup/chunks.py
+"""
+Content-addressed chunk store used by `"mode": "chunked"` backup jobs.
+
+Files are split at content-defined boundaries (a rolling sum of per-byte gear
+values over a 64-byte window, with FastCDC-style normalized masks) so that an
+edit only changes the chunks around it. Every unique chunk is stored once under
+`<destination>/chunks` and each version is a small JSON manifest listing the chunks
+of every file.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from lumiera.backup.sources import clear_for_link, match_any, safe_target, walk_sources
+
+MIN_CHUNK = 256 * 1024
+AVG_CHUNK = 1024 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+
+WINDOW = 64
+
+_M64 = (1 << 64) - 1
+# 256 fixed pseudo-random 64-bit values; must never change or every chunk boundary moves
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'big') for i in range(256)]
+
+try:
+    import numpy as np
+    _GEAR_NP = np.array(GEAR, dtype=np.uint64)
+except ImportError:  # pragma: no cover - numpy ships with pandas, but stay usable without it
+    np = None
+
+
+def _mask(bits: int) -> int:
+    # test the high bits of the 64-bit window sum
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+# normalized chunking: harder to cut before the average size, easier after it
+_AVG_BITS = AVG_CHUNK.bit_length() - 1
+MASK_S = _mask(_AVG_BITS + 2)
+MASK_L = _mask(_AVG_BITS - 2)
+
+
+def find_cut(buf, min_size: int = MIN_CHUNK, avg_size: int = AVG_CHUNK, max_size: int = MAX_CHUNK) -> int:
+    """
+    Return the length of the first chunk in buf: one past the first position i >= min_size
+    whose window hash (sum of GEAR over buf[i-63:i+1], mod 2**64) has its mask bits clear.
+    """
+    n = len(buf)
+    if n <= min_size:
+        return n
+    end = min(n, max_size)
+    normal = min(end, avg_size)
+    if np is not None:
+        return _find_cut_np(buf, min_size, normal, end)
+
+    gear = GEAR
+    h = sum(gear[b] for b in buf[min_size - WINDOW:min_size])
+    for i in range(min_size, end):
+        h = (h + gear[buf[i]] - gear[buf[i - WINDOW]]) & _M64
+        if not h & (MASK_S if i < normal else MASK_L):
+            return i + 1
+    return end
+
+
+def _window_hashes(buf, lo: int, hi: int):
+    # window hashes for positions lo..hi-1, vectorised: differences of a wrapping uint64 prefix sum
+    data = np.frombuffer(buf, dtype=np.uint8, count=hi - lo + WINDOW, offset=lo - WINDOW)
+    csum = np.cumsum(_GEAR_NP[data], dtype=np.uint64)
+    return csum[WINDOW:] - csum[:-WINDOW]
+
+
+def _find_cut_np(buf, min_size: int, normal: int, end: int) -> int:
+    # same boundaries as the pure-Python loop; the region past `normal` is only hashed when needed
+    for lo, hi, mask in ((min_size, normal, MASK_S), (normal, end, MASK_L)):
+        if lo >= hi:
+            continue
+        hits = np.flatnonzero((_window_hashes(buf, lo, hi) & np.uint64(mask)) == 0)
+        if hits.size:
+            return lo + int(hits[0]) + 1
+    return end
+
+
+def iter_chunks(fp: BinaryIO, max_size: int = MAX_CHUNK) -> Iterator[bytes]:
+    """Split a binary stream into content-defined chunks."""
+    buf = bytearray()
+    eof = False
+    while True:
+        while not eof and len(buf) < max_size:
+            data = fp.read(max_size)
+            if not data:
+                eof = True
+            buf += data
+        if not buf:
+            return
+        cut = find_cut(buf, max_size=max_size)
+        yield bytes(buf[:cut])
+        del buf[:cut]
+
+
+class ChunkStore:
+    """Chunks stored as `<root>/<aa>/<sha256>`, zlib-compressed when that helps."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._known: set[str] = set()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        """
+        Whether the chunk is stored. A stored chunk's mtime is refreshed the first time
+        it is seen, so a prune running meanwhile treats it as new and leaves it alone.
+        """
+        if digest in self._known:
+            return True
+        try:
+            os.utime(self.path_for(digest))
+        except FileNotFoundError:
+            return False
+        self._known.add(digest)
+        return True
+
+    def put(self, data: bytes) -> tuple[str, int]:
+        """Store data if new. Returns (digest, bytes written to disk)."""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.has(digest):
+            return digest, 0
+        packed = zlib.compress(data, 6)
+        blob = b"z" + packed if len(packed) < len(data) else b"r" + data
+        path = self.path_for(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, path)
+        self._known.add(digest)
+        return digest, len(blob)
+
+    def get(self, digest: str) -> bytes:
+        blob = self.path_for(digest).read_bytes()
+        data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupted")
+        return data
+
+
+def manifest_name(job_name: str, version: int) -> str:
+    return f"{job_name}-{version}.manifest.json"
+
+
+def read_manifest(path: Path) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def backup_chunked(sources: list[Path], dest: Path, job_name: str, version: int,
+                   previous: Path | None = None) -> tuple[Path, dict]:
+    """
+    Write a manifest for `version`, storing only chunks not already in the store.
+    Files whose size and mtime match the previous manifest reuse its chunk list unread,
+    as long as all of those chunks are still in the store.
+    Returns (manifest path, stats).
+    """
+    store = ChunkStore(dest / "chunks")
+    prev_files = {}
+    if previous is not None:
+        for entry in read_manifest(previous).get("entries", []):
+            if entry["type"] == "file":
+                prev_files[entry["path"]] = entry
+
+    stats = {"files": 0, "bytes_read": 0, "chunks_new": 0, "bytes_written": 0}
+    entries = []
+    for path, arcname, st in walk_sources(sources):
+        entry = {"path": arcname, "mode": stat.S_IMODE(st.st_mode), "mtime_ns": st.st_mtime_ns}
+        if stat.S_ISDIR(st.st_mode):
+            entry["type"] = "dir"
+        elif stat.S_ISLNK(st.st_mode):
+            entry["type"] = "symlink"
+            entry["target"] = os.readlink(path)
+        elif stat.S_ISREG(st.st_mode):
+            entry["type"] = "file"
+            entry["size"] = st.st_size
+            prev = prev_files.get(arcname)
+            if (prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns
+                    and all(store.has(digest) for digest in prev["chunks"])):
+                entry["chunks"] = prev["chunks"]
+            else:
+                chunks = []
+                with open(path, 'rb') as fp:
+                    for data in iter_chunks(fp):
+                        digest, written = store.put(data)
+                        chunks.append(digest)
+                        stats["bytes_read"] += len(data)
+                        if written:
+                            stats["chunks_new"] += 1
+                            stats["bytes_written"] += written
+                entry["chunks"] = chunks
+            stats["files"] += 1
+        else:
+            # sockets, fifos, devices: nothing sensible to back up
+            continue
+        entries.append(entry)
+
+    manifest = {
+        "job": job_name,
+        "version": version,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "entries": entries,
+    }
+    manifest_path = dest / manifest_name(job_name, version)
+    write_manifest(manifest_path, manifest)
+    return manifest_path, stats
+
+
+def restore_chunked(manifest_path: Path, target: Path, patterns: list[str] | None = None) -> int:
+    """
+    Rebuild the entries of a manifest under target, only those matching patterns if given.
+    Returns the number of files written.
+    """
+    store = ChunkStore(manifest_path.parent / "chunks")
+    manifest = read_manifest(manifest_path)
+    entries = [e for e in manifest.get("entries", []) if match_any(e["path"], patterns)]
+    count = 0
+    for entry in entries:
+        out = safe_target(target, entry["path"])
+        if entry["type"] == "dir":
+            out.mkdir(parents=True, exist_ok=True)
+        elif entry["type"] == "symlink":
+            out.parent.mkdir(parents=True, exist_ok=True)
+            clear_for_link(out)
+            os.symlink(entry["target"], out)
+        elif entry["type"] == "file":
+            out.parent.mkdir(parents=True, exist_ok=True)
+            with open(out, 'wb') as fp:
+                for digest in entry["chunks"]:
+                    fp.write(store.get(digest))
+            os.chmod(out, entry["mode"])
+            os.utime(out, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            count += 1
+    # directory permissions/mtimes last, children are written by now
+    for entry in reversed(entries):
+        if entry["type"] == "dir":
+            out = safe_target(target, entry["path"])
+            os.chmod(out, entry["mode"])
+            os.utime(out, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+    return count
@@ -0,0 +1,132 @@
+# src/lumiera/backup/codecs.py
+"""
+Compression codecs for backup archives.
+
+Every codec compresses one block at a time into a self-contained member/stream/frame,
+so BlockWriter can compress blocks in parallel and the concatenation stays readable
+by the matching standard tool (tar xzf / xjf / xJf / --zstd).
+"""
+
+import bz2
+import gzip
+import lzma
+import tarfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+from lumiera.backup.parallel import gzip_member
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# already-compressed media and archives: their blocks go through the codec's cheapest level
+# (store_level), which really stores them for gz and is merely the fastest setting for bz2/xz/zstd
+INCOMPRESSIBLE_EXTS = {
+    '.exr', '.mp4', '.mov', '.m4v', '.mkv', '.avi', '.webm', '.mp3', '.m4a', '.aac', '.ogg', '.flac',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.avif',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.whl', '.jar',
+}
+
+# files smaller than this are compressed with their neighbours; switching to a cheap block
+# for a tiny file costs more in member headers than it saves
+STORE_MIN_SIZE = 64 * 1024
+
+
+class Codec:
+    def __init__(self, name: str, suffix: str, magic: bytes | None, levels: range, default_level: int,
+                 store_level: int, compress: Callable[[bytes, int], bytes], reader: Callable[[BinaryIO], BinaryIO]):
+        self.name = name
+        self.suffix = suffix
+        self.magic = magic
+        self.levels = levels
+        self.default_level = default_level
+        self.store_level = store_level
+        self._compress = compress
+        self._reader = reader
+
+    def compressor(self, level: int) -> Callable[[bytes], bytes]:
+        """Block compressor at the given level, suitable for BlockWriter."""
+        return lambda data: self._compress(data, level)
+
+    def reader(self, raw: BinaryIO) -> BinaryIO:
+        """Decompressing reader starting at raw's current position, which must be a block start."""
+        return self._reader(raw)
+
+
+def _zstd_compress(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_reader(raw: BinaryIO) -> BinaryIO:
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+
+
+CODECS = {
+    "none": Codec("none", ".tar", None, range(0, 1), 0, 0, lambda data, level: data, lambda raw: raw),
+    "gz": Codec("gz", ".tar.gz", b"\x1f\x8b", range(1, 10), 9, 0, lambda data, level: gzip_member(data, level),
+                lambda raw: gzip.GzipFile(fileobj=raw, mode='rb')),
+    "bz2": Codec("bz2", ".tar.bz2", b"BZh", range(1, 10), 9, 1, lambda data, level: bz2.compress(data, level),
+                 lambda raw: bz2.BZ2File(raw, 'rb')),
+    "xz": Codec("xz", ".tar.xz", b"\xfd7zXZ\x00", range(0, 10), 6, 0,
+                lambda data, level: lzma.compress(data, preset=level), lambda raw: lzma.LZMAFile(raw, 'rb')),
+}
+if zstandard is not None:
+    CODECS["zstd"] = Codec("zstd", ".tar.zst", b"\x28\xb5\x2f\xfd", range(1, 23), 3, 1, _zstd_compress, _zstd_reader)
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tar.bz2", ".tar.xz", ".tar.zst")
+
+
+def parse_compression(setting: str | None) -> tuple[Codec, int]:
+    """
+    Parse a job's `compression` setting: "gz", "gz:1", "xz:6", "zstd:19", "none" ...
+    Defaults to gz at level 9, which is what tarfile's "w:gz" used.
+    """
+    name, _, level = (setting or "gz").partition(":")
+    name = name.strip().lower()
+    if name == "zstd" and zstandard is None:
+        raise ValueError("zstd compression needs the 'zstandard' package")
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"Unknown compression '{name}' (choose from {', '.join(CODECS)})")
+    if not level:
+        return codec, codec.default_level
+    try:
+        lvl = int(level)
+    except ValueError:
+        raise ValueError(f"Invalid compression level '{level}'")
+    if lvl not in codec.levels:
+        raise ValueError(f"Level {lvl} out of range for {name} ({codec.levels.start}-{codec.levels.stop - 1})")
+    return codec, lvl
+
+
+def is_incompressible(path: Path, size: int) -> bool:
+    return size >= STORE_MIN_SIZE and path.suffix.lower() in INCOMPRESSIBLE_EXTS
+
+
+def detect_codec(path: Path) -> Codec:
+    """Identify an archive's codec from its magic bytes, whatever its file name says."""
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    for codec in CODECS.values():
+        if codec.magic and head.startswith(codec.magic):
+            return codec
+    if head.startswith(b"\x28\xb5\x2f\xfd"):
+        raise ValueError(f"{path.name} is zstd-compressed; install 'zstandard' to read it")
+    return CODECS["none"]
+
+
+@contextmanager
+def open_archive(path: Path) -> Iterator[tarfile.TarFile]:
+    """Open a backup archive for reading, detecting the codec from its contents."""
+    codec = detect_codec(path)
+    if codec.name == "zstd":
+        with open(path, 'rb') as raw:
+            with tarfile.open(fileobj=codec.reader(raw), mode="r|") as tar:
+                yield tar
+        return
+    mode = "r" if codec.name == "none" else f"r:{codec.name}"
+    with tarfile.open(path, mode) as tar:
+        yield tar
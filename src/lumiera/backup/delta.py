@@ -0,0 +1,75 @@
+# src/lumiera/backup/delta.py
+"""
+Incremental (delta) versions for `"mode": "archive"` jobs with `"full_every": N`.
+
+Every version gets a `{job}-{N}.meta.json` sidecar mapping each live file to the
+version whose archive holds its current content. A delta archive only carries
+files added or modified since the previous version (plus directories and symlinks,
+which cost a header each), and lists deleted paths as tombstones. Restoring
+version K therefore reads K's sidecar and pulls every file from exactly one archive.
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+def meta_path(dest: Path, job_name: str, version: int) -> Path:
+    return dest / f"{job_name}-{version}.meta.json"
+
+
+def read_meta(dest: Path, job_name: str, version: int) -> dict | None:
+    path = meta_path(dest, job_name, version)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_meta(dest: Path, job_name: str, meta: dict) -> None:
+    path = meta_path(dest, job_name, meta["version"])
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def plan_version(prev_meta: dict | None, entries: dict[str, dict], version: int,
+                 full_every: int) -> tuple[dict, set[str] | None]:
+    """
+    Decide whether `version` is a full snapshot or a delta against prev_meta.
+    entries is {arcname: {"digest": ...}} for every regular file now in the sources.
+    Returns (meta for the new version, arcnames to archive or None for everything).
+    """
+    chain = prev_meta["version"] - prev_meta["base"] + 1 if prev_meta else 0
+    if prev_meta is None or chain >= full_every:
+        files = {name: {"digest": e["digest"], "version": version} for name, e in entries.items()}
+        meta = {"version": version, "kind": "full", "base": version, "parent": None,
+                "files": files, "deleted": []}
+        return meta, None
+
+    prev_files = prev_meta["files"]
+    files = {}
+    changed = set()
+    for name, e in entries.items():
+        prev = prev_files.get(name)
+        if prev is not None and prev["digest"] == e["digest"]:
+            files[name] = prev
+        else:
+            files[name] = {"digest": e["digest"], "version": version}
+            changed.add(name)
+    deleted = sorted(set(prev_files) - set(entries))
+    meta = {"version": version, "kind": "delta", "base": prev_meta["base"], "parent": prev_meta["version"],
+            "files": files, "deleted": deleted}
+    return meta, changed
+
+
+def restore_plan(meta: dict) -> dict[int, set[str]]:
+    """
+    Group the files of a version by the archive that holds them: {version: {arcname, ...}}.
+    The version's own archive is always present (it carries directories and symlinks).
+    """
+    plan = {meta["version"]: set()}
+    for name, f in meta["files"].items():
+        plan.setdefault(f["version"], set()).add(name)
+    return plan
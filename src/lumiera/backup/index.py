@@ -0,0 +1,123 @@
+# src/lumiera/backup/index.py
+"""
+Per-job stat cache so change detection only re-reads files that actually changed.
+
+The index lives next to the `.{job}.hash` state file as `.{job}.index.json` and maps
+each archive name to its (size, mtime_ns, inode) and SHA256 digest.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from lumiera.backup.sources import walk_sources
+
+READ_SIZE = 1024 * 1024
+
+# files modified this close to the last index write may have changed again within the
+# same timestamp tick (coarse mtimes on FAT/SMB/Dropbox), so their cached digest is not trusted
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def index_path(dest: Path, job_name: str) -> Path:
+    return dest / f".{job_name}.index.json"
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        while chunk := fp.read(READ_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FileIndex:
+    def __init__(self, path: Path | None = None):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self.written_ns = 0
+        if path is not None and path.exists():
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                self.entries = data.get("files", {})
+                self.written_ns = data.get("written_ns", 0)
+            except (json.JSONDecodeError, OSError):
+                # a broken cache only costs a full rehash
+                self.entries = {}
+
+    def lookup(self, arcname: str, st: os.stat_result) -> str | None:
+        """Cached digest for arcname if its stat tuple is unchanged, else None."""
+        entry = self.entries.get(arcname)
+        if entry is None:
+            return None
+        if (entry["size"], entry["mtime_ns"], entry["ino"]) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            return None
+        if st.st_mtime_ns >= self.written_ns - RACY_WINDOW_NS:
+            return None
+        return entry["digest"]
+
+    def save(self, entries: dict[str, dict]) -> None:
+        if self.path is None:
+            return
+        self.entries = entries
+        self.written_ns = time.time_ns()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"written_ns": self.written_ns, "files": entries}, f)
+        os.replace(tmp, self.path)
+
+
+def scan_sources(sources: list[Path], index: FileIndex, verify: bool = False,
+                 jobs: int = 1) -> tuple[str, dict, int]:
+    """
+    Walk sources, hashing only files whose stat tuple changed (every file when verify is set).
+    Files that need hashing are read on a pool of `jobs` threads.
+    Returns (aggregate hash, {arcname: entry}, bytes hashed) and rewrites the index.
+
+    The aggregate is SHA256 over (arcname, digest) pairs in walk order, so a cached scan
+    and a full rehash give the same value for the same tree.
+    """
+    records = []
+    stale = []
+    for path, arcname, st in walk_sources(sorted(sources, key=str)):
+        if stat.S_ISLNK(st.st_mode):
+            records.append((arcname, None, f"->{os.readlink(path)}"))
+        elif stat.S_ISREG(st.st_mode):
+            digest = None if verify else index.lookup(arcname, st)
+            if digest is None:
+                stale.append((len(records), path))
+            records.append((arcname, st, digest))
+
+    bytes_hashed = sum(records[pos][1].st_size for pos, _ in stale)
+    if stale:
+        with ThreadPoolExecutor(max(1, jobs)) as pool:
+            digests = pool.map(_try_hash, [path for _, path in stale])
+            for (pos, _), digest in zip(stale, digests):
+                arcname, st, _ = records[pos]
+                records[pos] = (arcname, st, digest)
+
+    h = hashlib.sha256()
+    entries = {}
+    for arcname, st, digest in records:
+        if digest is None:
+            # vanished or unreadable since the walk
+            continue
+        if st is not None:
+            entries[arcname] = {
+                "size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino, "digest": digest,
+            }
+        h.update(f"{arcname}\0{digest}\n".encode())
+    index.save(entries)
+    return h.hexdigest(), entries, bytes_hashed
+
+
+def _try_hash(path: Path) -> str | None:
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
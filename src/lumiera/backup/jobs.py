@@ -2,11 +2,28 @@
 
 import os
 import json
+import stat
 import tarfile
-import re
-import hashlib
+import time
 from pathlib import Path
 import click
+from tabulate import tabulate
+
+from lumiera.backup.archive import write_archive
+from lumiera.backup.catalog import Catalog, now_iso, sidecars
+from lumiera.backup.chunks import backup_chunked, read_manifest, restore_chunked
+from lumiera.backup.codecs import open_archive, parse_compression
+from lumiera.backup.delta import plan_version, read_meta, restore_plan, write_meta
+from lumiera.backup.index import FileIndex, index_path, scan_sources
+from lumiera.backup.members import extract_members, members_path, read_members
+from lumiera.backup.parallel import default_jobs
+from lumiera.backup.retention import prune_job
+from lumiera.backup.sources import match_any
+from lumiera.backup.verify import verify_versions
+
+# backup modes: "archive" writes a full tarball per version, "chunked" a manifest
+# over a deduplicated chunk store (see lumiera.backup.chunks)
+BACKUP_MODES = ("archive", "chunked")
 
 
 def load_config(config_path: Path) -> dict:
@@ -22,74 +39,215 @@ def load_config(config_path: Path) -> dict:
 
 
 def get_job(config: dict, job_name: str) -> dict | None:
+    return jobs_by_name(config).get(job_name)
+
+
+def jobs_by_name(config: dict) -> dict[str, dict]:
+    # first definition wins, as with the old linear scan
+    jobs = {}
     for job in config.get('bk_jobs', []):
-        if job.get('name') == job_name:
-            return job
-    return None
+        jobs.setdefault(job.get('name'), job)
+    return jobs
+
+
+def select_jobs(config: dict, tags: list[str] | None = None) -> list[str]:
+    """Names of all jobs, or of those carrying any of the given tags, in config order."""
+    names = []
+    for name, job in jobs_by_name(config).items():
+        if not tags or set(tags) & set(job.get('tags', [])):
+            names.append(name)
+    return names
+
+
+def compute_sources_hash(sources: list[Path], index: FileIndex | None = None, verify: bool = False,
+                         jobs: int = 1) -> str:
+    """
+    Compute a SHA256 over every file in sources (files and directories) in sorted order.
+    With an index, only files whose size/mtime/inode changed are re-read; verify forces a full rehash.
+    Files are hashed on `jobs` threads.
+    """
+    current_hash, _, _ = scan_sources(sources, index or FileIndex(), verify=verify, jobs=jobs)
+    return current_hash
+
 
+def format_throughput(nbytes: int, seconds: float) -> str:
+    mb = nbytes / (1024 * 1024)
+    return f"{mb:.1f} MB in {seconds:.1f}s ({mb / max(seconds, 1e-6):.1f} MB/s)"
 
-def compute_sources_hash(sources: list[Path]) -> str:
+
+def list_versions(dest: Path, job_name: str) -> list[tuple[int, Path]]:
+    """
+    Return [(version, path)] for every tarball or chunk manifest of job_name in dest, sorted by version.
+    Read from the destination's catalog rather than a directory listing.
+    """
+    return [(r["version"], dest / r["file"]) for r in Catalog(dest).versions(job_name)]
+
+
+def backup_job(config_path: Path, job_name: str, verify: bool = False, jobs: int | None = None) -> dict:
     """
-    Compute a SHA256 hash over all files in sources (files and directories) in sorted order.
+    Create a new version of job_name if its sources changed.
+    Returns {"job", "status" ("backup" | "skipped"), "bytes_read", "bytes_written", "duration"}.
     """
-    h = hashlib.sha256()
-    for src in sorted(sources, key=lambda p: str(p)):
-        if src.is_dir():
-            for file in sorted(src.rglob('*'), key=lambda p: str(p)):
-                if file.is_file():
-                    with open(file, 'rb') as fp:
-                        while chunk := fp.read(8192):
-                            h.update(chunk)
-        elif src.is_file():
-            with open(src, 'rb') as fp:
-                while chunk := fp.read(8192):
-                    h.update(chunk)
-    return h.hexdigest()
-
-
-def backup_job(config_path: Path, job_name: str) -> None:
+    job_started = time.perf_counter()
     config = load_config(config_path)
     job = get_job(config, job_name)
     if not job:
         click.echo(f"No job named '{job_name}' in config.")
         raise click.Abort()
 
+    mode = job.get('mode', 'archive')
+    if mode not in BACKUP_MODES:
+        click.echo(f"Unknown backup mode '{mode}' for job '{job_name}'.")
+        raise click.Abort()
+    try:
+        codec, level = parse_compression(job.get('compression'))
+    except ValueError as e:
+        click.echo(f"Invalid compression for job '{job_name}': {e}")
+        raise click.Abort()
+
     dest = Path(os.path.expandvars(job['destination'])).expanduser()
     dest.mkdir(parents=True, exist_ok=True)
     sources = [Path(os.path.expandvars(s)).expanduser() for s in job.get('source', [])]
+    jobs = jobs or default_jobs()
 
     # state file to track last hash
     state_file = dest / f".{job_name}.hash"
-    current_hash = compute_sources_hash(sources)
+    index = FileIndex(index_path(dest, job_name))
+    current_hash, entries, bytes_hashed = scan_sources(sources, index, verify=verify, jobs=jobs)
+    result = {"job": job_name, "status": "skipped", "bytes_read": bytes_hashed, "bytes_written": 0}
     prev_hash = state_file.read_text().strip() if state_file.exists() else None
     if prev_hash == current_hash:
         click.echo(f"No changes detected for '{job_name}', skipping backup.")
-        return
+        result["duration"] = time.perf_counter() - job_started
+        return result
 
     # find next version
-    pattern = re.compile(rf"{re.escape(job_name)}-(\d+)\.tar\.gz$")
-    versions = [int(m.group(1)) for f in dest.iterdir() if (m := pattern.match(f.name))]
-    next_ver = max(versions) + 1 if versions else 1
-    archive_path = dest / f"{job_name}-{next_ver}.tar.gz"
+    catalog = Catalog(dest)
+    latest = catalog.latest(job_name)
+    next_ver = catalog.next_version(job_name)
 
-    # create archive
-    with tarfile.open(archive_path, "w:gz") as tar:
+    if mode == 'chunked':
         for src in sources:
             if not src.exists():
                 click.echo(f"Source not found: {src}")
-                continue
-            try:
-                arcname = src.relative_to(Path.home())
-            except ValueError:
-                arcname = src.name
-            tar.add(str(src), arcname=str(arcname))
+        # reuse chunk lists of unchanged files from the latest manifest, if any
+        manifests = [r for r in catalog.versions(job_name) if r["kind"] == "chunked"]
+        started = time.perf_counter()
+        manifest_path, stats = backup_chunked(
+            sources, dest, job_name, next_ver, previous=dest / manifests[-1]["file"] if manifests else None
+        )
+        state_file.write_text(current_hash)
+        catalog.add({
+            "job": job_name, "version": next_ver, "file": manifest_path.name, "kind": "chunked",
+            "created": now_iso(), "bytes": manifest_path.stat().st_size,
+            "source_hash": current_hash, "files": stats['files'], "bytes_read": bytes_hashed + stats['bytes_read'],
+            "bytes_written": stats['bytes_written'], "duration": round(time.perf_counter() - job_started, 3),
+            "compression": "chunked",
+        })
+        click.echo(
+            f"Backup created: {manifest_path} "
+            f"({stats['files']} files, {stats['chunks_new']} new chunks, {stats['bytes_written']} bytes written)"
+        )
+        click.echo(f"Read {format_throughput(stats['bytes_read'], time.perf_counter() - started)}")
+        result.update(status="backup", duration=time.perf_counter() - job_started)
+        result["bytes_read"] += stats['bytes_read']
+        result["bytes_written"] = stats['bytes_written']
+        _prune_after_backup(job, dest, job_name, catalog)
+        return result
+
+    archive_path = dest / f"{job_name}-{next_ver}{codec.suffix}"
+    missing = [src for src in sources if not src.exists()]
+    for src in missing:
+        click.echo(f"Source not found: {src}")
+
+    # incremental jobs: only files changed since the previous version go into a delta
+    full_every = int(job.get('full_every', 1))
+    meta, include = None, None
+    if full_every > 1:
+        prev_meta = read_meta(dest, job_name, latest["version"]) if latest else None
+        meta, include = plan_version(prev_meta, entries, next_ver, full_every)
+
+    # create archive: tar stream -> independent blocks compressed on `jobs` threads
+    started = time.perf_counter()
+    stats = write_archive(
+        archive_path, sources, codec, level, jobs=jobs, include=include,
+        index_path=members_path(dest, job_name, next_ver),
+    )
+    elapsed = time.perf_counter() - started
+    if meta is not None:
+        write_meta(dest, job_name, meta)
 
     # update state
     state_file.write_text(current_hash)
-    click.echo(f"Backup created: {archive_path}")
+    catalog.add({
+        "job": job_name, "version": next_ver, "file": archive_path.name,
+        "kind": meta["kind"] if meta is not None else "full", "created": now_iso(),
+        "bytes": stats['bytes_written'] + sum(
+            p.stat().st_size for p in sidecars(dest, job_name, next_ver) if p.exists()
+        ),
+        "source_hash": current_hash, "files": len(include) if include is not None else len(entries),
+        "bytes_read": bytes_hashed + stats['bytes_read'], "bytes_written": stats['bytes_written'],
+        "duration": round(time.perf_counter() - job_started, 3), "compression": f"{codec.name}:{level}",
+    })
+    if meta is not None and meta["kind"] == "delta":
+        click.echo(
+            f"Backup created: {archive_path} (delta on version {meta['parent']}: "
+            f"{len(include)} changed, {len(meta['deleted'])} deleted)"
+        )
+    else:
+        click.echo(f"Backup created: {archive_path}")
+    click.echo(
+        f"Archived {format_throughput(stats['bytes_read'], elapsed)}, "
+        f"wrote {stats['bytes_written']} bytes ({codec.name}:{level})"
+    )
+    result.update(status="backup", duration=time.perf_counter() - job_started)
+    result["bytes_read"] += stats['bytes_read']
+    result["bytes_written"] = stats['bytes_written']
+    _prune_after_backup(job, dest, job_name, catalog)
+    return result
+
+
+def _prune_after_backup(job: dict, dest: Path, job_name: str, catalog: Catalog) -> None:
+    if job.get('retention') and job.get('prune_after_backup'):
+        report_prune(job_name, prune_job(dest, job_name, job['retention'], catalog=catalog))
+
+
+def report_prune(job_name: str, result: dict, dry_run: bool = False) -> None:
+    verb = "Would remove" if dry_run else "Removed"
+    if not result["removed"]:
+        click.echo(f"Nothing to prune for '{job_name}'.")
+        return
+    versions = ", ".join(map(str, result["removed"]))
+    click.echo(f"{verb} version(s) {versions} of '{job_name}', {result['freed']} bytes"
+               + (f", {result['chunks_removed']} chunks" if result['chunks_removed'] else ""))
+
+
+def prune(config_path: Path, job_name: str, dry_run: bool = False) -> None:
+    """Apply a job's retention rules to its destination."""
+    config = load_config(config_path)
+    job = get_job(config, job_name)
+    if not job:
+        click.echo(f"No job named '{job_name}' in config.")
+        raise click.Abort()
+    rules = job.get('retention')
+    if not rules:
+        click.echo(f"Job '{job_name}' has no retention rules, keeping everything.")
+        return
+    dest = Path(os.path.expandvars(job['destination'])).expanduser()
+    try:
+        result = prune_job(dest, job_name, rules, dry_run=dry_run)
+    except ValueError as e:
+        click.echo(f"Invalid retention for job '{job_name}': {e}")
+        raise click.Abort()
+    report_prune(job_name, result, dry_run=dry_run)
 
 
-def restore_job(config_path: Path, job_name: str, version: int = None) -> None:
+def restore_job(config_path: Path, job_name: str, version: int = None,
+                patterns: list[str] | None = None, list_only: bool = False) -> None:
+    """
+    Restore a version under $HOME, or only the members matching the glob patterns.
+    With list_only, print the version's contents instead of restoring.
+    """
     config = load_config(config_path)
     job = get_job(config, job_name)
     if not job:
@@ -97,12 +255,10 @@ def restore_job(config_path: Path, job_name: str, version: int = None) -> None:
         raise click.Abort()
 
     dest = Path(os.path.expandvars(job['destination'])).expanduser()
-    pattern = re.compile(rf"{re.escape(job_name)}-(\d+)\.tar\.gz$")
-    archives = [(int(m.group(1)), f) for f in dest.iterdir() if (m := pattern.match(f.name))]
+    archives = list_versions(dest, job_name) if dest.exists() else []
     if not archives:
         click.echo(f"No backups found in {dest}")
         raise click.Abort()
-    archives.sort(key=lambda x: x[0])
 
     if version is None:
         ver, archive_file = archives[-1]
@@ -112,8 +268,174 @@ def restore_job(config_path: Path, job_name: str, version: int = None) -> None:
             click.echo(f"No archive version {version} found.")
             raise click.Abort()
         ver, archive_file = matches[0]
+    if not archive_file.exists():
+        click.echo(f"Version {ver} is in the catalog but {archive_file} is missing.")
+        raise click.Abort()
 
-    with tarfile.open(archive_file, "r:gz") as tar:
-        tar.extractall(path=Path.home())
-    click.echo(f"Restored version {ver} for job '{job_name}'.")
+    try:
+        if list_only:
+            for line in list_version(dest, job_name, ver, dict(archives), patterns):
+                click.echo(line)
+            return
+        if archive_file.name.endswith(".manifest.json"):
+            count = restore_chunked(archive_file, Path.home(), patterns=patterns)
+        else:
+            count = restore_archive(dest, job_name, ver, dict(archives), patterns=patterns)
+    except (ValueError, tarfile.TarError) as e:
+        click.echo(f"Restore failed: {e}")
+        raise click.Abort()
+    if patterns:
+        click.echo(f"Restored {count} matching files from version {ver} for job '{job_name}'.")
+    else:
+        click.echo(f"Restored version {ver} for job '{job_name}'.")
+
+
+def _version_members(dest: Path, job_name: str, version: int, archives: dict[int, Path]):
+    """
+    Yield (archive version, archive path, member index or None, wanted regular files or None)
+    for every archive a version's files live in; None means "all of them".
+    """
+    meta = read_meta(dest, job_name, version)
+    plan = restore_plan(meta) if meta is not None and meta["kind"] == "delta" else {version: None}
+    missing = [v for v in plan if v not in archives]
+    if missing:
+        raise ValueError(f"archive version(s) {', '.join(map(str, sorted(missing)))} needed by the chain are missing")
+    # older archives first so the requested version's own directory entries land last
+    for ver in sorted(plan):
+        wanted = None if ver == version else plan[ver]
+        yield ver, archives[ver], read_members(members_path(dest, job_name, ver)), wanted
+
+
+def restore_archive(dest: Path, job_name: str, version: int, archives: dict[int, Path],
+                    patterns: list[str] | None = None) -> int:
+    """
+    Extract a tarball version under $HOME. For delta versions, each file is taken from
+    the one archive in the chain that holds its content at `version`. Archives with a
+    member index are read selectively; older ones are scanned front to back.
+    Returns the number of regular files restored.
+    """
+    count = 0
+    for ver, archive, index, wanted in _version_members(dest, job_name, version, archives):
+        def selected(name, is_file):
+            return (wanted is None or (is_file and name in wanted)) and match_any(name, patterns)
+
+        if index is not None and (wanted is not None or patterns):
+            members = [m for m in index["members"] if selected(m["name"], m["type"] == "file")]
+            count += extract_members(archive, index, members, Path.home())
+            continue
+        with open_archive(archive) as tar:
+            # members are picked while extractall reads them, so stream-mode
+            # archives (zstd) are never asked to seek back to the start
+            members = []
+
+            def chosen():
+                for m in tar:
+                    if selected(m.name, m.isreg()):
+                        members.append(m)
+                        yield m
+
+            tar.extractall(path=Path.home(), members=chosen())
+        count += sum(1 for m in members if m.isreg())
+    return count
+
+
+def list_version(dest: Path, job_name: str, version: int, archives: dict[int, Path],
+                 patterns: list[str] | None = None) -> list[str]:
+    """`ls -l`-style lines for a version, read from its manifest or member indexes."""
+    archive = archives[version]
+    rows = []
+    if archive.name.endswith(".manifest.json"):
+        for e in read_manifest(archive)["entries"]:
+            rows.append((e["type"], e["mode"], e.get("size", 0), e["mtime_ns"] // 1_000_000_000, e["path"]))
+    else:
+        for ver, archive, index, wanted in _version_members(dest, job_name, version, archives):
+            if index is None:
+                # pre-index archive: fall back to reading through it
+                with open_archive(archive) as tar:
+                    members = [
+                        {"type": "file" if m.isreg() else "dir" if m.isdir() else "other",
+                         "mode": m.mode, "size": m.size, "mtime": m.mtime, "name": m.name}
+                        for m in tar
+                    ]
+            else:
+                members = index["members"]
+            for m in members:
+                if wanted is None or (m["type"] == "file" and m["name"] in wanted):
+                    rows.append((m["type"], m["mode"], m["size"], m["mtime"], m["name"]))
+    rows.sort(key=lambda r: r[4])
+    kinds = {"dir": "d", "symlink": "l", "hardlink": "h", "file": "-"}
+    return [
+        f"{kinds.get(kind, '?')}{stat.filemode(mode)[1:]} {size:>12} "
+        f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))} {name}"
+        for kind, mode, size, mtime, name in rows if match_any(name, patterns)
+    ]
+
+
+def backup_history(config_path: Path, job_name: str) -> None:
+    """Print the catalog's record of every live version of a job."""
+    config = load_config(config_path)
+    job = get_job(config, job_name)
+    if not job:
+        click.echo(f"No job named '{job_name}' in config.")
+        raise click.Abort()
+    dest = Path(os.path.expandvars(job['destination'])).expanduser()
+    records = Catalog(dest).versions(job_name) if dest.exists() else []
+    if not records:
+        click.echo(f"No backups found in {dest}")
+        return
+
+    def mb(value):
+        return f"{value / (1024 * 1024):.1f}" if value is not None else ""
+
+    rows = [
+        [r["version"], r["created"], r.get("kind", ""), r.get("compression", ""), (r.get("source_hash") or "")[:12],
+         r.get("files", ""), mb(r.get("bytes_read")), mb(r.get("bytes_written", r.get("bytes"))),
+         f"{r['duration']:.1f}" if "duration" in r else ""]
+        for r in records
+    ]
+    click.echo(tabulate(rows, headers=[
+        "version", "created", "kind", "codec", "source hash", "files", "read MB", "written MB", "seconds",
+    ]))
+
+
+def verify_job(config_path: Path, job_name: str, version: int | None = None, all_versions: bool = False,
+               jobs: int | None = None) -> bool:
+    """
+    Re-read a version (default: latest) and every archive its delta chain needs, or all
+    versions, checking members against their recorded checksums. Returns True if all are intact.
+    """
+    config = load_config(config_path)
+    job = get_job(config, job_name)
+    if not job:
+        click.echo(f"No job named '{job_name}' in config.")
+        raise click.Abort()
+    dest = Path(os.path.expandvars(job['destination'])).expanduser()
+    catalog = Catalog(dest) if dest.exists() else None
+    records = catalog.versions(job_name) if catalog else []
+    if not records:
+        click.echo(f"No backups found in {dest}")
+        raise click.Abort()
+
+    if not all_versions:
+        record = catalog.latest(job_name) if version is None else catalog.get(job_name, version)
+        if record is None:
+            click.echo(f"No archive version {version} found.")
+            raise click.Abort()
+        meta = read_meta(dest, job_name, record["version"]) if record.get("kind") == "delta" else None
+        chain = set(restore_plan(meta)) if meta else {record["version"]}
+        records = [r for r in records if r["version"] in chain]
 
+    started = time.perf_counter()
+    reports = verify_versions(dest, records, jobs=jobs or default_jobs())
+    ok = True
+    for report in reports:
+        note = "" if report["checksums"] else " (no checksums recorded, readability only)"
+        if report["damaged"]:
+            ok = False
+            click.echo(f"Version {report['version']} ({report['file']}): {len(report['damaged'])} damaged{note}")
+            for name, reason in report["damaged"]:
+                click.echo(f"  {name}: {reason}")
+        else:
+            click.echo(f"Version {report['version']} ({report['file']}): {report['checked']} files OK{note}")
+    click.echo(f"Verified {len(reports)} version(s) of '{job_name}' in {time.perf_counter() - started:.1f}s.")
+    return ok
@@ -0,0 +1,152 @@
+# src/lumiera/backup/members.py
+"""
+Member index for backup archives, written next to each tarball as `{job}-{N}.members.json`.
+
+It records every member's name, type, size, offsets in the uncompressed tar stream and
+(for regular files) SHA256, plus where each compressed block starts. Listing never
+touches the archive, and a selective restore seeks to the block holding a member
+instead of decompressing everything before it.
+"""
+
+import json
+import os
+import tarfile
+from bisect import bisect_right
+from pathlib import Path
+
+from lumiera.backup.codecs import CODECS
+from lumiera.backup.sources import clear_for_link, safe_target
+
+# re-seek instead of reading through gaps larger than this
+SKIP_LIMIT = 4 * 1024 * 1024
+COPY_SIZE = 1024 * 1024
+
+
+def members_path(dest: Path, job_name: str, version: int) -> Path:
+    return dest / f"{job_name}-{version}.members.json"
+
+
+def member_record(tarinfo: tarfile.TarInfo, offset: int, end: int) -> dict:
+    """Index entry for a member whose header started at `offset` and whose data ended the block at `end`."""
+    if tarinfo.isreg():
+        kind = "file"
+    elif tarinfo.isdir():
+        kind = "dir"
+    elif tarinfo.issym():
+        kind = "symlink"
+    elif tarinfo.islnk():
+        kind = "hardlink"
+    else:
+        kind = "other"
+    padded = -(-tarinfo.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE if kind == "file" else 0
+    record = {
+        "name": tarinfo.name, "type": kind, "size": tarinfo.size if kind == "file" else 0,
+        "mode": tarinfo.mode, "mtime": tarinfo.mtime, "offset": offset, "offset_data": end - padded,
+    }
+    if kind in ("symlink", "hardlink"):
+        record["linkname"] = tarinfo.linkname
+    return record
+
+
+def write_members(path: Path, codec_name: str, blocks: list[tuple[int, int]], members: list[dict]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump({"codec": codec_name, "blocks": blocks, "members": members}, f)
+    os.replace(tmp, path)
+
+
+def read_members(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class SeekingReader:
+    """Sequential reader over the uncompressed stream that re-seeks to the nearest block for far jumps."""
+
+    def __init__(self, raw, codec, blocks: list[list[int]]):
+        self.raw = raw
+        self.codec = codec
+        self.starts = [b[0] for b in blocks]
+        self.blocks = blocks
+        self.stream = None
+        self.pos = 0
+
+    def seek(self, offset: int) -> None:
+        if self.stream is None or offset < self.pos or offset - self.pos > SKIP_LIMIT:
+            i = max(bisect_right(self.starts, offset) - 1, 0)
+            ustart, cstart = self.blocks[i]
+            self.raw.seek(cstart)
+            self.stream = self.codec.reader(self.raw)
+            self.pos = ustart
+        while self.pos < offset:
+            skipped = len(self.stream.read(min(COPY_SIZE, offset - self.pos)))
+            if not skipped:
+                raise ValueError("archive ended before the indexed offset")
+            self.pos += skipped
+
+    def copy_to(self, fp, size: int) -> None:
+        while size:
+            data = self.stream.read(min(COPY_SIZE, size))
+            if not data:
+                raise ValueError("archive ended inside a member")
+            fp.write(data)
+            size -= len(data)
+            self.pos += len(data)
+
+
+def extract_members(archive_path: Path, index: dict, members: list[dict], target: Path) -> int:
+    """
+    Restore the given index members under target, reading only the blocks that hold them.
+    Returns the number of files written.
+    """
+    codec = CODECS.get(index["codec"])
+    if codec is None:
+        raise ValueError(f"{archive_path.name} uses codec '{index['codec']}', which is not available")
+    files = {m["name"]: m for m in index["members"] if m["type"] == "file"}
+    count = 0
+    dirs = []
+    written = set()
+    with open(archive_path, 'rb') as raw:
+        reader = SeekingReader(raw, codec, index["blocks"] or [[0, 0]])
+
+        def write_file(out, m):
+            reader.seek(m["offset_data"])
+            with open(out, 'wb') as fp:
+                reader.copy_to(fp, m["size"])
+            os.chmod(out, m["mode"])
+            os.utime(out, (m["mtime"], m["mtime"]))
+
+        for m in sorted(members, key=lambda m: m["offset"]):
+            out = safe_target(target, m["name"])
+            if m["type"] == "dir":
+                out.mkdir(parents=True, exist_ok=True)
+                dirs.append((out, m))
+                continue
+            out.parent.mkdir(parents=True, exist_ok=True)
+            if m["type"] == "symlink":
+                clear_for_link(out)
+                os.symlink(m["linkname"], out)
+                continue
+            if m["type"] == "hardlink":
+                clear_for_link(out)
+                if m["linkname"] in written:
+                    os.link(safe_target(target, m["linkname"]), out)
+                    continue
+                # the link's target was not restored: like tarfile, write its data here instead
+                if m["linkname"] not in files:
+                    raise ValueError(f"Hardlink {m['name']} points to {m['linkname']}, which is not in the archive")
+                write_file(out, files[m["linkname"]])
+                written.add(m["name"])
+                count += 1
+                continue
+            if m["type"] != "file":
+                continue
+            write_file(out, m)
+            written.add(m["name"])
+            count += 1
+    for out, m in reversed(dirs):
+        os.chmod(out, m["mode"])
+        os.utime(out, (m["mtime"], m["mtime"]))
+    return count
@@ -0,0 +1,120 @@
+# src/lumiera/backup/parallel.py
+"""
+Block-parallel compression for backup archives.
+
+The tar stream is cut into fixed-size blocks and every block is compressed on a
+thread pool as an independent member (zlib, bz2 and lzma release the GIL).
+Concatenated gzip members form a valid multi-member .gz, the same layout pigz
+produces, so the result stays readable by `tar xzf`, gzip and Python's tarfile;
+the other codecs in lumiera.backup.codecs use the same trick with streams/frames.
+"""
+
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def gzip_member(data: bytes, level: int = 9) -> bytes:
+    """Compress data as one self-contained gzip member."""
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return c.compress(data) + c.flush()
+
+
+class BlockWriter:
+    """
+    Write-only file object that compresses fixed-size blocks in parallel and
+    writes them to fileobj in order. At most 2 * jobs blocks are in flight.
+
+    `store` is an optional cheaper compressor for data that will not shrink;
+    set_store() ends the current block so each block uses exactly one of them.
+
+    `blocks` collects (uncompressed offset, compressed offset) for the start of every
+    block, which is where a reader can seek to and start decompressing.
+    """
+
+    def __init__(self, fileobj: BinaryIO, compress: Callable[[bytes], bytes] = gzip_member,
+                 jobs: int = 1, block_size: int = BLOCK_SIZE, store: Callable[[bytes], bytes] | None = None):
+        self.fileobj = fileobj
+        self.compress = compress
+        self.store = store
+        self.storing = False
+        self.jobs = max(1, jobs)
+        self.block_size = block_size
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.blocks: list[tuple[int, int]] = []
+        self._submitted = 0
+        self._buf = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(self.jobs) if self.jobs > 1 else None
+
+    def tell(self) -> int:
+        # position in the uncompressed stream, which is what tarfile tracks member offsets by
+        return self.bytes_in
+
+    def set_store(self, storing: bool) -> None:
+        if self.store is None or storing == self.storing:
+            return
+        self._flush_block()
+        self.storing = storing
+
+    def _flush_block(self) -> None:
+        if self._buf:
+            self._submit(bytes(self._buf))
+            self._buf.clear()
+
+    def write(self, data) -> int:
+        self._buf += data
+        self.bytes_in += len(data)
+        while len(self._buf) >= self.block_size:
+            block = bytes(self._buf[:self.block_size])
+            del self._buf[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block: bytes) -> None:
+        compress = self.store if self.storing else self.compress
+        start = self._submitted
+        self._submitted += len(block)
+        if self._executor is None:
+            self._emit(start, compress(block))
+            return
+        self._pending.append((start, self._executor.submit(compress, block)))
+        while len(self._pending) > 2 * self.jobs:
+            self._emit_next()
+
+    def _emit_next(self) -> None:
+        start, future = self._pending.popleft()
+        self._emit(start, future.result())
+
+    def _emit(self, start: int, packed: bytes) -> None:
+        self.blocks.append((start, self.bytes_out))
+        self.fileobj.write(packed)
+        self.bytes_out += len(packed)
+
+    def close(self) -> None:
+        """Flush the trailing partial block and wait for all pending blocks."""
+        self._flush_block()
+        while self._pending:
+            self._emit_next()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,200 @@
+# src/lumiera/backup/retention.py
+"""
+Retention rules and pruning for versioned backups.
+
+A job's `"retention"` block selects versions to keep:
+
+    {"keep_last": 3, "keep_daily": 7, "keep_weekly": 4, "keep_monthly": 6, "max_total_bytes": 50000000000}
+
+keep_* rules are unioned (the newest version of each of the last N days/weeks/months
+that have backups). max_total_bytes then drops the oldest kept versions until the total
+fits, never the newest one. Versions a kept delta still reads from are never deleted,
+and chunks are only removed once no manifest in the destination references them.
+"""
+
+import time
+from datetime import datetime
+from pathlib import Path
+
+from lumiera.backup.catalog import Catalog, sidecars
+from lumiera.backup.chunks import ChunkStore, read_manifest
+from lumiera.backup.delta import read_meta, restore_plan
+
+# chunks younger than this are never swept: a backup running right now may have written
+# or reused them (reuse refreshes the mtime) without having committed its manifest yet
+GC_GRACE_SECONDS = 3600
+
+RETENTION_KEYS = {"keep_last", "keep_daily", "keep_weekly", "keep_monthly", "max_total_bytes"}
+
+_PERIODS = {
+    "keep_daily": lambda dt: dt.strftime("%Y-%m-%d"),
+    "keep_weekly": lambda dt: "%04d-W%02d" % dt.isocalendar()[:2],
+    "keep_monthly": lambda dt: dt.strftime("%Y-%m"),
+}
+
+
+def validate_rules(rules: dict) -> None:
+    unknown = set(rules) - RETENTION_KEYS
+    if unknown:
+        raise ValueError(f"Unknown retention rule(s): {', '.join(sorted(unknown))}")
+    for key, value in rules.items():
+        if not isinstance(value, int) or value < 0:
+            raise ValueError(f"Retention rule {key} must be a non-negative integer")
+
+
+def select_keep(records: list[dict], rules: dict) -> set[int]:
+    """Versions kept by the keep_* rules alone. records are oldest first."""
+    if not records:
+        return set()
+    if not any(rules.get(k) for k in ("keep_last", "keep_daily", "keep_weekly", "keep_monthly")):
+        # no count-based rules: everything is kept unless max_total_bytes says otherwise
+        return {r["version"] for r in records}
+    newest_first = list(reversed(records))
+    keep = {r["version"] for r in newest_first[:rules.get("keep_last", 0)]}
+    for key, period_of in _PERIODS.items():
+        n = rules.get(key, 0)
+        seen = set()
+        for r in newest_first:
+            if len(seen) >= n:
+                break
+            period = period_of(datetime.fromisoformat(r["created"]))
+            if period not in seen:
+                seen.add(period)
+                keep.add(r["version"])
+    # the newest version always survives
+    keep.add(newest_first[0]["version"])
+    return keep
+
+
+def _dependencies(dest: Path, job_name: str, record: dict) -> set[int]:
+    """Versions whose archives a version needs to be restored, itself included."""
+    if record.get("kind") != "delta":
+        return {record["version"]}
+    meta = read_meta(dest, job_name, record["version"])
+    return set(restore_plan(meta)) if meta else {record["version"]}
+
+
+def _manifest_chunks(path: Path) -> set[str]:
+    return {digest for entry in read_manifest(path).get("entries", []) for digest in entry.get("chunks", [])}
+
+
+def _size_of(dest: Path, records: list[dict]):
+    """
+    size_of(versions): the bytes a set of versions occupies. Chunked versions count their
+    manifest plus every chunk they reference, each chunk once however many share it.
+    """
+    by_version = {r["version"]: r for r in records}
+    chunks = {r["version"]: _manifest_chunks(dest / r["file"]) for r in records if r.get("kind") == "chunked"}
+    store = ChunkStore(dest / "chunks")
+    chunk_sizes = {}
+
+    def chunk_size(digest: str) -> int:
+        if digest not in chunk_sizes:
+            try:
+                chunk_sizes[digest] = store.path_for(digest).stat().st_size
+            except FileNotFoundError:
+                chunk_sizes[digest] = 0
+        return chunk_sizes[digest]
+
+    def size_of(versions: set[int]) -> int:
+        used = set().union(*(chunks.get(v, ()) for v in versions))
+        return sum(by_version[v].get("bytes", 0) for v in versions) + sum(map(chunk_size, used))
+    return size_of
+
+
+def plan_prune(dest: Path, job_name: str, records: list[dict], rules: dict) -> set[int]:
+    """Versions that must stay on disk under rules, delta dependencies included."""
+    if not records:
+        return set()
+    by_version = {r["version"]: r for r in records}
+    deps = {v: _dependencies(dest, job_name, r) for v, r in by_version.items()}
+
+    def closure(versions: set[int]) -> set[int]:
+        needed = set()
+        for v in versions:
+            needed |= deps[v]
+        return needed
+
+    keep = select_keep(records, rules)
+    needed = closure(keep)
+    limit = rules.get("max_total_bytes")
+    if limit:
+        size_of = _size_of(dest, records)
+        newest = records[-1]["version"]
+        for v in sorted(keep):
+            if size_of(needed) <= limit:
+                break
+            if v == newest:
+                break
+            keep.discard(v)
+            needed = closure(keep)
+    return needed
+
+
+def prune_job(dest: Path, job_name: str, rules: dict, dry_run: bool = False,
+              catalog: Catalog | None = None) -> dict:
+    """
+    Delete versions of job_name not kept by rules, then unreferenced chunks.
+    Returns {"removed": [versions], "freed": bytes, "chunks_removed": n}.
+    """
+    validate_rules(rules)
+    catalog = catalog or Catalog(dest)
+    records = catalog.versions(job_name)
+    needed = plan_prune(dest, job_name, records, rules)
+    doomed = [r for r in records if r["version"] not in needed]
+    result = {"removed": [r["version"] for r in doomed], "freed": 0, "chunks_removed": 0}
+    chunked = any(r.get("kind") == "chunked" for r in doomed)
+    if dry_run:
+        result["freed"] = sum(r.get("bytes", 0) for r in doomed)
+        if chunked:
+            dropped = {(job_name, r["version"]) for r in doomed}
+            result["chunks_removed"], freed = collect_chunks(dest, catalog, dry_run=True, dropped=dropped)
+            result["freed"] += freed
+        return result
+
+    for r in doomed:
+        for path in [dest / r["file"], *sidecars(dest, job_name, r["version"])]:
+            if path.exists():
+                result["freed"] += path.stat().st_size
+                path.unlink()
+        catalog.remove(job_name, r["version"])
+
+    if chunked:
+        removed, freed = collect_chunks(dest, catalog)
+        result["chunks_removed"] = removed
+        result["freed"] += freed
+    return result
+
+
+def collect_chunks(dest: Path, catalog: Catalog, dry_run: bool = False,
+                   dropped: set[tuple[str, int]] = frozenset()) -> tuple[int, int]:
+    """
+    Mark-and-sweep the destination's chunk store: every job's live manifests are marked,
+    everything else in `<destination>/chunks` is deleted. With dry_run, nothing is
+    deleted and the versions in dropped ({(job, version)}) count as already gone.
+    Returns (chunks removed, bytes freed).
+    """
+    live = set()
+    for job in catalog.jobs():
+        for r in catalog.versions(job):
+            if r.get("kind") == "chunked" and (job, r["version"]) not in dropped:
+                live |= _manifest_chunks(dest / r["file"])
+    store = ChunkStore(dest / "chunks")
+    removed = freed = 0
+    if not store.root.exists():
+        return 0, 0
+    cutoff = time.time() - GC_GRACE_SECONDS
+    for bucket in store.root.iterdir():
+        if not bucket.is_dir():
+            continue
+        for chunk in bucket.iterdir():
+            if chunk.name in live:
+                continue
+            st = chunk.stat()
+            if st.st_mtime > cutoff:
+                continue
+            freed += st.st_size
+            if not dry_run:
+                chunk.unlink()
+            removed += 1
+    return removed, freed
@@ -0,0 +1,104 @@
+# src/lumiera/backup/scheduler.py
+"""
+Run several backup jobs concurrently.
+
+Jobs are grouped by the device their destination lives on; each group runs its jobs
+one after another so two jobs never fight over the same disk, while up to `io_limit`
+groups run side by side. The `cpu_limit` hashing/compression threads are split evenly
+between the groups running at once.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+from tabulate import tabulate
+
+from lumiera.backup.jobs import backup_job, get_job, load_config
+from lumiera.backup.parallel import default_jobs
+
+
+def destination_device(dest: Path) -> int:
+    """st_dev of dest, or of its nearest existing parent if it does not exist yet."""
+    path = dest
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except FileNotFoundError:
+            if path.parent == path:
+                raise
+            path = path.parent
+
+
+def group_by_device(config: dict, job_names: list[str]) -> tuple[list[list[str]], dict[str, str]]:
+    """
+    Group job_names by destination device. Returns (groups, errors), errors mapping the
+    jobs whose destination could not be resolved to the reason, so one bad job entry
+    does not stop the others.
+    """
+    groups: dict[int, list[str]] = {}
+    errors: dict[str, str] = {}
+    for name in job_names:
+        job = get_job(config, name)
+        if job is None:
+            errors[name] = "no such job"
+            continue
+        if not job.get('destination'):
+            errors[name] = "no destination configured"
+            continue
+        try:
+            device = destination_device(Path(os.path.expandvars(job['destination'])).expanduser())
+        except OSError as e:
+            errors[name] = str(e)
+            continue
+        groups.setdefault(device, []).append(name)
+    return list(groups.values()), errors
+
+
+def run_jobs(config_path: Path, job_names: list[str], io_limit: int = 2, cpu_limit: int | None = None,
+             verify: bool = False) -> list[dict]:
+    """Back up job_names concurrently; returns one result per job, in job_names order."""
+    config = load_config(config_path)
+    groups, errors = group_by_device(config, job_names)
+    for name, reason in errors.items():
+        click.echo(f"Backup of '{name}' failed: {reason}")
+    workers = max(1, min(io_limit, len(groups)))
+    threads_per_job = max(1, (cpu_limit or default_jobs()) // workers)
+
+    def run_group(names: list[str]) -> list[dict]:
+        results = []
+        for name in names:
+            started = time.perf_counter()
+            try:
+                results.append(backup_job(config_path, name, verify=verify, jobs=threads_per_job))
+            except click.Abort:
+                # backup_job already explained why
+                results.append(_failed(name, started))
+            except Exception as e:
+                click.echo(f"Backup of '{name}' failed: {e}")
+                results.append(_failed(name, started))
+        return results
+
+    with ThreadPoolExecutor(workers) as pool:
+        by_name = {r["job"]: r for results in pool.map(run_group, groups) for r in results}
+    by_name.update((name, _failed(name, time.perf_counter())) for name in errors)
+    return [by_name[name] for name in job_names]
+
+
+def _failed(name: str, started: float) -> dict:
+    return {"job": name, "status": "failed", "bytes_read": 0, "bytes_written": 0,
+            "duration": time.perf_counter() - started}
+
+
+def _mb(nbytes: int) -> str:
+    return f"{nbytes / (1024 * 1024):.1f}"
+
+
+def summary_table(results: list[dict]) -> str:
+    rows = [
+        [r["job"], r["status"], _mb(r["bytes_read"]), _mb(r["bytes_written"]), f"{r['duration']:.1f}"]
+        for r in results
+    ]
+    return tabulate(rows, headers=["job", "status", "read MB", "written MB", "seconds"])
@@ -0,0 +1,85 @@
+# src/lumiera/backup/sources.py
+
+import os
+import stat
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterator
+
+
+def arcname_for(src: Path) -> str:
+    """
+    Archive name for a source root: relative to $HOME when possible, else its basename.
+    Mirrors what backup_job has always passed to tar.add().
+    """
+    try:
+        return str(src.relative_to(Path.home()))
+    except ValueError:
+        return src.name
+
+
+def safe_target(target: Path, arcname: str) -> Path:
+    """Where arcname lands under target; refuses absolute paths and `..` escapes."""
+    rel = Path(arcname)
+    if rel.is_absolute() or ".." in rel.parts:
+        raise ValueError(f"Refusing to restore unsafe path: {arcname}")
+    return target / rel
+
+
+def clear_for_link(out: Path) -> None:
+    """
+    Make room for a symlink or hardlink at out: a file or link there is removed, and so
+    is an empty directory. Like tar, a directory with contents is kept and refused.
+    """
+    if out.is_dir() and not out.is_symlink():
+        try:
+            out.rmdir()
+        except OSError:
+            raise ValueError(f"Refusing to replace non-empty directory {out} with a link")
+    elif out.is_symlink() or out.exists():
+        out.unlink()
+
+
+def match_any(arcname: str, patterns: list[str] | None) -> bool:
+    """
+    True if arcname matches one of the glob patterns, or lies under a directory that does.
+    No patterns means everything matches.
+    """
+    if not patterns:
+        return True
+    for pat in patterns:
+        pat = pat.rstrip('/')
+        if fnmatchcase(arcname, pat) or fnmatchcase(arcname, pat + '/*'):
+            return True
+    return False
+
+
+def walk_sources(sources: list[Path]) -> Iterator[tuple[Path, str, os.stat_result]]:
+    """
+    Yield (path, arcname, lstat) for every entry under sources, in the same
+    order tar.add() would visit them (parents first, children sorted by name).
+    Missing sources are skipped silently; callers report them.
+    """
+    for src in sources:
+        try:
+            st = os.lstat(src)
+        except FileNotFoundError:
+            continue
+        yield from _walk(src, arcname_for(src), st)
+
+
+def _walk(path: Path, arcname: str, st: os.stat_result):
+    yield path, arcname, st
+    if not stat.S_ISDIR(st.st_mode):
+        return
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return
+    for name in names:
+        child = path / name
+        try:
+            child_st = os.lstat(child)
+        except FileNotFoundError:
+            continue
+        yield from _walk(child, f"{arcname}/{name}", child_st)
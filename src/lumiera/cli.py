@@ -38,17 +38,76 @@ def main():
 
 
 @main.command()
-@click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
-def backup(job_name):
-    """Create a new versioned backup for the given job."""
-    backup_job(CONFIG_PATH, job_name)
+@click.option('--job', 'job_name', default=None, help='Name of the job defined in config.')
+@click.option('--all', 'run_all', is_flag=True, default=False, help='Back up every job in the config concurrently.')
+@click.option('--tag', 'tags', multiple=True, help='Back up every job carrying this tag (repeatable).')
+@click.option('--verify', is_flag=True, default=False, help='Re-hash every source file instead of trusting the stat cache.')
+@click.option('--jobs', 'jobs', type=click.IntRange(min=1), default=None, help='Worker threads for hashing and compression (default: CPU count).')
+@click.option('--io-limit', type=click.IntRange(min=1), default=2, show_default=True, help='With --all/--tag: destination disks written to at once.')
+def backup(job_name, run_all, tags, verify, jobs, io_limit):
+    """Create a new versioned backup for the given job(s)."""
+    if sum([bool(job_name), run_all, bool(tags)]) != 1:
+        raise click.UsageError("Pass exactly one of --job, --all or --tag.")
+    if job_name:
+        backup_job(CONFIG_PATH, job_name, verify=verify, jobs=jobs)
+        return
+
+    from lumiera.backup.jobs import load_config, select_jobs
+    from lumiera.backup.scheduler import run_jobs, summary_table
+    names = select_jobs(load_config(CONFIG_PATH), tags=list(tags))
+    if not names:
+        click.echo("No matching jobs in config.")
+        raise click.Abort()
+    results = run_jobs(CONFIG_PATH, names, io_limit=io_limit, cpu_limit=jobs, verify=verify)
+    click.echo(summary_table(results))
+    if any(r["status"] == "failed" for r in results):
+        sys.exit(1)
 
 @main.command()
 @click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
 @click.option('--version', type=int, default=None, help='Version number to restore (default: latest).')
-def restore(job_name, version):
+@click.option('--path', 'patterns', multiple=True, help='Only restore members matching this glob (repeatable), e.g. "Documents/*.toml".')
+@click.option('--list', 'list_only', is_flag=True, default=False, help='List the version\'s contents instead of restoring.')
+def restore(job_name, version, patterns, list_only):
     """Restore files for a given job and version."""
-    restore_job(CONFIG_PATH, job_name, version)
+    restore_job(CONFIG_PATH, job_name, version, patterns=list(patterns), list_only=list_only)
+
+@main.command("backup-history")
+@click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
+def backup_history_cli(job_name):
+    """Show when each version of a job was made, its size, source hash and duration."""
+    from lumiera.backup.jobs import backup_history
+    backup_history(CONFIG_PATH, job_name)
+
+@main.command("verify")
+@click.option('--job', 'job_name', required=True, help='Name of the job defined in config.')
+@click.option('--version', type=int, default=None, help='Version to verify, with the archives it depends on (default: latest).')
+@click.option('--all', 'all_versions', is_flag=True, default=False, help='Verify every version of the job.')
+@click.option('--jobs', 'jobs', type=click.IntRange(min=1), default=None, help='Worker threads (default: CPU count).')
+def verify_cli(job_name, version, all_versions, jobs):
+    """Re-read backup archives and check every member against its recorded checksum."""
+    from lumiera.backup.jobs import verify_job
+    if version is not None and all_versions:
+        raise click.UsageError("Pass at most one of --version or --all.")
+    if not verify_job(CONFIG_PATH, job_name, version=version, all_versions=all_versions, jobs=jobs):
+        sys.exit(1)
+
+@main.command("prune")
+@click.option('--job', 'job_name', default=None, help='Name of the job defined in config.')
+@click.option('--all', 'run_all', is_flag=True, default=False, help='Prune every job that has retention rules.')
+@click.option('--dry-run', is_flag=True, default=False, help='Only report what would be deleted.')
+def prune_cli(job_name, run_all, dry_run):
+    """Delete backup versions not kept by the job's retention rules."""
+    from lumiera.backup.jobs import get_job, load_config, prune, select_jobs
+    if bool(job_name) == run_all:
+        raise click.UsageError("Pass exactly one of --job or --all.")
+    if job_name:
+        names = [job_name]
+    else:
+        config = load_config(CONFIG_PATH)
+        names = [n for n in select_jobs(config) if get_job(config, n).get('retention')]
+    for name in names:
+        prune(CONFIG_PATH, name, dry_run=dry_run)
 
 @main.command("export-project")
 @click.option(
@@ -67,18 +126,110 @@ def restore(job_name, version):
     "--include-env", is_flag=True, default=False,
     help="Include .env files in export."
 )
-def export_project_cli(root, output_path, include_env, include_list):
+@click.option(
+    "--workers", type=click.IntRange(min=1), default=8, show_default=True,
+    help="Threads reading files ahead; output order is unchanged."
+)
+@click.option(
+    "--no-cache", is_flag=True, default=False,
+    help="Re-read every file instead of reusing blocks cached by earlier runs."
+)
+@click.option(
+    "--since", default=None,
+    help="Only export files changed since this git ref or timestamp (ISO date or epoch seconds), without the tree."
+)
+@click.option(
+    "--max-tokens", type=click.IntRange(min=1), default=None,
+    help="Approximate token budget for the whole export; large, peripheral files are truncated or summarised."
+)
+@click.option(
+    "--max-bytes", type=click.IntRange(min=1), default=None,
+    help="Byte budget for the whole export, applied like --max-tokens."
+)
+@click.option(
+    "--no-ignore", is_flag=True, default=False,
+    help="Also export files matched by .gitignore / .lumieraignore."
+)
+@click.option(
+    "--format", "fmt", type=click.Choice(["markdown", "jsonl", "tar"]), default="markdown", show_default=True,
+    help="jsonl: one {path, language, size, sha256, content} record per file; tar: the files as-is. Neither has the tree."
+)
+@click.option(
+    "--query", "query", multiple=True,
+    help="Only export indexed files matching this path glob (repeatable), e.g. 'src/*.py' or 'cli.py'. "
+         "Needs `lumiera index build`; the tree is not walked."
+)
+@click.option(
+    "--grep", default=None,
+    help="Only export indexed files containing this text (case-insensitive); combines with --query."
+)
+@click.option(
+    "--max-file-bytes", type=click.IntRange(min=0), default=1024 * 1024, show_default=True,
+    help="Export larger files as a one-line placeholder; 0 for no limit. Files over 256 KiB are streamed from disk."
+)
+def export_project_cli(root, output_path, include_env, include_list, workers, no_cache, since, max_tokens, max_bytes,
+                       no_ignore, fmt, query, grep, max_file_bytes):
     """
     Exports the folder structure and all relevant project files for context.
     """
     from lumiera.export.project import export_project
     # build a set of overrides (strip whitespace, ignore empty)
     overrides = {name.strip() for name in include_list.split(",") if name.strip()}
-    export_project(
-        root,
-        output_path=output_path,
-        include_env=include_env,
-        include_list=overrides
+    if fmt != "markdown" and (max_tokens is not None or max_bytes is not None):
+        raise click.UsageError("--max-tokens and --max-bytes only apply to --format markdown.")
+    try:
+        export_project(
+            root,
+            output_path=output_path,
+            include_env=include_env,
+            include_list=overrides,
+            workers=workers,
+            use_cache=not no_cache,
+            since=since,
+            max_tokens=max_tokens,
+            max_bytes=max_bytes,
+            use_ignore=not no_ignore,
+            fmt=fmt,
+            query=list(query),
+            grep=grep,
+            max_file_bytes=max_file_bytes or None
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--query" if query or grep is not None else "--since")
+
+@main.group("index")
+def index_cli():
+    """Persistent file index used by `export-project --query` / `--grep`."""
+    pass
+
+@index_cli.command("build")
+@click.option(
+    "--root", "root", required=True, type=click.Path(exists=True, file_okay=False),
+    help="Root folder to index; the files export-project would dump from it are recorded."
+)
+@click.option(
+    "--include", "include_list", default="",
+    help="Comma-separated list of filenames or extensions to always include, as for export-project."
+)
+@click.option("--include-env", is_flag=True, default=False, help="Include .env files.")
+@click.option("--no-ignore", is_flag=True, default=False, help="Also index files matched by .gitignore / .lumieraignore.")
+@click.option("--trigrams", is_flag=True, default=False, help="Also index file contents, so --grep only opens files that can match.")
+@click.option("--workers", type=click.IntRange(min=1), default=8, show_default=True, help="Threads reading files.")
+def index_build_cli(root, include_list, include_env, no_ignore, trigrams, workers):
+    """Build or refresh the index of a root; only files whose size or mtime changed are read."""
+    import time
+    from lumiera.export.index import ProjectIndex
+    overrides = {name.strip() for name in include_list.split(",") if name.strip()}
+    started = time.monotonic()
+    index = ProjectIndex()
+    try:
+        counts = index.build(root, include_env=include_env, overrides=overrides, use_ignore=not no_ignore,
+                             with_trigrams=trigrams, workers=workers)
+    finally:
+        index.close()
+    click.echo(
+        f"Indexed {counts['files']} files ({counts['read']} read, {counts['removed']} removed) "
+        f"in {time.monotonic() - started:.2f}s"
     )
 
 @main.command("pypi-availability")
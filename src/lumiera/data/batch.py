@@ -0,0 +1,216 @@
+# src/lumiera/data/batch.py
+"""
+Batch-API submission for bulk chat completions.
+
+run_batch() writes every request to a JSONL batch file (one
+{"custom_id", "method", "url", "body"} line each), submits it through a backend,
+polls until the batch is finished and maps the answers back by custom_id. Requests
+beyond the API's per-batch limits (MAX_BATCH_REQUESTS lines, MAX_BATCH_BYTES of file)
+are split over several batches. The submitted batches are remembered in a state file
+next to the batch file, so a run that is stopped, or started with wait=False, picks
+them up again instead of paying for them twice.
+
+Backends:
+- "openai": the OpenAI Batch API (files + batches endpoints, 24h completion window).
+- "local": a directory-based stand-in that answers each request with a local
+  function as soon as the batch is polled, for tests and dry runs.
+"""
+
+import hashlib
+import json
+import time
+import uuid
+from pathlib import Path
+
+from lumiera.data.prompt_cache import default_cache_path, request_key
+
+ENDPOINT = "/v1/chat/completions"
+POLL_SECONDS = 30
+
+# the Batch API takes at most 50,000 requests and a 200 MB input file per batch
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_BYTES = 200 * 1000 * 1000
+
+# statuses after which a batch produces no more output
+TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+
+def batch_line(custom_id: str, body: dict) -> bytes:
+    line = {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+    return (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_batch_file(path: Path, requests: dict) -> None:
+    """requests maps custom_id to the request body."""
+    with open(path, "wb") as f:
+        for custom_id, body in requests.items():
+            f.write(batch_line(custom_id, body))
+
+
+def split_requests(requests: dict, max_requests: int = MAX_BATCH_REQUESTS,
+                   max_bytes: int = MAX_BATCH_BYTES) -> list[dict]:
+    """Split requests, in order, into parts that each fit in one batch."""
+    parts, part, size = [], {}, 0
+    for custom_id, body in requests.items():
+        line_size = len(batch_line(custom_id, body))
+        if part and (len(part) == max_requests or size + line_size > max_bytes):
+            parts.append(part)
+            part, size = {}, 0
+        part[custom_id] = body
+        size += line_size
+    if part:
+        parts.append(part)
+    return parts
+
+
+def part_path(batch_path: Path, index: int) -> Path:
+    """The batch file of part index: batch_path itself for the first, name-N.jsonl after it."""
+    return batch_path if index == 0 else batch_path.with_name(f"{batch_path.stem}-{index}{batch_path.suffix}")
+
+
+class OpenAIBatchBackend:
+    def submit(self, path: Path) -> str:
+        import openai
+        with open(path, "rb") as f:
+            batch_file = openai.files.create(file=f, purpose="batch")
+        batch = openai.batches.create(input_file_id=batch_file.id, endpoint=ENDPOINT, completion_window="24h")
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        import openai
+        return openai.batches.retrieve(batch_id).status
+
+    def output(self, batch_id: str) -> list[dict]:
+        """The output and error lines of a finished batch."""
+        import openai
+        batch = openai.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(json.loads(line) for line in openai.files.content(file_id).text.splitlines() if line)
+        return lines
+
+
+def local_answer(body: dict) -> str:
+    return "local-" + hashlib.sha1(json.dumps(body.get("messages", []), sort_keys=True).encode()).hexdigest()[:12]
+
+
+class LocalBatchBackend:
+    """Batches live in root/<id>/; answer(body) -> str produces each answer (local_answer by default)."""
+
+    def __init__(self, root: Path | None = None, answer=local_answer):
+        self.root = Path(root) if root else default_cache_path().parent / "batches"
+        self.answer = answer
+
+    def submit(self, path: Path) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:16]}"
+        (self.root / batch_id).mkdir(parents=True)
+        (self.root / batch_id / "input.jsonl").write_bytes(Path(path).read_bytes())
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        folder = self.root / batch_id
+        if not (folder / "output.jsonl").exists():
+            with open(folder / "input.jsonl", encoding="utf-8") as src, \
+                    open(folder / "output.jsonl", "w", encoding="utf-8") as out:
+                for line in src:
+                    request = json.loads(line)
+                    body = {"choices": [{"index": 0, "finish_reason": "stop", "message": {
+                        "role": "assistant", "content": self.answer(request["body"])}}]}
+                    result = {"id": f"batch_req_{uuid.uuid4().hex[:16]}", "custom_id": request["custom_id"],
+                              "response": {"status_code": 200, "body": body}, "error": None}
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return "completed"
+
+    def output(self, batch_id: str) -> list[dict]:
+        with open(self.root / batch_id / "output.jsonl", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+BACKENDS = {"openai": OpenAIBatchBackend, "local": LocalBatchBackend}
+
+
+def parse_output(lines) -> tuple[dict, dict]:
+    """({custom_id: answer}, {custom_id: error message}) from batch output lines."""
+    answers, errors = {}, {}
+    for line in lines:
+        custom_id = line.get("custom_id")
+        response = line.get("response") or {}
+        if response.get("status_code") == 200:
+            choice = response["body"]["choices"][0]
+            content = choice["message"].get("content")
+            if content is None:
+                # refusals and filtered completions come back as 200 without content
+                errors[custom_id] = (choice["message"].get("refusal")
+                                     or f"no content (finish_reason {choice.get('finish_reason')})")
+            else:
+                answers[custom_id] = content.strip()
+        else:
+            error = line.get("error") or (response.get("body") or {}).get("error") or {}
+            errors[custom_id] = error.get("message") or f"status {response.get('status_code')}"
+    return answers, errors
+
+
+def run_batch(requests: dict, backend, batch_path: Path, wait: bool = True, poll_seconds: float = POLL_SECONDS,
+              cache=None, max_requests: int = MAX_BATCH_REQUESTS,
+              max_bytes: int = MAX_BATCH_BYTES) -> tuple[dict, dict] | None:
+    """
+    Answer requests ({custom_id: request body}) through backend, in as many batches as
+    the limits need. Returns ({custom_id: answer}, {custom_id: error}) once every batch
+    is finished, or None if wait is off and some are still running. With cache (a
+    PromptCache), requests answered before are not submitted, and new answers are stored.
+    """
+    batch_path = Path(batch_path)
+    state_path = batch_path.with_suffix(".state.json")
+    answers = {}
+    if cache is not None:
+        for custom_id, body in requests.items():
+            answer = cache.get(body)
+            if answer is not None:
+                answers[custom_id] = answer
+    pending = {custom_id: body for custom_id, body in requests.items() if custom_id not in answers}
+    if not pending:
+        return answers, {}
+
+    # a saved batch is only picked up if every request in it is still wanted, unchanged
+    keys = {custom_id: request_key(body) for custom_id, body in pending.items()}
+    state = json.loads(state_path.read_text()) if state_path.exists() else {}
+    batches = [b for b in state.get("batches", [])
+               if all(keys.get(custom_id) == key for custom_id, key in b["requests"].items())]
+    for batch in batches:
+        print(f"Picking up batch {batch['batch_id']}")
+    submitted = {custom_id for batch in batches for custom_id in batch["requests"]}
+    rest = {custom_id: body for custom_id, body in pending.items() if custom_id not in submitted}
+    for part in split_requests(rest, max_requests, max_bytes) if rest else []:
+        path = part_path(batch_path, len(batches))
+        write_batch_file(path, part)
+        batch_id = backend.submit(path)
+        batches.append({"batch_id": batch_id, "requests": {custom_id: keys[custom_id] for custom_id in part}})
+        # saved after every submit, so a run stopped halfway does not submit the same part twice
+        state_path.write_text(json.dumps({"batches": batches}))
+        print(f"Submitted batch {batch_id} ({len(part)} requests)")
+
+    statuses = {}
+    for batch in batches:
+        batch_id = batch["batch_id"]
+        while (status := backend.status(batch_id)) not in TERMINAL:
+            if not wait:
+                print(f"Batch {batch_id} is {status}; rerun to collect it")
+                return None
+            time.sleep(poll_seconds)
+        statuses[batch_id] = status
+
+    errors = {}
+    for batch in batches:
+        fresh, failed = parse_output(backend.output(batch["batch_id"]))
+        for custom_id in batch["requests"]:
+            if custom_id in fresh:
+                answers[custom_id] = fresh[custom_id]
+                if cache is not None:
+                    cache.put(pending[custom_id], fresh[custom_id])
+            else:
+                errors[custom_id] = failed.get(custom_id) or f"no result (batch {statuses[batch['batch_id']]})"
+    state_path.unlink(missing_ok=True)
+    for index in range(max(len(batches), len(state.get("batches", [])))):
+        part_path(batch_path, index).unlink(missing_ok=True)
+    return answers, errors
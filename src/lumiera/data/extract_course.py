@@ -9,6 +9,9 @@ from PIL import Image
 import pytesseract
 from dotenv import load_dotenv
 
+from lumiera.data.batch import BACKENDS, run_batch
+from lumiera.data.prompt_cache import PromptCache
+
 # —————————————————————————————
 # HELPER: Determine package name dynamically
 # —————————————————————————————
@@ -88,12 +91,12 @@ def split_course_and_weeks(raw: str) -> (str, List[Dict]):
 # 2) DESCRIPTION FORMATTER (uses OpenAI)
 # —————————————————————————————————————————————————————
 
-def format_description(
+def description_request(
     name: str,
     text: str,
     is_course: bool = False,
     max_sentences: int = 1
-) -> str:
+) -> dict:
     system = {
         "role": "system",
         "content": (
@@ -120,19 +123,46 @@ def format_description(
         "content": f"{instruction}\n\nContent:\n{text}"
     }
 
-    resp = openai.chat.completions.create(
-        model="gpt-4o",
-        messages=[system, user],
-        max_completion_tokens=max_sentences * 40,
-    )
+    return {
+        "model": "gpt-4o",
+        "messages": [system, user],
+        "max_completion_tokens": max_sentences * 40,
+    }
 
+def format_description(
+    name: str,
+    text: str,
+    is_course: bool = False,
+    max_sentences: int = 1,
+    cache: PromptCache = None
+) -> str:
+    request = description_request(name, text, is_course=is_course, max_sentences=max_sentences)
+    if cache is not None:
+        return cache.wrap(chat)(request)
+    return chat(request)
+
+def chat(request: dict) -> str:
+    resp = openai.chat.completions.create(**request)
     return resp.choices[0].message.content.strip()
 
 # —————————————————————————————————————————————————————
 # 3) MAIN: DRY-RUN MODE + JSON BUILD
 # —————————————————————————————————————————————————————
 
-def build_course_json(image_files: List[str], output_path: str, dry_run: bool):
+def batch_descriptions(course_data: dict, backend, output_path: str, cache: PromptCache = None):
+    """Fill in every short_description through one batch job (see lumiera.data.batch), waiting for it."""
+    requests = {"course": description_request("", course_data["full_description"], is_course=True, max_sentences=2)}
+    for i, chap in enumerate(course_data["chapters"]):
+        requests[f"chapter-{i}"] = description_request(chap["name"], chap["full_description"])
+    answers, errors = run_batch(requests, backend, Path(output_path).with_suffix(".batch.jsonl"), cache=cache)
+    if errors:
+        raise RuntimeError(f"{len(errors)} descriptions failed in the batch: {errors}")
+    course_data["short_description"] = answers["course"]
+    for i, chap in enumerate(course_data["chapters"]):
+        chap["short_description"] = answers[f"chapter-{i}"]
+
+def build_course_json(image_files: List[str], output_path: str, dry_run: bool, cache: PromptCache = None,
+                      batch_backend=None):
     raw_text = ocr_images([Path(f) for f in image_files])
     print("\n\n===== RAW OCR TEXT =====\n")
     print(raw_text)
@@ -147,13 +177,16 @@ def build_course_json(image_files: List[str], output_path: str, dry_run: bool):
         "chapters": chapters
     }
 
-    if not dry_run:
+    if not dry_run and batch_backend is not None:
+        batch_descriptions(course_data, batch_backend, output_path, cache=cache)
+    elif not dry_run:
         # course-level summary
         course_data["short_description"] = format_description(
             name="",
             text=course_data["full_description"],
             is_course=True,
-            max_sentences=2
+            max_sentences=2,
+            cache=cache
         )
         # chapter-level summaries
         for chap in course_data["chapters"]:
@@ -161,7 +194,8 @@ def build_course_json(image_files: List[str], output_path: str, dry_run: bool):
                 name=chap["name"],
                 text=chap["full_description"],
                 is_course=False,
-                max_sentences=1
+                max_sentences=1,
+                cache=cache
             )
    
 
@@ -190,7 +224,25 @@ if __name__ == "__main__":
         "--dry-run", action="store_true",
         help="Skip any API calls, just print OCR & JSON skeleton"
     )
+    p.add_argument(
+        "--no-cache", action="store_true",
+        help="Call the API again instead of replaying answers cached by earlier runs"
+    )
+    p.add_argument(
+        "--batch", action="store_true",
+        help="Send every description as one Batch API job (cheaper, answered within 24h) and wait for it"
+    )
+    p.add_argument(
+        "--batch-backend", choices=sorted(BACKENDS), default="openai",
+        help="Where --batch jobs go; 'local' answers them with placeholders, for testing"
+    )
     args = p.parse_args()
 
-    build_course_json(args.images, args.output, dry_run=args.dry_run)
+    cache = None if args.no_cache else PromptCache()
+    backend = BACKENDS[args.batch_backend]() if args.batch else None
+    try:
+        build_course_json(args.images, args.output, dry_run=args.dry_run, cache=cache, batch_backend=backend)
+    finally:
+        if cache is not None:
+            cache.close()
     print(f"Written {args.output}")
@@ -4,32 +4,20 @@ import os
 import re
 import json
 from pathlib import Path
-from urllib.parse import urlparse
 
 import pandas as pd
 import openai
 from dotenv import load_dotenv
 
+from lumiera.data.batch import BACKENDS, run_batch
+from lumiera.data.journal import Journal
+from lumiera.data.lessons import ChapterContext, lesson_names
+from lumiera.data.llm import DEFAULT_CONCURRENCY, MAX_RETRIES, complete_all
+from lumiera.data.prompt_cache import PromptCache
 
-# —————————————————————————————
-# pull only the sentence(s) in chapter_desc that mention words from lesson_name
-# —————————————————————————————
-import re
+MODEL = "gpt-4o"
+MAX_COMPLETION_TOKENS = 100
 
-def extract_relevant_context(chapter_desc: str, lesson_name: str) -> str:
-    """
-    Return the first sentence in chapter_desc that contains any keyword from lesson_name.
-    If none match, return empty string.
-    """
-    # split into sentences
-    sentences = re.split(r'(?<=[.!?])\s+', chapter_desc)
-    # get alphanumeric tokens from the lesson title
-    keywords = re.findall(r"[A-Za-z0-9]+", lesson_name)
-    for sent in sentences:
-        lower = sent.lower()
-        if any(kw.lower() in lower for kw in keywords):
-            return sent.strip()
-    return ""
 
 # —————————————————————————————
 # HELPER: Determine package name dynamically
@@ -64,21 +52,11 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 if not openai.api_key:
     raise RuntimeError("OPENAI_API_KEY not found in environment or .env file")
 
-# —————————————————————————————
-# HELPER: Extract a clean lesson name from the URL
-# —————————————————————————————
-def extract_lesson_name(url: str) -> str:
-    path = urlparse(url).path.rstrip('/')
-    last = path.split('/')[-1]
-    no_pref = re.sub(r'^\d+[_-]?', '', last)
-    no_suf = re.sub(r'[-_]\d+$', '', no_pref)
-    text = re.sub(r'[-_]+', ' ', no_suf).strip()
-    return text.title()
-
 # —————————————————————————————
 # DESCRIPTION GENERATOR HELPER
 # —————————————————————————————
-def generate_lesson_description(chapter_desc: str, lesson_name: str) -> str:
+def lesson_request(chapter_desc: str, lesson_name: str) -> dict:
+    """The chat-completion arguments describing one lesson."""
     system = {
         "role": "system",
         "content": (
@@ -110,13 +88,19 @@ def generate_lesson_description(chapter_desc: str, lesson_name: str) -> str:
         "role": "user",
         "content": user_content
     }
-    resp = openai.chat.completions.create(
-        model="gpt-4o",
-        messages=[system, user],
-        max_completion_tokens=100,
-    )
+    return {
+        "model": MODEL,
+        "messages": [system, user],
+        "max_completion_tokens": MAX_COMPLETION_TOKENS,
+    }
+
+def chat(request: dict) -> str:
+    resp = openai.chat.completions.create(**request)
     return resp.choices[0].message.content.strip()
 
+def generate_lesson_description(chapter_desc: str, lesson_name: str) -> str:
+    return chat(lesson_request(chapter_desc, lesson_name))
+
 # —————————————————————————————
 # ENTRYPOINT: LOAD JSON & CSV, GENERATE DESCRIPTIONS
 # —————————————————————————————
@@ -144,6 +128,42 @@ if __name__ == "__main__":
         help="Optional chapter range to process (e.g. 2-3)",
         default=None
     )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="Requests in flight at once"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=None,
+        help="Requests-per-minute limit of the API key"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=None,
+        help="Tokens-per-minute limit of the API key"
+    )
+    parser.add_argument(
+        "--max-retries", type=int, default=MAX_RETRIES,
+        help="Retries per request on rate limits and server errors"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Call the API for every lesson instead of replaying answers cached by earlier runs"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Skip lessons finished by an interrupted run (kept in <output>.journal.jsonl)"
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Submit every lesson as one Batch API job (cheaper, answered within 24h) instead of one call each"
+    )
+    parser.add_argument(
+        "--batch-backend", choices=sorted(BACKENDS), default="openai",
+        help="Where --batch jobs go; 'local' answers them with placeholders, for testing"
+    )
+    parser.add_argument(
+        "--no-wait", action="store_true",
+        help="With --batch: submit or check on the job and exit; rerun the same command to collect it"
+    )
     args = parser.parse_args()
 
     # load chapter JSON
@@ -163,9 +183,9 @@ if __name__ == "__main__":
     df['link'] = df['link'].fillna('').astype(str)
     # only extract name if not already present or empty
     if 'name' not in df.columns:
-        df['name'] = df['link'].apply(extract_lesson_name)
+        df['name'] = lesson_names(df['link'])
     else:
-        df['name'] = df['name'].fillna(df['link'].apply(extract_lesson_name))
+        df['name'] = df['name'].fillna(lesson_names(df['link']))
 
     # parse optional range
     allowed = None
@@ -176,30 +196,83 @@ if __name__ == "__main__":
         start, end = map(int, m.groups())
         allowed = set(range(start, end + 1))
 
-    # generate descriptions
-    descriptions = []
-    for _, row in df.iterrows():
+    # every finished lesson is journaled as it comes in; a resumed run starts from there
+    journal = Journal(Path(args.output).with_suffix(".journal.jsonl"), resume=args.resume)
+    links = df['link'].tolist()
+    finished = {
+        rec["row"]: rec["description"] for rec in journal.load()
+        if rec.get("row") in range(len(df)) and links[rec["row"]] == rec.get("link")
+    }
+    if args.resume:
+        print(f"Resuming: {len(finished)} lessons already done")
+
+    # build one request per lesson in range
+    descriptions = [""] * len(df)
+    for pos, description in finished.items():
+        descriptions[pos] = description
+    positions, requests = [], []
+    # each chapter is split into sentences once, however many lessons it has
+    contexts = {idx: ChapterContext(desc) for idx, desc in chap_map.items()}
+    no_context = ChapterContext("")
+    raw_indexes = df['chapter_index'] if 'chapter_index' in df.columns else [None] * len(df)
+    for pos, (raw_idx, name) in enumerate(zip(raw_indexes, df['name'])):
         # safely parse chapter_index, skip if invalid
-        raw_idx = row.get('chapter_index')
         try:
             chap_idx = int(raw_idx)
         except (ValueError, TypeError):
-            descriptions.append("")
             continue
-        # 2) EXTRACT only the sentence(s) relevant to this lesson
-        raw_context = chap_map.get(chap_idx, "")
-        chapter_desc = extract_relevant_context(raw_context, row['name'])
-        chap_idx = int(row['chapter_index'])
-        if chap_idx is not None and (allowed is None or chap_idx in allowed):
-            lesson_name = row['name']
-            descriptions.append(
-                generate_lesson_description(chapter_desc, lesson_name)
+        if (allowed is not None and chap_idx not in allowed) or pos in finished:
+            continue
+        # EXTRACT only the sentence(s) relevant to this lesson
+        chapter_desc = contexts.get(chap_idx, no_context).relevant(name)
+        positions.append(pos)
+        requests.append(lesson_request(chapter_desc, name))
+
+    # generate descriptions concurrently or as one batch job; answers come back in request order
+    def checkpoint(i, answer):
+        journal.append({"row": positions[i], "link": links[positions[i]], "description": answer})
+
+    cache = None if args.no_cache else PromptCache()
+    try:
+        if args.batch:
+            result = run_batch(
+                {f"row-{pos}": request for pos, request in zip(positions, requests)},
+                BACKENDS[args.batch_backend](), Path(args.output).with_suffix(".batch.jsonl"),
+                wait=not args.no_wait, cache=cache,
             )
+            if result is None:
+                journal.close()
+                raise SystemExit(0)
+            batch_answers, errors = result
+            answers = [batch_answers.get(f"row-{pos}", "") for pos in positions]
+            for i, pos in enumerate(positions):
+                if f"row-{pos}" in batch_answers:
+                    checkpoint(i, answers[i])
+            if errors:
+                raise RuntimeError(f"{len(errors)} lessons failed in the batch, e.g.: {next(iter(errors.values()))}")
+            print(f"Collected {len(answers)} descriptions from the batch")
         else:
-            descriptions.append("")
+            answers, stats = complete_all(
+                requests, chat,
+                concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm, max_retries=args.max_retries,
+                cache=cache, on_answer=checkpoint,
+            )
+            print(f"Generated {len(answers)} descriptions ({stats['cached']} from cache, {stats['retries']} retries)")
+    except SystemExit:
+        raise
+    except BaseException:
+        journal.close()
+        print(f"Interrupted; rerun with --resume to continue from {journal.path}")
+        raise
+    finally:
+        if cache is not None:
+            cache.close()
+    for pos, answer in zip(positions, answers):
+        descriptions[pos] = answer
 
-    # save output
+    # merge: save output, then drop the journal it supersedes
     df['description'] = descriptions
     df[['name', 'description', 'link']].to_csv(args.output, index=False)
+    journal.close(remove=True)
     print(f"Saved {len(df)} lessons to {args.output}")
 
@@ -0,0 +1,56 @@
+# src/lumiera/data/journal.py
+"""
+Append-only JSONL checkpoint for long data-pipeline runs.
+
+Every finished row is written as one line and flushed at once, so a run that dies
+leaves behind everything it completed. A resumed run reads the journal back, skips
+those rows, and merges them into its output at the end. A line torn by the crash
+is ignored.
+"""
+
+import json
+import threading
+from pathlib import Path
+
+
+class Journal:
+    """Thread-safe appender; opened with resume, the existing lines are kept and read by load()."""
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.records, torn = self._read() if resume else ([], False)
+        self.file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if torn:
+            # end the torn line so the next record starts on its own
+            self.file.write("\n")
+
+    def _read(self) -> tuple[list[dict], bool]:
+        """(records, whether the last line is unterminated)."""
+        records, line = [], "\n"
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return records, not line.endswith("\n")
+
+    def load(self) -> list[dict]:
+        """The records journaled before this run (none unless resuming)."""
+        return self.records
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self, remove: bool = False) -> None:
+        """Close the journal; remove it once its rows are safely merged into the output."""
+        self.file.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,103 @@
+# src/lumiera/data/lessons.py
+"""
+Lesson names and chapter context for the lesson sheets.
+
+extract_lesson_name() and extract_relevant_context() work on one lesson at a time.
+lesson_names() does the same as extract_lesson_name() for a whole column with
+pandas string operations, and ChapterContext splits a chapter description into
+sentences once, so matching thousands of lessons against it only searches text
+that is already lowercased. Both give exactly the results of the per-lesson
+functions.
+"""
+
+import re
+from bisect import bisect_right
+from urllib.parse import urlparse, uses_params
+
+import pandas as pd
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+KEYWORD = re.compile(r"[A-Za-z0-9]+")
+
+# urlparse's pieces of a URL: leading space/control characters are dropped, tabs and
+# newlines removed anywhere, then "scheme:" and "//netloc" come off the front and
+# "?query" / "#fragment" off the end
+_URL_LEAD = "".join(map(chr, range(0x21)))
+_URL_UNSAFE = r"[\t\r\n]"
+_URL_SCHEME_PATH = r"^(?:([A-Za-z][A-Za-z0-9+.\-]*):)?(?://[^/?#]*)?([^?#]*)"
+
+
+def extract_lesson_name(url: str) -> str:
+    """'https://rebelway.academy/topic/04_functions-5/' -> 'Functions'."""
+    path = urlparse(url).path.rstrip('/')
+    last = path.split('/')[-1]
+    no_pref = re.sub(r'^\d+[_-]?', '', last)
+    no_suf = re.sub(r'[-_]\d+$', '', no_pref)
+    text = re.sub(r'[-_]+', ' ', no_suf).strip()
+    return text.title()
+
+
+def lesson_names(links: pd.Series) -> pd.Series:
+    """extract_lesson_name() of every link; missing links stay missing."""
+    urls = links.str.lstrip(_URL_LEAD).str.replace(_URL_UNSAFE, "", regex=True)
+    parts = urls.str.extract(_URL_SCHEME_PATH)
+    path = parts[1]
+    # ";params" only count as such for the schemes urlparse knows take them
+    params = parts[0].fillna("").str.lower().isin(uses_params)
+    path = path.where(~params, path.str.replace(r";[^/]*$", "", regex=True))
+    last = path.str.rstrip('/').str.replace(r"^.*/", "", regex=True)
+    return (
+        last.str.replace(r'^\d+[_-]?', '', regex=True)
+        .str.replace(r'[-_]\d+$', '', regex=True)
+        .str.replace(r'[-_]+', ' ', regex=True)
+        .str.strip()
+        .str.title()
+    )
+
+
+def extract_relevant_context(chapter_desc: str, lesson_name: str) -> str:
+    """
+    Return the first sentence in chapter_desc that contains any keyword from lesson_name.
+    If none match, return empty string.
+    """
+    sentences = SENTENCE_END.split(chapter_desc)
+    keywords = KEYWORD.findall(lesson_name)
+    for sent in sentences:
+        lower = sent.lower()
+        if any(kw.lower() in lower for kw in keywords):
+            return sent.strip()
+    return ""
+
+
+class ChapterContext:
+    """
+    A chapter description split into sentences once. relevant(lesson_name) equals
+    extract_relevant_context(chapter_desc, lesson_name); where each keyword first
+    occurs is looked up once per chapter and remembered.
+    """
+
+    def __init__(self, chapter_desc: str):
+        self.sentences = SENTENCE_END.split(chapter_desc)
+        # lowercased sentences joined by a character no keyword contains, so a match
+        # never spans two sentences; starts[i] is where sentence i begins
+        lowered = [sent.lower() for sent in self.sentences]
+        self.text = "\0".join(lowered)
+        self.starts, pos = [], 0
+        for sent in lowered:
+            self.starts.append(pos)
+            pos += len(sent) + 1
+        self.first = {}
+
+    def first_sentence(self, keyword: str) -> int:
+        """Index of the first sentence containing keyword (lowercase), or len(sentences)."""
+        index = self.first.get(keyword)
+        if index is None:
+            pos = self.text.find(keyword)
+            index = len(self.sentences) if pos < 0 else bisect_right(self.starts, pos) - 1
+            self.first[keyword] = index
+        return index
+
+    def relevant(self, lesson_name: str) -> str:
+        keywords = KEYWORD.findall(lesson_name)
+        index = min((self.first_sentence(kw.lower()) for kw in keywords), default=len(self.sentences))
+        return self.sentences[index].strip() if index < len(self.sentences) else ""
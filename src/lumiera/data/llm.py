@@ -0,0 +1,158 @@
+# src/lumiera/data/llm.py
+"""
+Concurrent chat-completion calls for the data scripts.
+
+complete_all() runs one call per request on a thread pool and returns the answers in
+request order. Requests wait on a RateLimiter (requests and tokens per minute, as the
+API enforces them) before they are sent, and 429s and 5xx errors are retried after
+the server's Retry-After, or a jittered exponential backoff if it sends none.
+The call itself is passed in, so the engine works with any client and against
+`tests/stub_chat_server.py` as well as the real API.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+DEFAULT_CONCURRENCY = 8
+MAX_RETRIES = 6
+
+# backoff before retry n (from 0) is uniform in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)]
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# the API counts ~4 characters of prompt per token, plus the completion allowance
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(request: dict) -> int:
+    """What a request counts against a tokens-per-minute limit."""
+    chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+    return chars // CHARS_PER_TOKEN + request.get("max_completion_tokens", 0)
+
+
+class RateLimiter:
+    """
+    Request and token buckets refilled continuously to rpm / tpm per minute (None for
+    no limit). Both start full, so the first minute's worth goes out at once.
+    """
+
+    def __init__(self, rpm: int | None = None, tpm: int | None = None):
+        self.limits = (rpm, tpm)
+        self.levels = [float(rpm or 0), float(tpm or 0)]
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until one request and tokens (capped at the bucket size) are available, and take them."""
+        needs = (1, tokens)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                elapsed, self.updated = now - self.updated, now
+                wait_for = 0.0
+                for i, limit in enumerate(self.limits):
+                    if limit is None:
+                        continue
+                    self.levels[i] = min(limit, self.levels[i] + elapsed * limit / 60)
+                    deficit = min(needs[i], limit) - self.levels[i]
+                    if deficit > 0:
+                        wait_for = max(wait_for, deficit * 60 / limit)
+                if wait_for == 0:
+                    for i, limit in enumerate(self.limits):
+                        if limit is not None:
+                            self.levels[i] -= min(needs[i], limit)
+                    return
+            time.sleep(wait_for)
+
+
+def status_code(exc: Exception) -> int | None:
+    """HTTP status of an API error (openai's APIStatusError, urllib's HTTPError), if it has one."""
+    code = getattr(exc, "status_code", None)
+    return code if code is not None else getattr(exc, "code", None)
+
+
+def retry_after(exc: Exception) -> float | None:
+    """The Retry-After the server sent with an error, in seconds."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    try:
+        return float(headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class _Stats(dict):
+    """Counters shared by the worker threads."""
+
+    def __init__(self):
+        super().__init__(retries=0, cached=0)
+        self.lock = threading.Lock()
+
+    def add(self, key: str) -> None:
+        with self.lock:
+            self[key] += 1
+
+
+def call_with_retry(call, request: dict, limiter: RateLimiter, max_retries: int = MAX_RETRIES, stats=None):
+    """call(request) once the limiter allows it, retrying rate limits and server errors."""
+    for attempt in range(max_retries + 1):
+        limiter.acquire(estimate_tokens(request))
+        try:
+            return call(request)
+        except Exception as exc:
+            code = status_code(exc)
+            if not isinstance(code, int) or not (code == 429 or code >= 500) or attempt == max_retries:
+                raise
+            delay = retry_after(exc)
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            if stats is not None:
+                stats.add("retries")
+            time.sleep(delay)
+
+
+def complete_all(requests, call, concurrency: int = DEFAULT_CONCURRENCY, rpm: int | None = None,
+                 tpm: int | None = None, max_retries: int = MAX_RETRIES, cache=None,
+                 on_answer=None) -> tuple[list, dict]:
+    """
+    call(request) for every request dict ({"messages", "max_completion_tokens", ...}),
+    at most concurrency at a time and within rpm / tpm. Returns (answers in request
+    order, {"retries": n, "cached": n}). With cache (a PromptCache), requests answered
+    before are not sent and do not count against the limits, and new answers are
+    stored as they arrive. on_answer(index, answer) is called from the worker thread
+    as each answer comes in, e.g. to checkpoint it. The first request that still
+    fails after its retries cancels the rest and is raised.
+    """
+    requests = list(requests)
+    limiter = RateLimiter(rpm, tpm)
+    stats = _Stats()
+    results = [None] * len(requests)
+
+    def run(i):
+        if cache is not None:
+            answer = cache.get(requests[i])
+            if answer is not None:
+                stats.add("cached")
+                results[i] = answer
+        if results[i] is None:
+            results[i] = call_with_retry(call, requests[i], limiter, max_retries, stats)
+            if cache is not None:
+                cache.put(requests[i], results[i])
+        if on_answer is not None:
+            on_answer(i, results[i])
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = [pool.submit(run, i) for i in range(len(requests))]
+        try:
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        except BaseException:
+            # Ctrl-C: drop the queued requests instead of sending them all on the way out
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        for future in pending:
+            future.cancel()
+        for future in done:
+            future.result()
+    return results, dict(stats)
@@ -0,0 +1,86 @@
+# src/lumiera/data/prompt_cache.py
+"""
+Disk cache of chat-completion answers for the data scripts.
+
+One SQLite file (`$XDG_CACHE_HOME/lumiera/prompts.sqlite3`, default `~/.cache`) maps
+the sha256 of a request (model, messages and every other parameter, as canonical
+JSON) to the answer it got. Answers are stored as soon as they arrive, so a rerun
+after a crash only pays for the requests that never came back. When the stored
+answers outgrow max_bytes, the least recently used ones are evicted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "lumiera" / "prompts.sqlite3"
+
+
+def request_key(request: dict) -> str:
+    return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """Thread-safe; wrap(call) gives a call that answers from the cache when it can."""
+
+    def __init__(self, path: Path | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path or default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, answer TEXT, size INTEGER, used REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS answers_used ON answers (used)")
+
+    def get(self, request: dict) -> str | None:
+        key = request_key(request)
+        with self.lock, self.db:
+            row = self.db.execute("SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE answers SET used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, request: dict, answer: str) -> None:
+        key = request_key(request)
+        size = len(key) + len(answer.encode("utf-8"))
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?)", (key, answer, size, time.time()))
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used answers until the cache is back under max_bytes."""
+        # summed from the table every time: other processes write to the same file
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM answers").fetchone()[0]
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM answers ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM answers WHERE key = ?", victims)
+
+    def wrap(self, call):
+        """call(request), answered from the cache when the same request was made before."""
+        def cached(request: dict) -> str:
+            answer = self.get(request)
+            if answer is None:
+                answer = call(request)
+                self.put(request, answer)
+            return answer
+        return cached
+
+    def close(self) -> None:
+        self.db.close()
@@ -0,0 +1,174 @@
+# src/lumiera/export/budget.py
+"""
+Output budgets for export-project (`--max-tokens` / `--max-bytes`).
+
+Files are planned before anything is written, from their on-disk sizes alone: in rank
+order (source before config before docs/data, shallow before deep, small before large)
+each file gets its full block, a head/tail excerpt, or a one-line summary, and files
+that do not fit even that are left out. Every file's allowance is then enforced when
+it is rendered, so the output never exceeds the budget because an estimate was off.
+"""
+
+import math
+import os
+import re
+from pathlib import Path
+
+# planning estimate of tokens from file size; tokenizers average ~4 bytes/token on
+# English and ~3 on code, so this errs towards truncating rather than overshooting
+BYTES_PER_TOKEN = 3
+
+# no single file may take more than this share of the budget
+MAX_FILE_SHARE = 0.25
+
+# excerpts smaller than this are not worth it; the file gets a summary line instead
+MIN_EXCERPT_TOKENS = 200
+
+SOURCE_EXTS = {'.py', '.lua', '.sh', '.zsh'}
+CONFIG_EXTS = {'.toml', '.yml', '.yaml', '.cfg', '.conf', '.keymap'}
+CONFIG_NAMES = {'Dockerfile', 'requirements.txt', 'pyproject.toml'}
+
+# ~one token per short word piece or punctuation mark, close to BPE counts for code and prose
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def rank_key(rel_path: Path, size: int) -> tuple:
+    """Sort key: smaller sorts first and is kept first."""
+    name, ext = rel_path.name, rel_path.suffix.lower()
+    if "lock" in name.lower():
+        tier = 3
+    elif ext in SOURCE_EXTS or name == "Dockerfile":
+        tier = 0
+    elif ext in CONFIG_EXTS or name in CONFIG_NAMES:
+        tier = 1
+    else:
+        tier = 2
+    return tier, len(rel_path.parts), size, rel_path.as_posix()
+
+
+class Budget:
+    """A (tokens, bytes) allowance; a missing limit is unbounded."""
+
+    def __init__(self, max_tokens: int | None = None, max_bytes: int | None = None):
+        self.limit = (
+            max_tokens if max_tokens is not None else math.inf,
+            max_bytes if max_bytes is not None else math.inf,
+        )
+
+    def cost(self, text: str) -> tuple[int, int]:
+        tokens = estimate_tokens(text) if self.limit[0] != math.inf else 0
+        nbytes = len(text.encode("utf-8")) if self.limit[1] != math.inf else 0
+        return tokens, nbytes
+
+
+def _add(a, b):
+    return a[0] + b[0], a[1] + b[1]
+
+
+def _sub(a, b):
+    # an unbounded dimension stays unbounded (inf - inf would be nan and fit nothing)
+    return tuple(x if x == math.inf else x - y for x, y in zip(a, b))
+
+
+def _fits(cost, room) -> bool:
+    return cost[0] <= room[0] and cost[1] <= room[1]
+
+
+def mark(kind: str) -> str:
+    """Suffix for the tree line of a file that is not exported in full."""
+    return "  [truncated]" if kind == "truncated" else "  [omitted]"
+
+
+def summary_blocks(rel_path: Path, size: int) -> list[str]:
+    return [f"path: {rel_path}", f"[omitted: {size:,} bytes, ~{size // BYTES_PER_TOKEN:,} tokens]"]
+
+
+def plan_budget(files, budget: Budget, fixed_cost: tuple[int, int]) -> dict[str, tuple]:
+    """
+    Decide how each (path, rel_path) in files is exported within budget, given what the
+    rest of the output (the tree) already costs.
+    Returns {rel posix path: (kind, allowance, size)} with kind "full", "truncated",
+    "omitted" (summary line) or "dropped" (tree mark only).
+    """
+    entries = []
+    for path, rel_path in files:
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            size = 0
+        entries.append((rank_key(rel_path, size), path, rel_path, size))
+    entries.sort(key=lambda e: e[0])
+
+    room = _sub(budget.limit, fixed_cost)
+    cap = (budget.limit[0] * MAX_FILE_SHARE, budget.limit[1] * MAX_FILE_SHARE)
+    plan = {}
+
+    # every file gets a tree mark and a summary line first, in rank order, while they fit
+    base = {}
+    for _, _, rel_path, size in entries:
+        cost = _add(budget.cost(mark("truncated")), budget.cost("\n\n" + "\n\n".join(summary_blocks(rel_path, size))))
+        if not _fits(cost, room):
+            plan[rel_path.as_posix()] = ("dropped", (0, 0), size)
+            continue
+        room = _sub(room, cost)
+        base[rel_path.as_posix()] = cost
+        plan[rel_path.as_posix()] = ("omitted", cost, size)
+
+    # then upgrade them to full blocks or excerpts, again in rank order
+    for _, path, rel_path, size in entries:
+        key = rel_path.as_posix()
+        if key not in base:
+            continue
+        header = f"\n\npath: {rel_path}\n\n```markdown\n\n```"
+        full = _add(budget.cost(header), (
+            size // BYTES_PER_TOKEN if budget.limit[0] != math.inf else 0,
+            size if budget.limit[1] != math.inf else 0,
+        ))
+        available = _add(room, base[key])
+        if _fits(full, available) and _fits(full, cap):
+            plan[key] = ("full", full, size)
+            room = _sub(available, full)
+            continue
+        excerpt = (min(available[0], cap[0]), min(available[1], cap[1]))
+        if excerpt[0] >= MIN_EXCERPT_TOKENS and excerpt[1] >= MIN_EXCERPT_TOKENS * BYTES_PER_TOKEN:
+            plan[key] = ("truncated", excerpt, size)
+            room = _sub(available, excerpt)
+    return plan
+
+
+def fit_blocks(blocks: list[str], allowance: tuple, budget: Budget) -> tuple[list[str], bool]:
+    """
+    blocks ("path:" line, fenced content) cut down to a head/tail excerpt if they cost
+    more than allowance. Returns (blocks, truncated). One-line placeholders pass through.
+    """
+    if len(blocks) != 2 or _fits(budget.cost("\n\n" + "\n\n".join(blocks)), allowance):
+        return blocks, False
+    path_line, fenced = blocks
+    opening, _, rest = fenced.partition("\n")
+    lines = rest[:-len("\n```")].split("\n")
+    # sized for the longest marker it can end up being
+    marker = f"... [{len(lines):,} of {len(lines):,} lines truncated to fit the budget] ..."
+    frame = budget.cost("\n\n" + path_line + "\n\n" + opening + "\n" + marker + "\n\n```")
+    room = _sub(allowance, frame)
+    half = (room[0] / 2, room[1] / 2)
+
+    def take(candidates):
+        kept, used = [], (0, 0)
+        for line in candidates:
+            cost = _add(budget.cost(line + "\n"), used)
+            if not _fits(cost, half):
+                break
+            kept.append(line)
+            used = cost
+        return kept
+
+    head = take(lines)
+    tail = take(reversed(lines[len(head):]))[::-1]
+    omitted = len(lines) - len(head) - len(tail)
+    marker = f"... [{omitted:,} of {len(lines):,} lines truncated to fit the budget] ..."
+    content = "\n".join(head + [marker] + tail)
+    return [path_line, f"{opening}\n{content}\n```"], True
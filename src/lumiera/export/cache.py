@@ -0,0 +1,86 @@
+# src/lumiera/export/cache.py
+"""
+Persistent cache of rendered export-project blocks.
+
+One SQLite file (`$XDG_CACHE_HOME/lumiera/export.sqlite3`, default `~/.cache`) maps
+(export root, relative path) to the file's size and mtime_ns and its rendered blocks,
+so a rerun only reads files whose stat changed. Renders made with other options
+(variant) are redone, and streamed large files are never stored. Rows are looked up
+one at a time, never loaded as a whole, so the cache adds no memory per file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# bump when render_code_file's output changes so stale renders are never reused
+FORMAT_VERSION = 3
+
+# a file modified this close to its read may change again within the same mtime tick
+# (coarse timestamps on FAT/SMB/Dropbox); such renders are not cached
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def default_cache_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "lumiera" / "export.sqlite3"
+
+
+class ExportCache:
+    """
+    Wraps a render function with a stat-keyed cache. Safe to call from reader threads;
+    every row touched in a run is stamped, and close() drops the root's unstamped rows
+    when prune is set (a full export, so those files are gone).
+    """
+
+    def __init__(self, root: Path, path: Path | None = None, variant: str = ""):
+        self.root = str(root)
+        self.variant = variant
+        self.path = path or default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.run = time.time_ns()
+        self.hits = self.misses = 0
+        with self.lock, self.db:
+            if self.db.execute("PRAGMA user_version").fetchone()[0] != FORMAT_VERSION:
+                self.db.execute("DROP TABLE IF EXISTS blocks")
+                self.db.execute(f"PRAGMA user_version = {FORMAT_VERSION}")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS blocks (root TEXT, path TEXT, size INTEGER, mtime_ns INTEGER,"
+                " variant TEXT, blocks TEXT, run INTEGER, PRIMARY KEY (root, path))"
+            )
+
+    def render(self, render_fn, path: str, rel_path: Path):
+        """render_fn(path, rel_path), or its cached result if the file's size and mtime are unchanged."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return render_fn(path, rel_path)
+        key = (self.root, str(rel_path))
+        with self.lock:
+            row = self.db.execute(
+                "SELECT size, mtime_ns, variant, blocks FROM blocks WHERE root = ? AND path = ?", key
+            ).fetchone()
+            if row is not None and row[:3] == (st.st_size, st.st_mtime_ns, self.variant):
+                self.db.execute("UPDATE blocks SET run = ? WHERE root = ? AND path = ?", (self.run, *key))
+                self.hits += 1
+                return json.loads(row[3])
+        blocks = render_fn(path, rel_path)
+        with self.lock:
+            self.misses += 1
+            if st.st_mtime_ns < time.time_ns() - RACY_WINDOW_NS and all(isinstance(b, str) for b in blocks or ()):
+                self.db.execute(
+                    "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (*key, st.st_size, st.st_mtime_ns, self.variant, json.dumps(blocks), self.run),
+                )
+        return blocks
+
+    def close(self, prune: bool = False) -> None:
+        with self.lock, self.db:
+            if prune:
+                self.db.execute("DELETE FROM blocks WHERE root = ? AND run != ?", (self.root, self.run))
+        self.db.close()
@@ -0,0 +1,93 @@
+# src/lumiera/export/formats.py
+"""
+Structured export-project formats, for tools that would otherwise split the Markdown
+dump back into files.
+
+- jsonl: one JSON object per file, {"path", "language", "size", "sha256", "content"}.
+  Files that sniff as binary, too large, minified or generated (lumiera.export.sniff)
+  carry "content": null and a "skipped" reason instead.
+- tar: the selected files' bytes as they are on disk, in an uncompressed stream.
+
+Both are written one file at a time, so nothing but the current file is held in memory.
+"""
+
+import hashlib
+import json
+import os
+import tarfile
+from pathlib import Path
+
+from lumiera.export.sniff import MAX_FILE_BYTES, SNIFF_BYTES, classify
+
+FORMATS = ("markdown", "jsonl", "tar")
+
+LANGUAGES = {
+    ".py": "python", ".json": "json", ".yml": "yaml", ".yaml": "yaml",
+    ".toml": "toml", ".md": "markdown", ".env": "", ".txt": "",
+}
+
+
+def language(rel_path: Path) -> str:
+    """Fence language of a file, "" if it has none."""
+    if rel_path.name == "Dockerfile":
+        return "docker"
+    return LANGUAGES.get(rel_path.suffix.lower(), "")
+
+
+def jsonl_record(path, rel_path, max_file_bytes: int | None = MAX_FILE_BYTES) -> dict | None:
+    """The jsonl record for one file, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(SNIFF_BYTES)
+            reason = classify(head, size, rel_path.suffix.lower(), max_size=max_file_bytes)
+            if reason:
+                digest, data = hashlib.sha256(head), None
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            else:
+                data = head + f.read()
+                digest = hashlib.sha256(data)
+    except OSError:
+        return None
+    record = {
+        "path": rel_path.as_posix(),
+        "language": language(rel_path) or None,
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "content": data.decode("utf-8", errors="replace") if data is not None else None,
+    }
+    if reason:
+        record["skipped"] = reason
+    return record
+
+
+def write_jsonl(out, records) -> int:
+    """Write records to the text stream out, one per line. Returns how many were written."""
+    count = 0
+    for record in records:
+        if record is None:
+            continue
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_tar(out, files) -> int:
+    """
+    Stream (path, rel_path) files into a tar archive on the binary stream out, under their
+    relative paths. Files are opened, so symlinks are archived as the files they point to.
+    Returns the member count.
+    """
+    count = 0
+    with tarfile.open(fileobj=out, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+        for path, rel_path in files:
+            try:
+                f = open(path, "rb")
+            except OSError:
+                continue
+            with f:
+                info = tar.gettarinfo(arcname=rel_path.as_posix(), fileobj=f)
+                tar.addfile(info, f)
+            count += 1
+    return count
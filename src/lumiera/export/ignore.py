@@ -0,0 +1,256 @@
+# src/lumiera/export/ignore.py
+"""
+.gitignore-compatible filtering for export-project.
+
+Every directory's `.gitignore` and `.lumieraignore` (the latter taking precedence) are
+compiled together: exact names go into a dict, other patterns into regex alternations
+with the patterns in reverse order, so the first alternative that matches is the last
+matching pattern, as in git. A path is
+checked against the rules of its own directory first and its ancestors' after; the
+nearest file with a matching pattern decides. Inside a git work tree, the ignore files
+between the export root and the top level apply too, and `.git/info/exclude` has the
+lowest precedence. Ignored directories are never entered,
+which is also why, as in git, a file inside one cannot be re-included with `!`.
+"""
+
+import os
+import re
+
+IGNORE_FILES = (".gitignore", ".lumieraignore")
+
+# basenames repeat a lot in real trees (__init__.py, index.js, ...): their verdicts are
+# memoized per rule set, up to this many distinct names
+NAME_CACHE_SIZE = 65536
+
+_GLOB_CHARS = "*?[\\"
+
+
+def translate(pattern: str) -> str:
+    """Regex (unanchored) for the path part of a gitignore pattern."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i):
+                at_start = i == 0 or pattern[i - 1] == "/"
+                at_end = i + 2 == n or pattern[i + 2] == "/"
+                if at_start and at_end:
+                    if i + 2 == n:
+                        # "foo/**": everything inside foo
+                        out.append(".*")
+                        i += 2
+                    else:
+                        # "**/" and "a/**/b": zero or more directories
+                        out.append("(?:.*/)?")
+                        i += 3
+                    continue
+                i += 2
+            else:
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:
+                # unterminated class: a literal "["
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:j]
+            negate = body[:1] in ("!", "^")
+            if negate:
+                body = body[1:]
+            body = body.replace("\\", "\\\\").replace("[", "\\[")
+            if body.startswith("]"):
+                body = "\\" + body
+            out.append(f"[^/{body}]" if negate else f"(?!/)[{body}]")
+            i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def parse_line(line: str) -> tuple[str, bool, bool, bool] | None:
+    """
+    (pattern, negated, directories only, anchored) for one ignore-file line, or None for
+    blanks and comments. Unanchored patterns match the last path component only.
+    """
+    line = line.rstrip("\n").rstrip("\r")
+    # trailing spaces are dropped unless escaped with a backslash
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+    if not line or line.startswith("#"):
+        return None
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    if line.startswith("**/") and "/" not in line[3:]:
+        # "**/foo" matches like plain "foo"
+        line = line[3:]
+    # a slash at the start or in the middle anchors the pattern to the ignore file's directory
+    anchored = "/" in line
+    return line.lstrip("/"), negated, dir_only, anchored
+
+
+class _Patterns:
+    """
+    One set of patterns split three ways: exact basenames (a dict lookup), basename globs
+    (one regex on the last component) and anchored path patterns (one regex on the path).
+    Each match reports the highest pattern index, i.e. the last matching line.
+    """
+
+    def __init__(self, rules: list[tuple[int, str, bool]]):
+        self.names = {}
+        self._by_name = {}
+        basename, path, prefixes = [], [], []
+        for index, pattern, anchored in rules:
+            if anchored:
+                path.append((index, translate(pattern)))
+                prefixes.append(next((pattern[:i] for i, c in enumerate(pattern) if c in _GLOB_CHARS), pattern))
+            elif not any(c in pattern for c in _GLOB_CHARS):
+                self.names[pattern] = index
+            else:
+                basename.append((index, translate(pattern)))
+        self.basename = self._compile(basename)
+        self.path = self._compile(path)
+        # paths not starting with any anchored pattern's literal prefix skip the path regex
+        self.prefixes = tuple(prefixes) if all(prefixes) else None
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        # last pattern first: the leftmost matching alternative is then the one git would pick
+        patterns = patterns[::-1]
+        regex = re.compile("|".join(f"((?:{regex})\\Z)" for _, regex in patterns), re.DOTALL)
+        return regex, [index for index, _ in patterns]
+
+    def best(self, rel: str, name: str) -> int:
+        best = self._by_name.get(name)
+        if best is None:
+            best = self.names.get(name, -1)
+            if self.basename is not None:
+                m = self.basename[0].match(name)
+                if m is not None:
+                    best = max(best, self.basename[1][m.lastindex - 1])
+            if len(self._by_name) < NAME_CACHE_SIZE:
+                self._by_name[name] = best
+        if self.path is not None and (self.prefixes is None or rel.startswith(self.prefixes)):
+            m = self.path[0].match(rel)
+            if m is not None:
+                best = max(best, self.path[1][m.lastindex - 1])
+        return best
+
+
+class IgnoreRules:
+    """The compiled patterns of one directory's ignore files."""
+
+    def __init__(self, lines):
+        rules = [rule for rule in map(parse_line, lines) if rule is not None]
+        self.empty = not rules
+        self._negated = [negated for _, negated, _, _ in rules]
+        self._dirs = _Patterns([(i, p, anchored) for i, (p, _, _, anchored) in enumerate(rules)])
+        self._files = _Patterns([(i, p, anchored) for i, (p, _, dir_only, anchored) in enumerate(rules) if not dir_only])
+
+    def match(self, rel: str, is_dir: bool) -> bool | None:
+        """True if rel (relative to the rules' directory) is ignored, False if re-included, None if no pattern matches."""
+        index = (self._dirs if is_dir else self._files).best(rel, rel.rpartition("/")[2])
+        if index < 0:
+            return None
+        return not self._negated[index]
+
+
+def read_rules(dir_path: str, names=IGNORE_FILES) -> IgnoreRules | None:
+    lines = []
+    for name in names:
+        try:
+            with open(os.path.join(dir_path, name), encoding="utf-8", errors="replace") as f:
+                lines.extend(f)
+        except OSError:
+            continue
+    rules = IgnoreRules(lines)
+    return None if rules.empty else rules
+
+
+def git_toplevel(path: str) -> str | None:
+    """The nearest directory at or above path holding a `.git`, if any."""
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+class IgnoreMatcher:
+    """
+    The ignore rules in effect in one directory, nearest first. Each chain entry is
+    (prefix, offset, rules): rules see prefix + rel[offset:] for a root-relative path rel.
+    """
+
+    def __init__(self, chain=()):
+        self.chain = chain
+
+    @classmethod
+    def for_root(cls, root: str) -> "IgnoreMatcher":
+        """
+        Rules for an export root: its own ignore files and, when it lies inside a git work
+        tree, those of every directory up to the top level plus `.git/info/exclude`.
+        """
+        root = os.path.abspath(root)
+        top = git_toplevel(root)
+        chain = []
+        path = root
+        while True:
+            names = IGNORE_FILES
+            if path == top:
+                # lowest precedence at the top level
+                names = (os.path.join(".git", "info", "exclude"),) + IGNORE_FILES
+            rules = read_rules(path, names)
+            if rules:
+                prefix = "" if path == root else os.path.relpath(root, path).replace(os.sep, "/") + "/"
+                chain.append((prefix, 0, rules))
+            if top is None or path == top:
+                break
+            path = os.path.dirname(path)
+        return cls(tuple(chain))
+
+    def child(self, dir_path: str, rel: str, names) -> "IgnoreMatcher":
+        """
+        Matcher for subdirectory dir_path, whose path relative to the root is rel ("a/b/").
+        names are the entries of dir_path; its ignore files are only opened if listed.
+        """
+        if not any(name in names for name in IGNORE_FILES):
+            return self
+        rules = read_rules(dir_path)
+        return IgnoreMatcher((("", len(rel), rules),) + self.chain) if rules else self
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        """Whether the entry at rel (relative to the export root, "/"-separated) is ignored."""
+        for prefix, offset, rules in self.chain:
+            verdict = rules.match(prefix + rel[offset:], is_dir)
+            if verdict is not None:
+                return verdict
+        return False
@@ -0,0 +1,213 @@
+# src/lumiera/export/index.py
+"""
+Persistent index of export roots, for `lumiera index build` and `export-project --query`.
+
+One SQLite file (`$XDG_CACHE_HOME/lumiera/index.sqlite3`, default `~/.cache`) records,
+for every file export-project would dump, its relative path, size, mtime_ns, language
+and sha256, in dump order. Rebuilds only read files whose stat changed. Built with
+trigrams, it also maps every lowercased three-character substring of each file's
+text to the files containing it, so `--grep` only opens files that can match.
+Queries never walk the tree: files added since the last build are not found.
+"""
+
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from lumiera.export.cache import RACY_WINDOW_NS
+from lumiera.export.formats import language
+from lumiera.export.project import DEFAULT_WORKERS, _prefetch, iter_code_files, scan_tree
+from lumiera.export.sniff import SNIFF_BYTES, classify
+
+INDEX_VERSION = 1
+
+
+def default_index_path() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "lumiera" / "index.sqlite3"
+
+
+def trigrams(text: str) -> set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def query_regex(patterns) -> re.Pattern:
+    """
+    One regex for path globs: a pattern matches a relative path, everything under a
+    matching directory and, without a "/", any file of that name.
+    """
+    parts = []
+    for pattern in patterns:
+        pattern = pattern.strip("/")
+        parts.append(fnmatch.translate(pattern))
+        parts.append(fnmatch.translate(pattern + "/*"))
+        if "/" not in pattern:
+            parts.append(fnmatch.translate("*/" + pattern))
+    return re.compile("|".join(f"(?:{part})" for part in parts))
+
+
+def _read(path, rel_path, known, with_trigrams):
+    """
+    (rel path, row values, trigrams) for one file; the values are None if its stat
+    matches known. None if the file cannot be read.
+    """
+    key = rel_path.as_posix()
+    try:
+        st = os.stat(path)
+        if known.get(key) == (st.st_size, st.st_mtime_ns):
+            return key, None, None
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # a file modified this recently may change again within the same mtime tick;
+    # recording no mtime makes the next build read it again
+    mtime_ns = st.st_mtime_ns if st.st_mtime_ns < time.time_ns() - RACY_WINDOW_NS else -1
+    row = (len(data), mtime_ns, language(rel_path), hashlib.sha256(data).hexdigest())
+    grams = None
+    if with_trigrams and not classify(data[:SNIFF_BYTES], len(data), rel_path.suffix.lower()):
+        grams = trigrams(data.decode("utf-8", errors="replace"))
+    return key, row, grams
+
+
+class ProjectIndex:
+    """The index database; one instance can hold any number of roots."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        with self.db:
+            if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+                for table in ("roots", "files", "trigrams"):
+                    self.db.execute(f"DROP TABLE IF EXISTS {table}")
+                self.db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, built_at REAL, trigrams INTEGER)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, root TEXT, path TEXT, ord INTEGER,"
+                " size INTEGER, mtime_ns INTEGER, language TEXT, sha256 TEXT, UNIQUE (root, path))"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS trigrams (tri TEXT, file INTEGER, PRIMARY KEY (tri, file)) WITHOUT ROWID"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS trigrams_file ON trigrams (file)")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def build(self, root: Path, include_env: bool = False, overrides=None, use_ignore: bool = True,
+              with_trigrams: bool = False, workers: int = DEFAULT_WORKERS) -> dict:
+        """
+        Index the files export-project would dump from root (same selection rules).
+        Returns counts: files, read, removed.
+        """
+        root = Path(root).resolve()
+        key = str(root)
+        listing = scan_tree(root, overrides=overrides, use_ignore=use_ignore)
+        files = list(iter_code_files(root, include_env=include_env, overrides=overrides, listing=listing))
+
+        row = self.db.execute("SELECT trigrams FROM roots WHERE root = ?", (key,)).fetchone()
+        # a root indexed without trigrams has to be read in full to add them
+        reuse = row is not None and (bool(row[0]) or not with_trigrams)
+        ids = {}
+        known = {}
+        for file_id, path, size, mtime_ns in self.db.execute(
+            "SELECT id, path, size, mtime_ns FROM files WHERE root = ?", (key,)
+        ):
+            ids[path] = file_id
+            if reuse:
+                known[path] = (size, mtime_ns)
+
+        def read(path, rel_path):
+            return _read(path, rel_path, known, with_trigrams)
+
+        results = _prefetch(read, files, workers) if workers > 1 else (read(*f) for f in files)
+        seen, read_count = set(), 0
+        with self.db:
+            if not with_trigrams:
+                self.db.execute(
+                    "DELETE FROM trigrams WHERE file IN (SELECT id FROM files WHERE root = ?)", (key,)
+                )
+            for position, result in enumerate(results):
+                if result is None:
+                    continue
+                path, values, grams = result
+                if values is None:
+                    seen.add(path)
+                    self.db.execute("UPDATE files SET ord = ? WHERE id = ?", (position, ids[path]))
+                    continue
+                seen.add(path)
+                read_count += 1
+                if path in ids:
+                    file_id = ids[path]
+                    self.db.execute(
+                        "UPDATE files SET ord = ?, size = ?, mtime_ns = ?, language = ?, sha256 = ? WHERE id = ?",
+                        (position, *values, file_id),
+                    )
+                    self.db.execute("DELETE FROM trigrams WHERE file = ?", (file_id,))
+                else:
+                    file_id = self.db.execute(
+                        "INSERT INTO files (root, path, ord, size, mtime_ns, language, sha256)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, path, position, *values),
+                    ).lastrowid
+                if grams:
+                    self.db.executemany(
+                        "INSERT INTO trigrams VALUES (?, ?)", ((tri, file_id) for tri in grams)
+                    )
+            gone = [ids[path] for path in ids if path not in seen]
+            for file_id in gone:
+                self.db.execute("DELETE FROM trigrams WHERE file = ?", (file_id,))
+                self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO roots VALUES (?, ?, ?)", (key, time.time(), int(with_trigrams))
+            )
+        return {"files": len(seen), "read": read_count, "removed": len(gone)}
+
+    def select(self, root: Path, patterns=(), grep: str | None = None) -> list[tuple[str, Path]]:
+        """
+        (path, rel_path) of root's indexed files matching any of the path globs patterns
+        (all files if none) and, with grep, containing that text (case-insensitive), in
+        dump order.
+        """
+        root = Path(root).resolve()
+        key = str(root)
+        row = self.db.execute("SELECT trigrams FROM roots WHERE root = ?", (key,)).fetchone()
+        if row is None:
+            raise ValueError(f"{root} is not indexed; run `lumiera index build --root {root}` first")
+
+        rows = self.db.execute("SELECT id, path FROM files WHERE root = ? ORDER BY ord", (key,)).fetchall()
+        if patterns:
+            regex = query_regex(patterns)
+            rows = [(file_id, path) for file_id, path in rows if regex.match(path)]
+        selected = [(os.path.join(key, path), Path(path)) for _, path in rows]
+        if grep is None:
+            return selected
+
+        needle = grep.lower()
+        grams = trigrams(needle)
+        if row[0] and grams:
+            placeholders = ",".join("?" * len(grams))
+            candidates = {file_id for (file_id,) in self.db.execute(
+                f"SELECT file FROM trigrams WHERE tri IN ({placeholders}) GROUP BY file HAVING COUNT(*) = ?",
+                (*grams, len(grams)),
+            )}
+            selected = [item for (file_id, _), item in zip(rows, selected) if file_id in candidates]
+        # trigrams only narrow it down; the text itself decides
+        matches = []
+        for path, rel_path in selected:
+            try:
+                with open(path, "rb") as f:
+                    text = f.read().decode("utf-8", errors="replace")
+            except OSError:
+                continue
+            if needle in text.lower():
+                matches.append((path, rel_path))
+        return matches
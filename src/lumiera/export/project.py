@@ -1,7 +1,19 @@
 # pythonkitchen/project_export.py
 import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 
+from lumiera.export.budget import Budget, fit_blocks, mark, plan_budget, summary_blocks
+from lumiera.export.cache import ExportCache
+from lumiera.export.formats import jsonl_record, language, write_jsonl, write_tar
+from lumiera.export.ignore import IgnoreMatcher
+from lumiera.export.since import changed_since
+from lumiera.export.sniff import MAX_FILE_BYTES, SNIFF_BYTES, classify, placeholder
+from lumiera.export.stream import STREAM_BYTES, StreamedContent
+
 SKIP_EXTS = {'.env'}
 SKIP_NAMES = {'.env'}
 SKIP_TREE_FILES = {'__pycache__', 'dist', '.git'}
@@ -12,38 +24,106 @@ SKIP_CONTENT_NAMES = {'.env', 'README.md'}
 INCLUDE_EXTS = {'.py', '.json', '.yml', '.yaml', '.toml', '.txt', '.md', '.lua', '.sh', '.zsh', '.cfg', '.conf', '.keymap'}
 INCLUDE_NAMES = {'Dockerfile', 'requirements.txt', 'pyproject.toml', '.env'}
 
-def build_tree(root, overrides=None):
+# file reads are latency-bound (cold caches, network mounts), so more threads than cores pay off
+DEFAULT_WORKERS = 8
+# files per read-ahead task, and tasks queued per worker: at most
+# workers * PREFETCH_PER_WORKER * PREFETCH_BATCH file contents are held at once
+PREFETCH_BATCH = 16
+PREFETCH_PER_WORKER = 2
+
+def scan_tree(root, overrides=None, use_ignore=True):
+    """
+    List root with one os.scandir per directory. Returns {dir path: [(name, is_dir, is_symlink)]}
+    in scandir order for every directory build_tree descends into, which covers everything
+    dump_code_files reads. Types come from the cached DirEntry, so files cost no extra stat.
+    Unreadable directories list as empty. With use_ignore, entries matched by .gitignore /
+    .lumieraignore rules (see lumiera.export.ignore) are left out and ignored directories
+    are never entered, unless their name or extension is in overrides.
+    """
+    overrides = overrides or set()
+    listing = {}
+    stack = [(str(root), "", IgnoreMatcher.for_root(str(root)) if use_ignore else None)]
+    while stack:
+        dir_path, rel, matcher = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = [(e.name, e.is_dir(), e.is_symlink()) for e in it]
+        except OSError:
+            entries = []
+        if matcher is not None:
+            matcher = matcher.child(dir_path, rel, [name for name, _, _ in entries]) if rel else matcher
+            if matcher.chain:
+                entries = [
+                    e for e in entries
+                    if not matcher.ignored(rel + e[0], e[1])
+                    or e[0] in overrides or (not e[1] and Path(e[0]).suffix.lower() in overrides)
+                ]
+        listing[dir_path] = entries
+        for name, is_dir, _ in entries:
+            if is_dir and not (name in SKIP_NAMES and name not in overrides) \
+                    and not (name in SKIP_TREE_FILES and name not in overrides):
+                stack.append((os.path.join(dir_path, name), f"{rel}{name}/", matcher))
+    return listing
+
+def walk_listing(listing, root):
+    """
+    os.walk(root) over a scan_tree listing: yields (dirpath, dirnames, filenames) top-down,
+    in scandir order, without following symlinked directories. Prune dirnames in place as
+    with os.walk.
+    """
+    def walk(dir_path):
+        entries = listing.get(dir_path, [])
+        dirnames = [name for name, is_dir, _ in entries if is_dir]
+        filenames = [name for name, is_dir, _ in entries if not is_dir]
+        links = {name for name, is_dir, is_symlink in entries if is_dir and is_symlink}
+        yield dir_path, dirnames, filenames
+        for name in dirnames:
+            if name not in links:
+                yield from walk(os.path.join(dir_path, name))
+
+    yield from walk(str(root))
+
+def build_tree(root, overrides=None, listing=None, marks=None):
+    return "\n".join(iter_tree(root, overrides=overrides, listing=listing, marks=marks))
+
+def iter_tree(root, overrides=None, listing=None, marks=None):
+    """
+    Yield the lines of build_tree one at a time, the directory/file counts last.
+    marks maps relative POSIX file paths to a suffix for their line.
+    """
+    marks = marks or {}
     overrides = overrides or set()
-    lines = []
+    if listing is None:
+        listing = scan_tree(root, overrides=overrides)
     dir_count = 0
     file_count = 0
 
-    def walk(dir_path, prefix=""):
+    def walk(dir_path, prefix="", rel=""):
         nonlocal dir_count, file_count
-        entries = sorted(os.listdir(dir_path))
+        entries = sorted(listing.get(dir_path, []))
         # skip names only if they're *not* in overrides
         # skip tree‐names unless overridden
         entries = [
             e for e in entries
-            if not (e in SKIP_NAMES and (overrides is None or e not in overrides))
+            if not (e[0] in SKIP_NAMES and (overrides is None or e[0] not in overrides))
         ]
-        for idx, entry in enumerate(entries):
+        for idx, (entry, is_dir, _) in enumerate(entries):
             path = os.path.join(dir_path, entry)
             is_last = (idx == len(entries) - 1)
             connector = "└── " if is_last else "├── "
             sub_prefix = "    " if is_last else "│   "
 
             # if directory
-            if os.path.isdir(path):
+            if is_dir:
                 # always show overridden dirs
                 if entry in SKIP_TREE_FILES and entry not in overrides:
-                    lines.append(f"{prefix}{connector}{entry}")
-                    lines.append(f"{prefix}{sub_prefix}// * files hidden for brevity")
+                    yield f"{prefix}{connector}{entry}"
+                    yield f"{prefix}{sub_prefix}// * files hidden for brevity"
                     dir_count += 1
                     continue
-                lines.append(f"{prefix}{connector}{entry}")
+                yield f"{prefix}{connector}{entry}"
                 dir_count += 1
-                walk(path, prefix + sub_prefix)
+                yield from walk(path, prefix + sub_prefix, f"{rel}{entry}/")
 
             # if file
             else:
@@ -51,19 +131,92 @@ def build_tree(root, overrides=None):
                 # skip by name or extension unless overridden
                 if (entry in SKIP_NAMES and entry not in overrides) or (ext in SKIP_EXTS and ext not in overrides):
                     continue
-                lines.append(f"{prefix}{connector}{entry}")
+                yield f"{prefix}{connector}{entry}{marks.get(rel + entry, '')}"
                 file_count += 1
 
-    lines.append(str(root))
-    walk(str(root))
-    lines.append(f"\n{dir_count} directories, {file_count} files\n")
-    return "\n".join(lines)
+    yield str(root)
+    yield from walk(str(root))
+    yield f"\n{dir_count} directories, {file_count} files\n"
+
+def dump_code_files(root, include_env=False, overrides=None, listing=None, workers=1):
+    blocks = iter_code_blocks(root, include_env=include_env, overrides=overrides, listing=listing, workers=workers)
+    return "\n\n".join(block if isinstance(block, str) else block.text() for block in blocks)
+
+def iter_code_blocks(root, include_env=False, overrides=None, listing=None, workers=1, cache=None, only=None,
+                     budget=None, plan=None, files=None, max_file_bytes=MAX_FILE_BYTES):
+    """
+    Yield the blocks of dump_code_files (a "path:" line, then its fenced content) as files are read.
+    With workers > 1, files are read ahead on a thread pool within a bounded window;
+    blocks still come out in walk order. With cache (an ExportCache), unchanged files
+    are not read at all. With only, just the files whose POSIX relative path is in it.
+    With a budget and its plan (see lumiera.export.budget), files are cut down or summarised.
+    With files, those (path, rel_path) pairs are rendered instead of the walk's.
+    Files over max_file_bytes get a placeholder; those under it but over STREAM_BYTES
+    come out as a StreamedContent block (see lumiera.export.stream) instead of a string.
+    """
+    if files is None:
+        files = iter_code_files(root, include_env=include_env, overrides=overrides, listing=listing)
+    if only is not None:
+        files = ((path, rel_path) for path, rel_path in files if rel_path.as_posix() in only)
+    render = partial(render_code_file, max_file_bytes=max_file_bytes)
+    if cache is not None:
+        render = partial(cache.render, render)
+    if plan is not None:
+        render = partial(_render_planned, render, budget, plan)
+    if workers > 1:
+        rendered = _prefetch(render, files, workers)
+    else:
+        rendered = (render(path, rel_path) for path, rel_path in files)
+    for blocks in rendered:
+        if blocks:
+            yield from blocks
+
+def _prefetch(fn, items, workers):
+    """
+    map(fn, items) on a thread pool, in order. Items go out in batches of PREFETCH_BATCH so
+    small files don't drown in per-task overhead, at most PREFETCH_PER_WORKER batches per
+    worker at once.
+    """
+    def run(batch):
+        return [fn(*args) for args in batch]
+
+    window = deque()
+    with ThreadPoolExecutor(workers) as pool:
+        batch = []
+        for args in items:
+            batch.append(args)
+            if len(batch) < PREFETCH_BATCH:
+                continue
+            window.append(pool.submit(run, batch))
+            batch = []
+            if len(window) >= workers * PREFETCH_PER_WORKER:
+                yield from window.popleft().result()
+        if batch:
+            window.append(pool.submit(run, batch))
+        while window:
+            yield from window.popleft().result()
+
+def _render_planned(render, budget, plan, path, rel_path):
+    kind, allowance, size = plan.get(rel_path.as_posix(), ("dropped", None, 0))
+    if kind == "dropped":
+        return None
+    if kind == "omitted":
+        return summary_blocks(rel_path, size)
+    blocks = render(path, rel_path)
+    if not blocks:
+        return blocks
+    if not isinstance(blocks[-1], str):
+        # cutting a file down takes its text
+        blocks = [*blocks[:-1], blocks[-1].text()]
+    return fit_blocks(blocks, allowance, budget)[0]
 
-def dump_code_files(root, include_env=False, overrides=None):
+def iter_code_files(root, include_env=False, overrides=None, listing=None):
+    """Yield (file path, path relative to root) for every file the content dump includes, in dump order."""
     overrides = overrides or set()
-    blocks = []
+    if listing is None:
+        listing = scan_tree(root, overrides=overrides)
 
-    for dirpath, dirnames, filenames in os.walk(root):
+    for dirpath, dirnames, filenames in walk_listing(listing, root):
         # first, drop any files we want to hide in the *content* unless overridden
         filenames = [
             f for f in filenames
@@ -103,47 +256,184 @@ def dump_code_files(root, include_env=False, overrides=None):
             if any(part in SKIP_TREE_FILES for part in rel_dir.parts) and not any(part in overrides for part in rel_dir.parts):
                 continue
 
-            rel_path = Path(dirpath, fname).relative_to(root)
-            try:
-                with open(os.path.join(dirpath, fname), encoding="utf-8", errors="replace") as f:
-                    content = f.read().strip()
-            except Exception:
-                continue
-            if fname == '__init__.py' and not content:
-                continue
+            yield os.path.join(dirpath, fname), Path(dirpath, fname).relative_to(root)
 
-            # language mapping
-            lang_map = {
-                ".py": "python", ".json": "json", ".yml": "yaml", ".yaml": "yaml",
-                ".toml": "toml", ".md": "markdown", ".env": "", ".txt": "",
-                "Dockerfile": "docker"
-            }
-            lang = lang_map.get(ext, "")
-            if fname == "Dockerfile":
-                lang = "docker"
-
-            blocks.append(f"path: {rel_path}")
-            if lang:
-                blocks.append(f"```{lang}\n{content}\n```")
-            else:
-                blocks.append(f"```\n{content}\n```")
+def render_code_file(path, rel_path, max_file_bytes=MAX_FILE_BYTES):
+    """
+    The "path:" line and fenced content block for one file, or None if it is left out.
+    Files that sniff as binary, minified or generated (see lumiera.export.sniff), or are
+    larger than max_file_bytes (None for no limit), get a one-line placeholder instead,
+    without being read past their first few KB. Files over STREAM_BYTES are not read at
+    all: their content block is a StreamedContent that writes itself to the output.
+    """
+    fname = rel_path.name
+    ext = Path(fname).suffix.lower()
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(SNIFF_BYTES)
+            reason = classify(head, size, ext, max_size=max_file_bytes)
+            if reason:
+                return placeholder(rel_path, reason, size)
+            if size > STREAM_BYTES:
+                return [f"path: {rel_path}", StreamedContent(path, f"```{language(rel_path)}")]
+            data = head + f.read()
+    except Exception:
+        return None
+    # what a text-mode read with errors="replace" would give, newlines translated
+    content = data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n").strip()
+    if fname == '__init__.py' and not content:
+        return None
 
-    return "\n\n".join(blocks)
+    lang = language(rel_path)
+    if lang:
+        return [f"path: {rel_path}", f"```{lang}\n{content}\n```"]
+    return [f"path: {rel_path}", f"```\n{content}\n```"]
 
-def export_project(root_path: str, output_path: str = None, include_env: bool = False, include_list=None):
+def export_project(root_path: str, output_path: str = None, include_env: bool = False, include_list=None,
+                   workers: int = DEFAULT_WORKERS, use_cache: bool = True, since: str = None,
+                   max_tokens: int = None, max_bytes: int = None, use_ignore: bool = True, fmt: str = "markdown",
+                   query=None, grep: str = None, max_file_bytes: int | None = MAX_FILE_BYTES):
+    """
+    Export root_path to output_path or stdout. Rendered files are cached across runs
+    (see lumiera.export.cache) unless use_cache is off. With since (a git ref or a
+    timestamp), only the blocks of files changed since then are written, without the tree.
+    max_tokens / max_bytes cap the output (see lumiera.export.budget). Files matched by
+    .gitignore / .lumieraignore rules are skipped unless use_ignore is off.
+    fmt "jsonl" or "tar" writes the same files without the tree instead (see
+    lumiera.export.formats); the cache and budgets only apply to Markdown.
+    With query (path globs) or grep (text), the files are picked from the root's index
+    (see lumiera.export.index) instead of walking it, and the tree is left out.
+    Files over max_file_bytes (None for no limit) are exported as a placeholder line.
+    """
     root = Path(root_path).resolve()
     include_list = include_list or set()
+    files = None
+    if query or grep is not None:
+        from lumiera.export.index import ProjectIndex
+        index = ProjectIndex()
+        try:
+            files = index.select(root, query or (), grep=grep)
+        finally:
+            index.close()
+    if fmt != "markdown":
+        options = dict(include_env=include_env, overrides=include_list, workers=workers, since=since,
+                       use_ignore=use_ignore, files=files, max_file_bytes=max_file_bytes)
+        if output_path:
+            mode = dict(mode="wb") if fmt == "tar" else dict(mode="w", encoding="utf-8")
+            with open(output_path, **mode) as f:
+                write_structured(f, root, fmt, **options)
+            print(f"Exported to {output_path}")
+        else:
+            write_structured(sys.stdout.buffer if fmt == "tar" else sys.stdout, root, fmt, **options)
+            sys.stdout.flush()
+        return
 
-    # wrap the tree in backticks
-    tree_md = "```\n" + build_tree(root, overrides=include_list) + "\n```"
+    cache = ExportCache(root, variant=str(max_file_bytes)) if use_cache else None
+    budget = Budget(max_tokens, max_bytes) if max_tokens is not None or max_bytes is not None else None
+    options = dict(include_env=include_env, overrides=include_list, workers=workers, cache=cache, since=since,
+                   budget=budget, use_ignore=use_ignore, files=files, max_file_bytes=max_file_bytes)
 
-    code_md = dump_code_files(root, include_env=include_env, overrides=include_list)
+    try:
+        if output_path:
+            with open(output_path, "w", encoding="utf-8") as f:
+                write_export(f, root, **options)
+            print(f"Exported to {output_path}")
+        else:
+            write_export(sys.stdout, root, **options)
+            # print() used to end the dump with a newline
+            sys.stdout.write("\n")
+    finally:
+        if cache is not None:
+            # a full export saw every file, so rows for anything else are stale
+            cache.close(prune=since is None and files is None)
 
-    full = "\n\n".join([tree_md, code_md])
+def write_structured(out, root, fmt, include_env=False, overrides=None, workers=1, since=None, use_ignore=True,
+                     files=None, max_file_bytes=MAX_FILE_BYTES):
+    """
+    Write the files of the content dump to out as jsonl (a text stream) or tar (a binary
+    stream), in dump order. With since, only changed files. With files, those
+    (path, rel_path) pairs instead of the walk's.
+    """
+    if files is not None:
+        files = list(files)
+    else:
+        listing = scan_tree(root, overrides=overrides, use_ignore=use_ignore)
+        files = list(iter_code_files(root, include_env=include_env, overrides=overrides, listing=listing))
+    if since is not None:
+        only = changed_since(root, since, files)
+        files = [(path, rel_path) for path, rel_path in files if rel_path.as_posix() in only]
+    if fmt == "tar":
+        return write_tar(out, files)
+    record = partial(jsonl_record, max_file_bytes=max_file_bytes)
+    if workers > 1:
+        records = _prefetch(record, files, workers)
+    else:
+        records = (record(path, rel_path) for path, rel_path in files)
+    return write_jsonl(out, records)
 
-    if output_path:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(full)
-        print(f"Exported to {output_path}")
+def write_export(out, root, include_env=False, overrides=None, workers=1, cache=None, since=None, budget=None,
+                 use_ignore=True, files=None, max_file_bytes=MAX_FILE_BYTES):
+    """
+    Write the fenced tree, a blank line, then the code blocks to the text stream out,
+    each piece as soon as it is produced, so file contents never pile up in memory.
+    Same bytes as "\\n\\n".join([tree_md, code_md]). The repo is listed once and both
+    parts are rendered from that listing. With since, only changed files' blocks are written.
+    With a budget, files are planned first and the tree marks those not exported in full.
+    With files, just those (path, rel_path) pairs' blocks are written and root is not listed.
+    """
+    listing = None
+    if files is not None:
+        files = list(files)
     else:
-        print(full)
+        listing = scan_tree(root, overrides=overrides, use_ignore=use_ignore)
+
+    def selected():
+        if files is not None:
+            return iter(files)
+        return iter_code_files(root, include_env=include_env, overrides=overrides, listing=listing)
+
+    tree = since is None and files is None
+    only = None
+    if since is not None:
+        only = changed_since(root, since, selected())
+
+    plan, marks = None, None
+    if budget is not None:
+        fixed = (0, 0)
+        if tree:
+            for line in iter_tree(root, overrides=overrides, listing=listing):
+                cost = budget.cost(line + "\n")
+                fixed = (fixed[0] + cost[0], fixed[1] + cost[1])
+            cost = budget.cost("```\n\n```\n\n")
+            fixed = (fixed[0] + cost[0], fixed[1] + cost[1])
+        planned = selected()
+        if only is not None:
+            planned = [(path, rel_path) for path, rel_path in planned if rel_path.as_posix() in only]
+        plan = plan_budget(planned, budget, fixed)
+        marks = {key: mark(kind) for key, (kind, _, _) in plan.items() if kind != "full"}
+        kinds = [kind for kind, _, _ in plan.values()]
+        print(
+            f"Budget: {kinds.count('full')} files in full, {kinds.count('truncated')} truncated, "
+            f"{kinds.count('omitted') + kinds.count('dropped')} omitted",
+            file=sys.stderr,
+        )
+
+    if tree:
+        # wrap the tree in backticks
+        out.write("```\n")
+        for i, line in enumerate(iter_tree(root, overrides=overrides, listing=listing, marks=marks)):
+            out.write(line if i == 0 else "\n" + line)
+        out.write("\n```\n\n")
+
+    blocks = iter_code_blocks(root, include_env=include_env, overrides=overrides, listing=listing,
+                              workers=workers, cache=cache, only=only, budget=budget, plan=plan, files=files,
+                              max_file_bytes=max_file_bytes)
+    for i, block in enumerate(blocks):
+        if i:
+            out.write("\n\n")
+        if isinstance(block, str):
+            out.write(block)
+        else:
+            # large files go straight from disk to out
+            block.write(out)
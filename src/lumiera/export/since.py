@@ -0,0 +1,56 @@
+# src/lumiera/export/since.py
+"""
+Resolve export-project's `--since` into the set of paths (relative to the export root)
+that changed: a git ref means committed, staged, unstaged and untracked changes since
+that ref; anything else is read as a timestamp and compared with file mtimes.
+"""
+
+import os
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+
+def _git(root: Path, *args: str) -> str | None:
+    try:
+        proc = subprocess.run(["git", "-C", str(root), *args], capture_output=True, text=True)
+    except FileNotFoundError:
+        return None
+    return proc.stdout if proc.returncode == 0 else None
+
+
+def parse_timestamp(value: str) -> float | None:
+    """Seconds since the epoch for a unix timestamp or an ISO 8601 date/datetime (local time if naive)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def changed_since(root: Path, since: str, files) -> set[str]:
+    """
+    Relative POSIX paths of the files that changed since `since`.
+    files yields (path, rel_path) for every candidate, and is only walked for timestamps.
+    Raises ValueError if since is neither a git ref nor a timestamp.
+    """
+    if _git(root, "rev-parse", "--verify", "--quiet", f"{since}^{{commit}}") is not None:
+        # --relative: paths relative to (and limited to) root when it is a repo subdirectory
+        diff = _git(root, "diff", "--name-only", "-z", "--relative", since, "--") or ""
+        untracked = _git(root, "ls-files", "-z", "--others", "--exclude-standard") or ""
+        return {p for p in diff.split("\0") + untracked.split("\0") if p}
+
+    ts = parse_timestamp(since)
+    if ts is None:
+        raise ValueError(f"'{since}' is neither a git ref nor a timestamp")
+    changed = set()
+    for path, rel_path in files:
+        try:
+            if os.stat(path).st_mtime > ts:
+                changed.add(rel_path.as_posix())
+        except OSError:
+            continue
+    return changed
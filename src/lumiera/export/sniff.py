@@ -0,0 +1,73 @@
+# src/lumiera/export/sniff.py
+"""
+Cheap classification of export-project files from their size and first few KB, so
+binary blobs, data dumps, minified bundles and generated code are skipped before
+they are read in full.
+"""
+
+import math
+from collections import Counter
+
+SNIFF_BYTES = 8192
+
+# larger files are data, not context
+MAX_FILE_BYTES = 1024 * 1024
+
+# Shannon entropy of the sniffed bytes, in bits per byte: source and prose sit around
+# 4.5-5.5, base64 near 6, compressed or encrypted data close to 8
+MAX_ENTROPY = 6.5
+
+# share of control bytes (other than tab/newline/CR/FF) above which a file is binary
+MAX_CONTROL_RATIO = 0.1
+
+# a line this long in the head, with lines this long on average, means minified output
+MINIFIED_LINE = 1000
+MINIFIED_AVG_LINE = 200
+
+# prose legitimately has paragraph-long lines
+PROSE_EXTS = {'.md', '.txt'}
+
+GENERATED_MARKERS = (b"@generated", b"do not edit", b"code generated by", b"autogenerated", b"auto-generated")
+GENERATED_HEAD_LINES = 5
+# smaller generated files cost no more than their placeholder, so they are kept
+GENERATED_MIN_BYTES = 1024
+
+_CONTROL = bytes(set(range(32)) - {9, 10, 12, 13})
+
+
+def entropy(data: bytes) -> float:
+    if not data:
+        return 0.0
+    n = len(data)
+    return -sum(c / n * math.log2(c / n) for c in Counter(data).values())
+
+
+def classify(head: bytes, size: int, ext: str = "", max_size: int | None = MAX_FILE_BYTES) -> str | None:
+    """
+    Why a file should be skipped, judged by its size and first SNIFF_BYTES (head):
+    "binary", "too large" (over max_size, if set), "minified" or "generated".
+    None if it looks like source.
+    """
+    if b"\0" in head:
+        return "binary"
+    if max_size is not None and size > max_size:
+        return "too large"
+    if not head:
+        return None
+    control = len(head) - len(head.translate(None, _CONTROL))
+    if control / len(head) > MAX_CONTROL_RATIO or entropy(head) > MAX_ENTROPY:
+        return "binary"
+    if ext not in PROSE_EXTS:
+        lines = head.split(b"\n")
+        # the last line may be cut off by the sniff window, but a long one still counts
+        if max(map(len, lines)) > MINIFIED_LINE and len(head) / len(lines) > MINIFIED_AVG_LINE:
+            return "minified"
+    first_lines = b"\n".join(head.split(b"\n", GENERATED_HEAD_LINES)[:GENERATED_HEAD_LINES]).lower()
+    if size >= GENERATED_MIN_BYTES and any(marker in first_lines for marker in GENERATED_MARKERS):
+        return "generated"
+    return None
+
+
+def placeholder(rel_path, reason: str, size: int) -> list[str]:
+    """The one-line block a skipped file is exported as."""
+    return [f"path: {rel_path} [skipped: {reason}, {size:,} bytes]"]
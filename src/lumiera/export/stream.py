@@ -0,0 +1,108 @@
+# src/lumiera/export/stream.py
+"""
+Large files in export-project, written to the output straight from disk.
+
+A file above STREAM_BYTES is not read when it is rendered; its block holds a
+StreamedContent, which writes the fenced content chunk by chunk when the output gets
+to it. Leading and trailing whitespace is found by decoding small windows at either
+end, so the result is the same as decoding, newline-translating and strip()ping the
+whole file, without ever holding it in memory. Plain buffered reads are used rather
+than an mmap, whose touched pages would all count towards the process's memory.
+"""
+
+import codecs
+import os
+
+# files larger than this are streamed instead of rendered into a string; kept well below the
+# default --max-file-bytes (1 MiB) so files between the two are streamed
+STREAM_BYTES = 256 * 1024
+
+CHUNK_BYTES = 1024 * 1024
+
+# how far the whitespace scans look at a time
+WINDOW_BYTES = 4096
+
+
+def _decoder():
+    return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _read(f, pos: int, size: int) -> bytes:
+    f.seek(pos)
+    return f.read(size)
+
+
+def content_start(f, start: int, end: int) -> int:
+    """Offset of the first non-whitespace character between start and end of the binary file f, or end."""
+    decoder = _decoder()
+    skipped = 0
+    for pos in range(start, end, WINDOW_BYTES):
+        text = decoder.decode(_read(f, pos, min(WINDOW_BYTES, end - pos)), final=pos + WINDOW_BYTES >= end)
+        stripped = text.lstrip()
+        # whitespace is valid UTF-8, so it re-encodes to exactly the bytes it came from
+        skipped += len(text[:len(text) - len(stripped)].encode("utf-8"))
+        if stripped:
+            break
+    return start + skipped
+
+
+def content_end(f, start: int, end: int) -> int:
+    """Offset just past the last non-whitespace character between start and end of f, or start."""
+    pos = end
+    while pos > start:
+        lo = max(start, pos - WINDOW_BYTES)
+        window = _read(f, lo, pos - lo)
+        # move off UTF-8 continuation bytes (at most three) so the window starts on a character
+        skip = 0
+        while lo > start and skip < 3 and 0x80 <= window[skip] < 0xC0:
+            skip += 1
+        lo += skip
+        text = window[skip:].decode("utf-8", errors="replace")
+        stripped = text.rstrip()
+        if stripped:
+            return pos - len(text[len(stripped):].encode("utf-8"))
+        pos = lo
+    return start
+
+
+def write_content(out, f, start: int, end: int) -> None:
+    """Decode f from start to end to the text stream out, translating \\r\\n and \\r to \\n, chunk by chunk."""
+    decoder = _decoder()
+    carry = ""
+    f.seek(start)
+    for pos in range(start, end, CHUNK_BYTES):
+        final = pos + CHUNK_BYTES >= end
+        text = carry + decoder.decode(f.read(min(CHUNK_BYTES, end - pos)), final=final)
+        carry = ""
+        # a \r at the end of a chunk may be the first half of a \r\n
+        if not final and text.endswith("\r"):
+            text, carry = text[:-1], "\r"
+        out.write(text.replace("\r\n", "\n").replace("\r", "\n"))
+
+
+class StreamedContent:
+    """The fenced content block of a large file, opening with opening (e.g. "```python")."""
+
+    def __init__(self, path: str, opening: str):
+        self.path = path
+        self.opening = opening
+
+    def write(self, out) -> None:
+        out.write(self.opening + "\n")
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            # gone since it was rendered
+            f = None
+        if f is not None:
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                start = content_start(f, 0, size)
+                write_content(out, f, start, content_end(f, start, size))
+        out.write("\n```")
+
+    def text(self) -> str:
+        """The whole block as a string, for when it has to be cut down."""
+        with open(self.path, "rb") as f:
+            content = f.read().decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n").strip()
+        return f"{self.opening}\n{content}\n```"
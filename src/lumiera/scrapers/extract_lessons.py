@@ -2,6 +2,8 @@ import re
 from urllib.parse import urlparse
 import pandas as pd
 
+from lumiera.data.lessons import lesson_names
+
 def extract_lesson_name(url: str) -> str:
     """
     Given a Rebelway URL like
@@ -32,7 +34,8 @@ def build_lessons_csv(excel_path: str, output_csv: str):
     df = pd.read_excel(excel_path, sheet_name="lessons")
     
     # 2) assume the column containing URLs is named 'link'; adjust if needed
-    df['name'] = df['link'].apply(extract_lesson_name)
+    #    (lesson_names gives extract_lesson_name of every link, as one vectorised pass)
+    df['name'] = lesson_names(df['link'].astype("string"))
     
     # 3) keep only name + link, and write out
     df[['name', 'link']].to_csv(output_csv, index=False)
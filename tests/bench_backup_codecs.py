@@ -0,0 +1,77 @@
+# Ad-hoc benchmark: wall time and compression ratio per backup codec on a synthetic tree.
+#
+#   python tests/bench_backup_codecs.py [--size-mb 64] [--jobs 4]
+
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from tabulate import tabulate
+
+from lumiera.backup.archive import write_archive
+from lumiera.backup.codecs import CODECS, parse_compression
+
+SETTINGS = ["none", "gz:1", "gz:6", "gz:9", "bz2:9", "xz:1", "xz:6", "zstd:3", "zstd:19"]
+
+
+def make_tree(root: Path, size_mb: int) -> int:
+    """Mix of text-like sources/configs and already-compressed media, roughly half each."""
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(2000)]
+    budget = size_mb * 1024 * 1024
+    total = 0
+    i = 0
+    while total < budget:
+        sub = root / f"shot_{i // 50:03d}"
+        sub.mkdir(parents=True, exist_ok=True)
+        if i % 2:
+            # incompressible media
+            data = rng.randbytes(rng.randint(256 * 1024, 2 * 1024 * 1024))
+            name = f"plate_{i:05d}" + rng.choice([".exr", ".mp4", ".png"])
+        else:
+            lines = (" ".join(rng.choices(words, k=12)) for _ in range(rng.randint(200, 4000)))
+            data = "\n".join(lines).encode()
+            name = f"config_{i:05d}" + rng.choice([".json", ".py", ".txt"])
+        (sub / name).write_bytes(data)
+        total += len(data)
+        i += 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backup codecs on a synthetic tree.")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "src"
+        total = make_tree(src, args.size_mb)
+        rows = []
+        for setting in SETTINGS:
+            if setting.split(":")[0] not in CODECS:
+                rows.append([setting, "n/a", "n/a", "n/a"])
+                continue
+            codec, level = parse_compression(setting)
+            out = Path(tmp) / f"bench{codec.suffix}"
+            started = time.perf_counter()
+            stats = write_archive(out, [src], codec, level, jobs=args.jobs)
+            elapsed = time.perf_counter() - started
+            rows.append([
+                setting,
+                f"{elapsed:.2f}",
+                f"{total / (1024 * 1024) / elapsed:.1f}",
+                f"{stats['bytes_written'] / stats['bytes_read']:.3f}",
+            ])
+            out.unlink()
+
+    print(f"{total / (1024 * 1024):.0f} MB synthetic tree, {args.jobs} jobs")
+    print(tabulate(rows, headers=["codec", "seconds", "MB/s", "ratio"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Ad-hoc benchmark: export-project ignore matching throughput.
+#
+#   python tests/bench_export_ignore.py [--paths 1000000]
+#
+# Compiles a typical Python + Node .gitignore (~60 patterns) and checks synthetic
+# root-relative paths against it, the way scan_tree does for every directory entry.
+
+import argparse
+import random
+import time
+
+from lumiera.export.ignore import IgnoreMatcher, IgnoreRules
+
+GITIGNORE = """
+__pycache__/
+*.py[cod]
+*$py.class
+*.so
+.Python
+build/
+develop-eggs/
+dist/
+downloads/
+eggs/
+.eggs/
+lib64/
+parts/
+sdist/
+var/
+wheels/
+*.egg-info/
+.installed.cfg
+*.egg
+MANIFEST
+*.manifest
+*.spec
+pip-log.txt
+htmlcov/
+.tox/
+.nox/
+.coverage
+.coverage.*
+.cache
+nosetests.xml
+coverage.xml
+*.cover
+.hypothesis/
+.pytest_cache/
+*.mo
+*.pot
+*.log
+instance/
+.scrapy
+docs/_build/
+target/
+.ipynb_checkpoints
+.python-version
+.env
+.venv
+env/
+venv/
+ENV/
+.mypy_cache/
+.dmypy.json
+node_modules/
+npm-debug.log*
+yarn-error.log*
+.pnpm-debug.log*
+/coverage
+*.tsbuildinfo
+.next/
+out/
+!out/keep.txt
+**/fixtures/**/*.bin
+"""
+
+DIRS = ["src", "lib", "app", "core", "utils", "api", "models", "views", "tests", "docs", "scripts", "assets"]
+FILES = ["main.py", "util.py", "index.ts", "app.js", "README.md", "data.json", "style.css", "mod.pyc",
+         "run.log", "Makefile", "config.yaml", "image.png", "notes.txt", "x.so"]
+
+
+def make_paths(n: int) -> list[tuple[str, bool]]:
+    rng = random.Random(0)
+    paths = []
+    for _ in range(n):
+        depth = rng.randint(0, 6)
+        parts = [rng.choice(DIRS) for _ in range(depth)]
+        if rng.random() < 0.2:
+            paths.append(("/".join(parts + [rng.choice(DIRS)]), True))
+        else:
+            paths.append(("/".join(parts + [rng.choice(FILES)]), False))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export-project ignore matching.")
+    parser.add_argument("--paths", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rules = IgnoreRules(GITIGNORE.splitlines())
+    # a root .gitignore plus a nested one two levels down, as scan_tree would build them
+    nested = IgnoreRules(["*.json", "!keep.json"])
+    matcher = IgnoreMatcher((("", 8, nested), ("", 0, rules)))
+    paths = make_paths(args.paths)
+
+    started = time.perf_counter()
+    ignored = sum(1 for rel, is_dir in paths if matcher.ignored(rel, is_dir))
+    elapsed = time.perf_counter() - started
+    print(f"{len(paths):,} paths, {ignored:,} ignored, {elapsed:.2f}s ({len(paths) / elapsed / 1e6:.2f}M paths/s)")
+
+
+if __name__ == "__main__":
+    main()
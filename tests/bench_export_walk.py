@@ -0,0 +1,102 @@
+# Ad-hoc benchmark: directory traversal cost of export-project on a synthetic tree.
+#
+#   python tests/bench_export_walk.py [--files 200000] [--per-dir 100] [--export [--workers 8] [--cold]]
+#
+# Compares the old two-pass traversal (recursive os.listdir + os.path.isdir for the tree,
+# then a separate os.walk for the dump) with the single scan_tree listing both now share.
+# Run it twice: the first round is dominated by a cold dentry cache.
+# --cold drops the page cache before each timed export (Linux, needs root).
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from tabulate import tabulate
+
+from lumiera.export.project import scan_tree, walk_listing, write_export
+
+
+def make_tree(root: Path, files: int, per_dir: int) -> int:
+    """files small source files, per_dir per leaf directory, leaves grouped 20 to a parent."""
+    dirs = 0
+    for i in range(0, files, per_dir):
+        leaf = root / f"pkg_{i // (per_dir * 20):04d}" / f"mod_{i // per_dir:05d}"
+        leaf.mkdir(parents=True, exist_ok=True)
+        dirs += 1
+        for j in range(min(per_dir, files - i)):
+            ext = (".py", ".json", ".txt", ".png")[j % 4]
+            (leaf / f"file_{j:03d}{ext}").write_text(f"value = {i + j}\n")
+    return dirs
+
+
+def legacy_walk(root: str) -> int:
+    """What export-project did before: listdir + isdir per entry, then os.walk."""
+    seen = 0
+
+    def walk(dir_path):
+        nonlocal seen
+        for entry in sorted(os.listdir(dir_path)):
+            path = os.path.join(dir_path, entry)
+            seen += 1
+            if os.path.isdir(path):
+                walk(path)
+
+    walk(root)
+    for _, _, filenames in os.walk(root):
+        seen += len(filenames)
+    return seen
+
+
+def shared_walk(root: str) -> int:
+    listing = scan_tree(root)
+    seen = sum(len(entries) for entries in listing.values())
+    for _, _, filenames in walk_listing(listing, root):
+        seen += len(filenames)
+    return seen
+
+
+def drop_caches() -> None:
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export-project directory traversal.")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--per-dir", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--export", action="store_true", help="Also time a full export to /dev/null.")
+    parser.add_argument("--workers", type=int, default=8, help="Reader threads for the timed export.")
+    parser.add_argument("--cold", action="store_true", help="Drop the page cache before each export.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = str(Path(tmp) / "repo")
+        started = time.perf_counter()
+        dirs = make_tree(Path(root), args.files, args.per_dir)
+        print(f"{args.files} files in {dirs} directories, built in {time.perf_counter() - started:.1f}s")
+
+        rows = []
+        for n in range(1, args.rounds + 1):
+            rows.append([n, f"{timed(legacy_walk, root):.2f}", f"{timed(shared_walk, root):.2f}"])
+        print(tabulate(rows, headers=["round", "listdir+isdir, os.walk (s)", "scan_tree, shared (s)"]))
+
+        if args.export:
+            with open(os.devnull, "w", encoding="utf-8") as out:
+                for workers in sorted({1, args.workers}):
+                    if args.cold:
+                        drop_caches()
+                    print(f"full export, {workers} workers: {timed(write_export, out, Path(root), False, None, workers):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Ad-hoc benchmark: lesson names and chapter context for a large lesson sheet.
+#
+#   python tests/bench_lesson_names.py [--lessons 100000] [--chapters 40]
+#
+# Builds a synthetic sheet and times the per-row path generate_desc used to take
+# (extract_lesson_name through .apply, extract_relevant_context per row over
+# df.iterrows()) against lesson_names() and ChapterContext, and checks both give the
+# same names and the same context for every lesson.
+
+import argparse
+import random
+import time
+
+import pandas as pd
+from tabulate import tabulate
+
+from lumiera.data.lessons import ChapterContext, extract_lesson_name, extract_relevant_context, lesson_names
+
+WORDS = ["intro", "vex", "attributes", "loops", "functions", "arrays", "solver", "pyro", "flip", "vellum",
+         "sops", "volumes", "noise", "particles", "shading", "render", "lighting", "rigging", "setup", "review"]
+
+
+def make_sheet(lessons: int, chapters: int, rng: random.Random) -> tuple[pd.DataFrame, dict]:
+    chap_map = {
+        idx: " ".join(
+            f"{' '.join(rng.choices(WORDS, k=rng.randint(6, 14))).capitalize()}{rng.choice('.!?')}"
+            for _ in range(rng.randint(5, 25))
+        )
+        for idx in range(1, chapters + 1)
+    }
+    links = [
+        f"https://rebelway.academy/topic/{i % 100:02d}_{'-'.join(rng.choices(WORDS, k=rng.randint(1, 3)))}-{i}/"
+        for i in range(lessons)
+    ]
+    return pd.DataFrame({"chapter_index": [rng.randint(1, chapters) for _ in links], "link": links}), chap_map
+
+
+def per_row(df: pd.DataFrame, chap_map: dict) -> tuple[list, list]:
+    names = df['link'].apply(extract_lesson_name)
+    contexts = [
+        extract_relevant_context(chap_map.get(int(row['chapter_index']), ""), name)
+        for (_, row), name in zip(df.iterrows(), names)
+    ]
+    return names.tolist(), contexts
+
+
+def vectorised(df: pd.DataFrame, chap_map: dict) -> tuple[list, list]:
+    names = lesson_names(df['link'])
+    chapters = {idx: ChapterContext(desc) for idx, desc in chap_map.items()}
+    no_context = ChapterContext("")
+    contexts = [
+        chapters.get(int(idx), no_context).relevant(name)
+        for idx, name in zip(df['chapter_index'], names)
+    ]
+    return names.tolist(), contexts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lesson-name extraction and context matching.")
+    parser.add_argument("--lessons", type=int, default=100_000)
+    parser.add_argument("--chapters", type=int, default=40)
+    args = parser.parse_args()
+
+    df, chap_map = make_sheet(args.lessons, args.chapters, random.Random(0))
+    rows, results = [], []
+    for label, build in [("per row", per_row), ("vectorised", vectorised)]:
+        started = time.perf_counter()
+        results.append(build(df, chap_map))
+        rows.append([label, f"{time.perf_counter() - started:.2f}s"])
+    for row in rows:
+        row.append(results[0] == results[1])
+    print(tabulate(rows, headers=["path", "time", "same result"]))
+
+
+if __name__ == "__main__":
+    main()
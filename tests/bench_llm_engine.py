@@ -0,0 +1,65 @@
+# Ad-hoc benchmark: lesson-description generation against the stub chat server.
+#
+#   python tests/bench_llm_engine.py [--lessons 400] [--latency 0.5] [--fail-rate 0.05]
+#
+# Sends --lessons requests through lumiera.data.llm.complete_all at several concurrency
+# levels (1 is the old one-at-a-time loop) and checks every answer matches its own
+# request. Uses urllib, so it needs neither the openai package nor an API key.
+
+import argparse
+import json
+import time
+import urllib.request
+
+from tabulate import tabulate
+
+from lumiera.data.llm import complete_all
+from stub_chat_server import serve_in_thread, stub_answer
+
+
+def make_call(base_url: str):
+    def call(request: dict) -> str:
+        req = urllib.request.Request(
+            f"{base_url}/chat/completions",
+            data=json.dumps(request).encode(),
+            headers={"Content-Type": "application/json", "Authorization": "Bearer stub"},
+        )
+        with urllib.request.urlopen(req) as resp:
+            return json.load(resp)["choices"][0]["message"]["content"]
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent chat completions against a stub server.")
+    parser.add_argument("--lessons", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    requests = [
+        {"model": "gpt-4o", "max_completion_tokens": 100, "messages": [
+            {"role": "system", "content": "You are a documentation assistant."},
+            {"role": "user", "content": f"Lesson title:\nLesson {i}\n\nWrite a two-sentence description."},
+        ]}
+        for i in range(args.lessons)
+    ]
+    expected = [stub_answer(r["messages"]) for r in requests]
+
+    rows = []
+    for concurrency in args.concurrency:
+        if concurrency == 1 and args.lessons * args.latency > 120:
+            rows.append([concurrency, "skipped", "", "", ""])
+            continue
+        server = serve_in_thread(latency=args.latency, fail_rate=args.fail_rate)
+        call = make_call(f"http://127.0.0.1:{server.server_port}/v1")
+        started = time.perf_counter()
+        answers, stats = complete_all(requests, call, concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        rows.append([concurrency, f"{elapsed:.1f}s", server.counts["429"], stats["retries"], answers == expected])
+    print(tabulate(rows, headers=["concurrency", "time", "429s", "retries", "in order"]))
+
+
+if __name__ == "__main__":
+    main()
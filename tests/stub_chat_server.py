@@ -0,0 +1,115 @@
+# Local stand-in for the OpenAI chat-completions endpoint.
+#
+#   python tests/stub_chat_server.py [--port 8000] [--latency 0.5] [--rpm 600] [--fail-rate 0.05]
+#
+# POST /v1/chat/completions answers after --latency seconds with "stub-<sha1 of the
+# messages>", so callers can check every answer landed on its own request. Requests
+# over --rpm in the trailing minute, and a random --fail-rate of the others, get a 429
+# with a Retry-After header. Point the openai client at it with
+#
+#   OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=stub python -m lumiera.data.generate_desc ...
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_answer(messages) -> str:
+    return "stub-" + hashlib.sha1(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class StubChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, rpm=None, fail_rate=0.0, seed=0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.rpm = rpm
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.counts = {"ok": 0, "429": 0}
+
+    def admit(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and self.recent[0] < now - 60:
+                self.recent.popleft()
+            if (self.rpm is not None and len(self.recent) >= self.rpm) or self.rng.random() < self.fail_rate:
+                self.counts["429"] += 1
+                return False
+            self.recent.append(now)
+            self.counts["ok"] += 1
+            return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"no route {self.path}"}})
+            return
+        if not self.server.admit():
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                       headers=[("Retry-After", "1")])
+            return
+        time.sleep(self.server.latency)
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        self._send(200, {
+            "id": f"chatcmpl-stub-{time.monotonic_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": stub_answer(messages)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 5, "total_tokens": prompt_tokens + 5},
+        })
+
+
+def serve_in_thread(**kwargs) -> StubChatServer:
+    """Start a stub on a free port in a daemon thread; its URL base is http://127.0.0.1:<server_port>/v1."""
+    server = StubChatServer(("127.0.0.1", 0), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub chat-completions server.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per answer")
+    parser.add_argument("--rpm", type=int, default=None, help="Answer 429 above this many requests per minute")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered 429 at random")
+    args = parser.parse_args()
+    server = StubChatServer(("127.0.0.1", args.port), latency=args.latency, rpm=args.rpm, fail_rate=args.fail_rate)
+    print(f"Serving on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
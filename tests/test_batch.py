@@ -0,0 +1,90 @@
+from lumiera.data.batch import LocalBatchBackend, batch_line, parse_output, run_batch, split_requests
+from lumiera.data.prompt_cache import PromptCache
+
+
+class HeldBackend(LocalBatchBackend):
+    """Local batches that stay in progress until released."""
+
+    def __init__(self, root):
+        super().__init__(root, answer=lambda body: "answer to " + body["messages"][0]["content"])
+        self.released = False
+        self.submitted = []
+
+    def submit(self, path):
+        batch_id = super().submit(path)
+        self.submitted.append(batch_id)
+        return batch_id
+
+    def status(self, batch_id):
+        return super().status(batch_id) if self.released else "in_progress"
+
+
+def request(prompt: str) -> dict:
+    return {"model": "gpt-4o", "messages": [{"role": "user", "content": prompt}]}
+
+
+def test_changed_requests_are_resubmitted(tmp_path):
+    backend = HeldBackend(tmp_path / "batches")
+    batch_path = tmp_path / "lessons.batch.jsonl"
+    cache = PromptCache(tmp_path / "prompts.sqlite3")
+
+    assert run_batch({"row-0": request("OLD prompt")}, backend, batch_path, wait=False, cache=cache) is None
+    backend.released = True
+    answers, errors = run_batch({"row-0": request("NEW prompt")}, backend, batch_path, cache=cache)
+
+    assert len(backend.submitted) == 2
+    assert answers == {"row-0": "answer to NEW prompt"} and errors == {}
+    assert cache.get(request("NEW prompt")) == "answer to NEW prompt"
+    assert cache.get(request("OLD prompt")) is None
+    cache.close()
+
+
+def test_unchanged_requests_pick_up_the_batch(tmp_path):
+    backend = HeldBackend(tmp_path / "batches")
+    batch_path = tmp_path / "lessons.batch.jsonl"
+    requests = {"row-0": request("first"), "row-1": request("second")}
+
+    assert run_batch(requests, backend, batch_path, wait=False) is None
+    backend.released = True
+    answers, errors = run_batch(requests, backend, batch_path)
+
+    assert len(backend.submitted) == 1
+    assert answers == {"row-0": "answer to first", "row-1": "answer to second"} and errors == {}
+    assert not batch_path.with_suffix(".state.json").exists()
+
+
+def test_large_runs_are_split_over_several_batches(tmp_path):
+    backend = HeldBackend(tmp_path / "batches")
+    batch_path = tmp_path / "lessons.batch.jsonl"
+    requests = {f"row-{i}": request(f"prompt {i}") for i in range(5)}
+
+    assert run_batch(requests, backend, batch_path, wait=False, max_requests=2) is None
+    assert len(backend.submitted) == 3
+    assert sorted(p.name for p in tmp_path.glob("lessons.batch*.jsonl")) == [
+        "lessons.batch-1.jsonl", "lessons.batch-2.jsonl", "lessons.batch.jsonl"]
+
+    backend.released = True
+    answers, errors = run_batch(requests, backend, batch_path, max_requests=2)
+    assert len(backend.submitted) == 3
+    assert answers == {f"row-{i}": f"answer to prompt {i}" for i in range(5)} and errors == {}
+    assert list(tmp_path.glob("lessons.batch*")) == []
+
+
+def test_split_requests_limits():
+    requests = {f"row-{i}": request("x" * 100) for i in range(10)}
+    line = len(batch_line("row-0", requests["row-0"]))
+    assert [len(part) for part in split_requests(requests, max_requests=4)] == [4, 4, 2]
+    assert [len(part) for part in split_requests(requests, max_bytes=3 * line)] == [3, 3, 3, 1]
+    assert [len(part) for part in split_requests(requests, max_bytes=1)] == [1] * 10
+
+
+def test_missing_content_is_an_error():
+    ok = {"custom_id": "a", "response": {"status_code": 200, "body": {"choices": [
+        {"finish_reason": "stop", "message": {"content": " fine "}}]}}}
+    refused = {"custom_id": "b", "response": {"status_code": 200, "body": {"choices": [
+        {"finish_reason": "stop", "message": {"content": None, "refusal": "I can't help with that."}}]}}}
+    filtered = {"custom_id": "c", "response": {"status_code": 200, "body": {"choices": [
+        {"finish_reason": "content_filter", "message": {"content": None}}]}}}
+    answers, errors = parse_output([ok, refused, filtered])
+    assert answers == {"a": "fine"}
+    assert errors == {"b": "I can't help with that.", "c": "no content (finish_reason content_filter)"}
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+
+from lumiera.export.budget import Budget, plan_budget
+
+
+def make_files(root: Path) -> list[tuple[Path, Path]]:
+    """One large module followed by many tiny packages."""
+    (root / "big.py").write_text("x = 1\n" * 20_000)
+    files = [(root / "big.py", Path("big.py"))]
+    for i in range(40):
+        pkg = root / f"pkg{i:02d}"
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("# package\n")
+        files.append((pkg / "__init__.py", Path(f"pkg{i:02d}/__init__.py")))
+    return files
+
+
+@pytest.mark.parametrize("limits", [{"max_tokens": 5000}, {"max_bytes": 20000}])
+def test_single_limit_keeps_small_files_after_truncation(tmp_path, limits):
+    plan = plan_budget(make_files(tmp_path), Budget(**limits), (0, 0))
+    kinds = {key: kind for key, (kind, _, _) in plan.items()}
+    assert kinds.pop("big.py") == "truncated"
+    assert set(kinds.values()) == {"full"}
+
+
+def test_both_limits_bound_the_plan(tmp_path):
+    budget = Budget(max_tokens=5000, max_bytes=20000)
+    plan = plan_budget(make_files(tmp_path), budget, (0, 0))
+    tokens = sum(allowance[0] for _, allowance, _ in plan.values())
+    nbytes = sum(allowance[1] for _, allowance, _ in plan.values())
+    assert tokens <= 5000 and nbytes <= 20000
@@ -0,0 +1,63 @@
+import json
+
+import click
+import pytest
+
+from lumiera.backup.catalog import CATALOG_NAME, Catalog
+from lumiera.backup.jobs import backup_history, backup_job, restore_job
+
+
+def test_a_missing_catalog_is_seeded_from_the_files(tmp_path):
+    for name in ("docs-1.tar.gz", "docs-2.tar.gz", "photos-7.manifest.json", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x" * 10)
+    (tmp_path / "docs-2.meta.json").write_text(json.dumps({"kind": "delta"}))
+
+    catalog = Catalog(tmp_path)
+    assert catalog.jobs() == ["docs", "photos"]
+    assert [(r["version"], r["kind"]) for r in catalog.versions("docs")] == [(1, "full"), (2, "delta")]
+    assert catalog.versions("docs")[1]["bytes"] == 10 + len(json.dumps({"kind": "delta"}))
+    assert catalog.latest("photos")["kind"] == "chunked"
+    assert (tmp_path / CATALOG_NAME).exists()
+
+
+def test_removed_versions_are_never_reused(tmp_path):
+    catalog = Catalog(tmp_path)
+    for version in (1, 2):
+        catalog.add({"job": "docs", "version": version, "file": f"docs-{version}.tar.gz", "kind": "full"})
+    catalog.remove("docs", 2)
+    assert catalog.next_version("docs") == 3
+
+    reloaded = Catalog(tmp_path)
+    assert [r["version"] for r in reloaded.versions("docs")] == [1]
+    assert reloaded.next_version("docs") == 3
+    assert reloaded.get("docs", 2) is None
+
+
+def test_a_torn_last_line_is_ignored(tmp_path):
+    catalog = Catalog(tmp_path)
+    catalog.add({"job": "docs", "version": 1, "file": "docs-1.tar.gz", "kind": "full"})
+    with open(tmp_path / CATALOG_NAME, "a") as f:
+        f.write('{"op": "add", "job": "docs", "vers')
+    assert [r["version"] for r in Catalog(tmp_path).versions("docs")] == [1]
+
+
+def test_backups_are_recorded_and_missing_archives_reported(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    src, dest = tmp_path / "notes", tmp_path / "backups"
+    src.mkdir()
+    (src / "a.txt").write_text("alpha")
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"bk_jobs": [{"name": "notes", "source": [str(src)], "destination": str(dest)}]}))
+
+    backup_job(config, "notes")
+    record = Catalog(dest).latest("notes")
+    assert record["version"] == 1 and record["files"] == 1 and record["source_hash"]
+
+    capsys.readouterr()
+    backup_history(config, "notes")
+    assert record["source_hash"][:12] in capsys.readouterr().out
+
+    (dest / record["file"]).unlink()
+    with pytest.raises(click.Abort):
+        restore_job(config, "notes")
+    assert "is missing" in capsys.readouterr().out
@@ -0,0 +1,71 @@
+import os
+import random
+
+import pytest
+
+from lumiera.backup import chunks
+from lumiera.backup.chunks import MAX_CHUNK, MIN_CHUNK, ChunkStore, backup_chunked, find_cut, iter_chunks, restore_chunked
+
+
+def random_bytes(n: int, seed: int = 0) -> bytes:
+    return random.Random(seed).randbytes(n)
+
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "big.bin").write_bytes(random_bytes(6 * 1024 * 1024))
+    (src / "sub" / "small.txt").write_text("small\n" * 100)
+    (src / "link").symlink_to("big.bin")
+    return src
+
+
+def test_chunks_cover_the_stream_within_bounds(tmp_path):
+    data = random_bytes(9 * 1024 * 1024)
+    (tmp_path / "f").write_bytes(data)
+    with open(tmp_path / "f", "rb") as fp:
+        parts = list(iter_chunks(fp))
+    assert b"".join(parts) == data
+    assert all(MIN_CHUNK <= len(p) <= MAX_CHUNK for p in parts[:-1])
+
+
+def test_numpy_and_python_cut_points_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    buf = bytearray(random_bytes(2 * 1024 * 1024, seed=3))
+    with_numpy = find_cut(buf)
+    monkeypatch.setattr(chunks, "np", None)
+    assert find_cut(buf) == with_numpy
+
+
+def test_backup_round_trip_and_dedup(tmp_path, src):
+    dest = tmp_path / "dest"
+    first, stats = backup_chunked([src], dest, "docs", 1)
+    assert stats["chunks_new"] > 1
+
+    # unchanged files are not read again
+    second, stats = backup_chunked([src], dest, "docs", 2, previous=first)
+    assert stats["bytes_read"] == 0 and stats["chunks_new"] == 0
+
+    # an edit in the middle of a large file only stores the chunks around it
+    data = bytearray((src / "big.bin").read_bytes())
+    data[3_000_000:3_000_000] = b"inserted"
+    (src / "big.bin").write_bytes(data)
+    third, stats = backup_chunked([src], dest, "docs", 3, previous=second)
+    assert 0 < stats["chunks_new"] <= 2
+
+    out = tmp_path / "out"
+    assert restore_chunked(third, out) == 2
+    assert (out / "src" / "big.bin").read_bytes() == bytes(data)
+    assert (out / "src" / "sub" / "small.txt").read_text() == "small\n" * 100
+    assert os.readlink(out / "src" / "link") == "big.bin"
+
+
+def test_corrupted_chunks_are_detected(tmp_path):
+    store = ChunkStore(tmp_path)
+    digest, written = store.put(b"hello" * 1000)
+    assert 0 < written < 5000
+    assert store.put(b"hello" * 1000) == (digest, 0)
+    store.path_for(digest).write_bytes(b"r" + b"tampered")
+    with pytest.raises(ValueError):
+        store.get(digest)
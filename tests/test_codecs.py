@@ -0,0 +1,48 @@
+import os
+import tarfile
+
+import pytest
+
+from lumiera.backup.archive import write_archive
+from lumiera.backup.codecs import CODECS, detect_codec, open_archive, parse_compression
+
+
+@pytest.fixture
+def tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "notes.txt").write_text("notes " * 50_000)
+    (src / "sub" / "clip.mp4").write_bytes(os.urandom(200_000))
+    return src
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_round_trip(tmp_path, tree, name):
+    codec, level = parse_compression(name)
+    archive = tmp_path / f"out{codec.suffix}"
+    write_archive(archive, [tree], codec, level, jobs=4)
+
+    # named .tar whatever the codec: detection goes by the bytes
+    renamed = archive.rename(tmp_path / "renamed.tar")
+    assert detect_codec(renamed) is codec
+    with open_archive(renamed) as tar:
+        members = {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}
+    assert members == {
+        "src/notes.txt": (tree / "notes.txt").read_bytes(),
+        "src/sub/clip.mp4": (tree / "sub" / "clip.mp4").read_bytes(),
+    }
+
+
+def test_gz_archives_are_readable_by_tarfile(tmp_path, tree):
+    codec, level = parse_compression("gz:1")
+    write_archive(tmp_path / "out.tar.gz", [tree], codec, level, jobs=4)
+    with tarfile.open(tmp_path / "out.tar.gz", "r:gz") as tar:
+        assert tar.extractfile("src/notes.txt").read() == (tree / "notes.txt").read_bytes()
+
+
+def test_parse_compression():
+    assert parse_compression(None) == (CODECS["gz"], 9)
+    assert parse_compression("xz:0") == (CODECS["xz"], 0)
+    for bad in ("lz4", "gz:0", "gz:fast"):
+        with pytest.raises(ValueError):
+            parse_compression(bad)
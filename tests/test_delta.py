@@ -0,0 +1,59 @@
+import json
+
+from lumiera.backup.delta import plan_version, read_meta, restore_plan
+from lumiera.backup.jobs import backup_job, list_versions, restore_job
+
+
+def entries(**digests) -> dict:
+    return {f"{name}.txt": {"digest": digest} for name, digest in digests.items()}
+
+
+def test_plan_version_chains_deltas_on_the_last_full():
+    meta, changed = plan_version(None, entries(a="1", b="1"), 1, full_every=3)
+    assert meta["kind"] == "full" and changed is None
+
+    meta, changed = plan_version(meta, entries(a="2", b="1", c="1"), 2, full_every=3)
+    assert (meta["kind"], meta["base"], meta["parent"]) == ("delta", 1, 1)
+    assert changed == {"a.txt", "c.txt"}
+
+    meta, changed = plan_version(meta, entries(a="2", c="1"), 3, full_every=3)
+    assert changed == set() and meta["deleted"] == ["b.txt"]
+    assert restore_plan(meta) == {3: set(), 2: {"a.txt", "c.txt"}}
+
+    meta, changed = plan_version(meta, entries(a="2", c="1"), 4, full_every=3)
+    assert meta["kind"] == "full" and changed is None
+
+
+def test_restore_walks_the_chain(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    src = tmp_path / "notes"
+    src.mkdir()
+    dest = tmp_path / "backups"
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"bk_jobs": [{
+        "name": "notes", "source": [str(src)], "destination": str(dest), "full_every": 3,
+    }]}))
+
+    def backup(**files):
+        for name, text in files.items():
+            if text is None:
+                (src / name).unlink()
+            else:
+                (src / name).write_text(text)
+        # verify: rehash everything, edits within the stat cache's racy window included
+        backup_job(config, "notes", verify=True)
+
+    backup(**{"a.txt": "a1", "b.txt": "b1"})
+    backup(**{"a.txt": "a2"})
+    backup(**{"b.txt": None, "c.txt": "c3"})
+    assert [read_meta(dest, "notes", v)["kind"] for v, _ in list_versions(dest, "notes")] == ["full", "delta", "delta"]
+    assert read_meta(dest, "notes", 3)["deleted"] == ["notes/b.txt"]
+
+    for name in ("a.txt", "c.txt"):
+        (src / name).unlink()
+    restore_job(config, "notes", version=3)
+    assert (src / "a.txt").read_text() == "a2" and (src / "c.txt").read_text() == "c3"
+    assert not (src / "b.txt").exists()
+
+    restore_job(config, "notes", version=1)
+    assert (src / "a.txt").read_text() == "a1" and (src / "b.txt").read_text() == "b1"
@@ -0,0 +1,80 @@
+import pytest
+
+from lumiera.export.project import build_tree, dump_code_files, export_project
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    for rel, text in {
+        "pkg/__init__.py": "",
+        "pkg/mod.py": '\n\nprint("hi")\n\n',
+        "README.md": "# Title\n",
+        "data.json": '{"a": 1}\n',
+        ".env": "SECRET=1\n",
+        "__pycache__/m.pyc": "x\n",
+        ".hidden/conf.toml": "k = 1\n",
+        "logo.svg": "img\n",
+    }.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
+
+
+def expected(root) -> str:
+    return f"""```
+{root}
+├── .hidden
+│   └── conf.toml
+├── README.md
+├── __pycache__
+│   // * files hidden for brevity
+├── data.json
+├── logo.svg
+└── pkg
+    ├── __init__.py
+    └── mod.py
+
+3 directories, 6 files
+
+```
+
+path: data.json
+
+```json
+{{"a": 1}}
+```
+
+path: pkg/mod.py
+
+```python
+print("hi")
+```"""
+
+
+def test_export_to_file(repo, tmp_path):
+    out = tmp_path / "out.md"
+    export_project(str(repo), str(out))
+    assert out.read_text() == expected(repo)
+
+
+def test_export_to_stdout_ends_with_a_newline(repo, capsys):
+    export_project(str(repo))
+    assert capsys.readouterr().out == expected(repo) + "\n"
+
+
+@pytest.mark.parametrize("with_code", [True, False])
+def test_streamed_output_matches_the_joined_strings(repo, tmp_path, with_code):
+    if not with_code:
+        for path in (repo / "pkg" / "mod.py", repo / "data.json"):
+            path.unlink()
+    out = tmp_path / "out.md"
+    export_project(str(repo), str(out))
+    joined = "\n\n".join(["```\n" + build_tree(repo) + "\n```", dump_code_files(repo)])
+    assert out.read_text() == joined
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from lumiera.export.cache import ExportCache
+from lumiera.export.project import export_project, render_code_file
+from lumiera.export.since import changed_since
+
+
+def age(path, seconds: float = 60) -> None:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+@pytest.fixture
+def counted():
+    calls = []
+
+    def render(path, rel_path):
+        calls.append(rel_path.as_posix())
+        return render_code_file(path, rel_path)
+    return render, calls
+
+
+def test_unchanged_files_are_not_read_again(tmp_path, counted):
+    render, calls = counted
+    db = tmp_path / "export.sqlite3"
+    src = tmp_path / "mod.py"
+    src.write_text("x = 1\n")
+    age(src)
+
+    first = ExportCache(tmp_path, db)
+    blocks = first.render(render, str(src), src.relative_to(tmp_path))
+    first.close()
+    again = ExportCache(tmp_path, db)
+    assert again.render(render, str(src), src.relative_to(tmp_path)) == blocks
+    assert (again.hits, again.misses, calls) == (1, 0, ["mod.py"])
+    again.close()
+
+    src.write_text("x = 22\n")
+    age(src, 30)
+    changed = ExportCache(tmp_path, db)
+    assert changed.render(render, str(src), src.relative_to(tmp_path)) == ["path: mod.py", "```python\nx = 22\n```"]
+    assert changed.misses == 1
+    changed.close()
+
+    # renders made with other options are not reused
+    other = ExportCache(tmp_path, db, variant="other")
+    other.render(render, str(src), src.relative_to(tmp_path))
+    assert other.misses == 1
+    other.close()
+
+
+def test_recent_files_are_not_cached_and_gone_files_are_dropped(tmp_path, counted):
+    render, calls = counted
+    db = tmp_path / "export.sqlite3"
+    fresh, old = tmp_path / "fresh.py", tmp_path / "old.py"
+    fresh.write_text("f = 1\n")
+    old.write_text("o = 1\n")
+    age(old)
+
+    for _ in range(2):
+        cache = ExportCache(tmp_path, db)
+        cache.render(render, str(fresh), fresh.relative_to(tmp_path))
+        cache.render(render, str(old), old.relative_to(tmp_path))
+        cache.close(prune=True)
+    assert calls == ["fresh.py", "old.py", "fresh.py"]
+
+    # a full export that no longer sees old.py forgets it
+    ExportCache(tmp_path, db).close(prune=True)
+    cache = ExportCache(tmp_path, db)
+    cache.render(render, str(old), old.relative_to(tmp_path))
+    assert cache.misses == 1
+    cache.close()
+
+
+def git(root, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", "-C", str(root), *args],
+                   check=True, capture_output=True)
+
+
+def test_since_a_git_ref(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    root = tmp_path / "repo"
+    root.mkdir()
+    for name in ("kept.py", "edited.py", "staged.py"):
+        (root / name).write_text(f"# {name}\n")
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    git(root, "commit", "-qm", "base")
+    (root / "edited.py").write_text("# edited\n")
+    (root / "staged.py").write_text("# staged\n")
+    git(root, "add", "staged.py")
+    (root / "new.py").write_text("# new\n")
+
+    assert changed_since(root, "HEAD", []) == {"edited.py", "staged.py", "new.py"}
+    export_project(str(root), since="HEAD")
+    out = capsys.readouterr().out
+    assert "path: edited.py" in out and "path: new.py" in out and "path: staged.py" in out
+    assert "kept.py" not in out and "directories," not in out
+
+
+def test_since_a_timestamp(tmp_path):
+    old, new = tmp_path / "old.py", tmp_path / "new.py"
+    old.write_text("o\n")
+    new.write_text("n\n")
+    age(old, 3600)
+    files = [(str(p), p.relative_to(tmp_path)) for p in (old, new)]
+    assert changed_since(tmp_path, str(time.time() - 60), files) == {"new.py"}
+    with pytest.raises(ValueError):
+        changed_since(tmp_path, "not-a-ref-or-date", files)
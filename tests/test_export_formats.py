@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+import tarfile
+
+import pytest
+
+from lumiera.export.project import dump_code_files, export_project
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "mod.py").write_text("\nprint('héllo')\r\n")
+    (root / "README.md").write_text("# Title\n")
+    (root / "config.toml").write_text("k = 1\n")
+    (root / "blob.json").write_bytes(os.urandom(10_000))
+    (root / "notes.log").write_text("not exported\n")
+    return root
+
+
+def test_jsonl_records(repo, tmp_path):
+    out = tmp_path / "out.jsonl"
+    export_project(str(repo), str(out), fmt="jsonl", workers=4)
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    by_path = {r["path"]: r for r in records}
+    assert set(by_path) == {"pkg/mod.py", "config.toml", "blob.json"}
+
+    mod = by_path["pkg/mod.py"]
+    data = (repo / "pkg" / "mod.py").read_bytes()
+    assert mod == {"path": "pkg/mod.py", "language": "python", "size": len(data),
+                   "sha256": hashlib.sha256(data).hexdigest(), "content": data.decode()}
+    assert by_path["config.toml"]["language"] == "toml"
+    blob = by_path["blob.json"]
+    assert blob["content"] is None and blob["skipped"] == "binary"
+    assert blob["sha256"] == hashlib.sha256((repo / "blob.json").read_bytes()).hexdigest()
+
+
+def test_same_files_in_the_same_order_as_markdown(repo, tmp_path):
+    export_project(str(repo), str(tmp_path / "out.jsonl"), fmt="jsonl")
+    paths = [json.loads(line)["path"] for line in (tmp_path / "out.jsonl").read_text().splitlines()]
+    markdown = [line.split()[1] for line in dump_code_files(repo).splitlines() if line.startswith("path: ")]
+    assert paths == markdown
+
+
+def test_tar_holds_the_files_byte_for_byte(repo, tmp_path):
+    out = tmp_path / "out.tar"
+    export_project(str(repo), str(out), fmt="tar")
+    with tarfile.open(out) as tar:
+        members = {m.name: tar.extractfile(m).read() for m in tar}
+    assert members == {rel: (repo / rel).read_bytes() for rel in ("pkg/mod.py", "config.toml", "blob.json")}
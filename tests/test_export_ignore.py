@@ -0,0 +1,62 @@
+import os
+import subprocess
+
+import pytest
+
+from lumiera.export.project import scan_tree, walk_listing
+
+GITIGNORE = {
+    ".gitignore": "*.log\n!keep.log\nbuild/\n/top.txt\ndocs/**/draft*\n\\#hash.txt\nfoo?.c\n[ab].tmp\ncache/*\n!cache/.keep\n",
+    "src/.gitignore": "*.gen.py\n!/special.gen.py\nnested/\n",
+    "src/deep/.gitignore": "!*.log\n",
+}
+
+FILES = [
+    "app.log", "keep.log", "top.txt", "sub/top.txt", "#hash.txt", "foo1.c", "foo12.c", "a.tmp", "c.tmp",
+    "build/out.o", "src/build/x.py", "build.py", "docs/a/b/draft1.md", "docs/final.md", "docs/draft.md",
+    "cache/x.bin", "cache/.keep", "src/m.gen.py", "src/special.gen.py", "src/sub/special.gen.py",
+    "src/nested/n.py", "src/deep/trace.log", "src/deep/inner/trace.log", "excluded.dat", "plain.py",
+]
+
+
+def build(root):
+    for rel, text in GITIGNORE.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(text)
+    for rel in FILES:
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(rel + "\n")
+
+
+def exported(root, **kwargs) -> set[str]:
+    listing = scan_tree(root, **kwargs)
+    return {
+        os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+        for dirpath, _, filenames in walk_listing(listing, root) for name in filenames
+    }
+
+
+def test_matches_git_ls_files(tmp_path):
+    build(tmp_path)
+    try:
+        subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    except FileNotFoundError:
+        pytest.skip("git is not installed")
+    (tmp_path / ".git" / "info").mkdir(exist_ok=True)
+    (tmp_path / ".git" / "info" / "exclude").write_text("excluded.dat\n")
+    listed = subprocess.run(["git", "-C", str(tmp_path), "ls-files", "--others", "--exclude-standard"],
+                            check=True, capture_output=True, text=True).stdout.split()
+
+    assert exported(tmp_path) == set(listed)
+    # a sanity check that the fixture exercises both sides
+    assert "keep.log" in listed and "app.log" not in listed and "src/deep/trace.log" in listed
+
+
+def test_lumieraignore_and_opt_outs(tmp_path):
+    build(tmp_path)
+    (tmp_path / ".lumieraignore").write_text("plain.py\n!app.log\n")
+    files = exported(tmp_path)
+    assert "plain.py" not in files and "app.log" in files
+
+    assert exported(tmp_path, overrides={".log"}) >= {"app.log", "src/deep/trace.log"}
+    assert exported(tmp_path, use_ignore=False) >= set(FILES)
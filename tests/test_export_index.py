@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from lumiera.export.index import ProjectIndex, query_regex
+from lumiera.export.project import export_project
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    root = tmp_path / "repo"
+    for rel, text in {
+        "src/app/cli.py": "import click\n\n@click.command()\ndef main(): pass\n",
+        "src/app/core.py": "def render(frame):\n    return frame\n",
+        "tests/test_core.py": "from app.core import render\n",
+        "pyproject.toml": "[project]\nname = 'app'\n",
+        "blob.json": "\0binary",
+    }.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(text)
+        # older than the racy window, so the index trusts their mtimes
+        past = time.time() - 120
+        os.utime(root / rel, (past, past))
+    return root
+
+
+def test_query_regex():
+    regex = query_regex(["src/*.py", "cli.py", "tests/"])
+    # a path glob, everything under a matching directory, or a bare file name anywhere
+    assert regex.match("src/core.py") and not regex.match("lib/core.py")
+    assert regex.match("tests/unit/test_x.py") and not regex.match("mytests/x.py")
+    assert regex.match("cli.py") and regex.match("src/app/cli.py") and not regex.match("lib/mycli.py")
+
+
+@pytest.mark.parametrize("with_trigrams", [False, True])
+def test_select_by_path_and_text(repo, tmp_path, with_trigrams):
+    index = ProjectIndex(tmp_path / "index.sqlite3")
+    assert index.build(repo, with_trigrams=with_trigrams, workers=2)["files"] == 5
+
+    def names(**kwargs):
+        return [rel.as_posix() for _, rel in index.select(repo, **kwargs)]
+
+    assert names(patterns=["src/**/*.py"]) == ["src/app/cli.py", "src/app/core.py"]
+    assert names(grep="RENDER") == ["src/app/core.py", "tests/test_core.py"]
+    assert names(patterns=["tests"], grep="render") == ["tests/test_core.py"]
+    assert names(grep="no such text") == []
+    index.close()
+
+
+def test_rebuild_reads_only_changed_files(repo, tmp_path):
+    index = ProjectIndex(tmp_path / "index.sqlite3")
+    index.build(repo, with_trigrams=True)
+    past = time.time() - 60
+    (repo / "src" / "app" / "core.py").write_text("def render(frame, scale):\n    return frame\n")
+    os.utime(repo / "src" / "app" / "core.py", (past, past))
+    (repo / "pyproject.toml").unlink()
+
+    assert index.build(repo, with_trigrams=True) == {"files": 4, "read": 1, "removed": 1}
+    assert [rel.as_posix() for _, rel in index.select(repo, grep="scale")] == ["src/app/core.py"]
+    index.close()
+
+
+def test_export_from_the_index(repo, tmp_path, capsys):
+    index = ProjectIndex()
+    index.build(repo)
+    index.close()
+
+    export_project(str(repo), query=["*.py"], grep="click")
+    out = capsys.readouterr().out
+    assert out.startswith("path: src/app/cli.py\n\n```python\nimport click")
+    assert "core.py" not in out and "directories," not in out
+
+
+def test_unindexed_roots_are_an_error(repo, tmp_path):
+    index = ProjectIndex(tmp_path / "index.sqlite3")
+    with pytest.raises(ValueError, match="not indexed"):
+        index.select(repo, ["*.py"])
+    index.close()
@@ -0,0 +1,48 @@
+import random
+import threading
+import time
+
+from lumiera.export import project
+from lumiera.export.project import PREFETCH_BATCH, PREFETCH_PER_WORKER, _prefetch, dump_code_files
+
+
+def test_prefetch_keeps_order_under_uneven_latency():
+    rng = random.Random(0)
+    delays = [rng.random() / 1000 for _ in range(500)]
+
+    def slow(i, delay):
+        time.sleep(delay)
+        return i
+
+    assert list(_prefetch(slow, enumerate(delays), workers=8)) == list(range(500))
+
+
+def test_prefetch_reads_ahead_a_bounded_window():
+    consumed = 0
+    lock = threading.Lock()
+
+    def items():
+        nonlocal consumed
+        for i in range(10_000):
+            with lock:
+                consumed += 1
+            yield (i,)
+
+    results = _prefetch(lambda i: i, items(), workers=2)
+    assert next(results) == 0
+    assert consumed <= (2 * PREFETCH_PER_WORKER + 1) * PREFETCH_BATCH
+    assert list(results) == list(range(1, 10_000))
+
+
+def test_worker_count_does_not_change_the_output(tmp_path, monkeypatch):
+    for i in range(120):
+        sub = tmp_path / f"d{i % 7}"
+        sub.mkdir(exist_ok=True)
+        (sub / f"f{i}.py").write_text(f"x = {i}\n" * (i % 5 + 1))
+    serial = dump_code_files(tmp_path)
+
+    # unevenly slow reads, so later files finish before earlier ones
+    render = project.render_code_file
+    monkeypatch.setattr(project, "render_code_file",
+                        lambda path, rel_path, **kw: time.sleep(random.random() / 2000) or render(path, rel_path, **kw))
+    assert dump_code_files(tmp_path, workers=8) == serial
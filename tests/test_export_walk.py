@@ -0,0 +1,48 @@
+import os
+
+from lumiera.export.project import build_tree, dump_code_files, scan_tree, walk_listing
+
+
+def make_tree(root):
+    for rel in ("a/b/c/deep.py", "a/one.py", "a/two.txt", "z.md", "m/n/x.toml", "m/.dot/y.py", "empty/.keep"):
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel + "\n")
+    (root / "link-dir").symlink_to("a", target_is_directory=True)
+    (root / "link-file.py").symlink_to("z.md")
+    (root / "dangling").symlink_to("missing")
+
+
+def test_walk_listing_is_os_walk(tmp_path):
+    make_tree(tmp_path)
+    listing = scan_tree(tmp_path)
+    assert list(walk_listing(listing, tmp_path)) == list(os.walk(str(tmp_path)))
+
+
+def test_pruning_dirnames_works_as_with_os_walk(tmp_path):
+    make_tree(tmp_path)
+
+    def pruned(walk):
+        seen = []
+        for dirpath, dirnames, filenames in walk:
+            dirnames[:] = [d for d in dirnames if d != "b"]
+            seen.append((dirpath, sorted(filenames)))
+        return seen
+
+    assert pruned(walk_listing(scan_tree(tmp_path), tmp_path)) == pruned(os.walk(str(tmp_path)))
+
+
+def test_skipped_directories_are_not_entered(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "m.pyc").write_text("x")
+    listing = scan_tree(tmp_path)
+    assert str(tmp_path / "__pycache__") not in listing
+    assert str(tmp_path / "__pycache__") in scan_tree(tmp_path, overrides={"__pycache__"})
+
+
+def test_shared_listing_renders_the_same(tmp_path):
+    make_tree(tmp_path)
+    listing = scan_tree(tmp_path)
+    assert build_tree(tmp_path, listing=listing) == build_tree(tmp_path)
+    assert dump_code_files(tmp_path, listing=listing) == dump_code_files(tmp_path)
@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from lumiera.backup import index
+from lumiera.backup.index import FileIndex, scan_sources
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """The paths hash_file reads, in order."""
+    seen = []
+    real = index.hash_file
+
+    def counting(path):
+        seen.append(os.path.basename(path))
+        return real(path)
+    monkeypatch.setattr(index, "hash_file", counting)
+    return seen
+
+
+def age(*paths, seconds: float = 60) -> None:
+    past = time.time() - seconds
+    for path in paths:
+        os.utime(path, (past, past))
+
+
+def test_unchanged_files_are_not_read_again(tmp_path, hashed):
+    src = tmp_path / "src"
+    src.mkdir()
+    a, b = src / "a.txt", src / "b.txt"
+    a.write_text("alpha")
+    b.write_text("beta")
+    age(a, b)
+    cache = tmp_path / "index.json"
+
+    first, entries, read = scan_sources([src], FileIndex(cache))
+    assert sorted(hashed) == ["a.txt", "b.txt"] and set(entries) == {"src/a.txt", "src/b.txt"}
+    assert read == 9
+
+    hashed.clear()
+    assert scan_sources([src], FileIndex(cache))[0] == first
+    assert hashed == []
+
+    # same size, different content and mtime: re-read, and the aggregate moves
+    a.write_text("ALPHA")
+    age(a, seconds=30)
+    changed, _, read = scan_sources([src], FileIndex(cache))
+    assert hashed == ["a.txt"] and changed != first and read == 5
+
+    # a full rehash agrees with the cached scan
+    hashed.clear()
+    assert scan_sources([src], FileIndex(cache), verify=True)[0] == changed
+    assert sorted(hashed) == ["a.txt", "b.txt"]
+
+
+def test_recently_modified_files_are_always_read(tmp_path, hashed):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "fresh.txt").write_text("just written")
+    cache = tmp_path / "index.json"
+    scan_sources([src], FileIndex(cache))
+    scan_sources([src], FileIndex(cache))
+    assert hashed == ["fresh.txt", "fresh.txt"]
+
+
+def test_renames_change_the_aggregate(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.txt").write_text("alpha")
+    before = scan_sources([src], FileIndex())[0]
+    (src / "a.txt").rename(src / "b.txt")
+    assert scan_sources([src], FileIndex())[0] != before
+
+
+def test_a_broken_index_only_costs_a_rehash(tmp_path):
+    cache = tmp_path / "index.json"
+    cache.write_text("{not json")
+    assert FileIndex(cache).entries == {}
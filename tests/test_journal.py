@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from lumiera.data.journal import Journal
+from lumiera.data.llm import complete_all
+
+
+def test_a_torn_line_is_skipped_and_closed_off(tmp_path):
+    path = tmp_path / "out.journal.jsonl"
+    journal = Journal(path)
+    journal.append({"row": 0, "description": "first"})
+    journal.append({"row": 1, "description": "second"})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"row": 2, "descr')
+
+    resumed = Journal(path, resume=True)
+    assert [r["row"] for r in resumed.load()] == [0, 1]
+    resumed.append({"row": 2, "description": "third"})
+    resumed.close()
+    assert [r["row"] for r in Journal(path, resume=True).load()] == [0, 1, 2]
+
+
+def test_without_resume_the_journal_starts_afresh(tmp_path):
+    path = tmp_path / "out.journal.jsonl"
+    path.write_text(json.dumps({"row": 0}) + "\n")
+    journal = Journal(path)
+    assert journal.load() == []
+    journal.close(remove=True)
+    assert not path.exists()
+
+
+def test_an_interrupted_run_resumes_where_it_stopped(tmp_path):
+    path = tmp_path / "out.journal.jsonl"
+    prompts = [f"lesson {i}" for i in range(20)]
+    sent, down = [], {"lesson 12"}
+
+    def call(request):
+        prompt = request["messages"][0]["content"]
+        if prompt in down:
+            raise RuntimeError("connection lost")
+        sent.append(prompt)
+        return prompt.upper()
+
+    def run(journal, todo):
+        requests = [{"messages": [{"role": "user", "content": prompts[i]}]} for i in todo]
+        return complete_all(requests, call, concurrency=1,
+                            on_answer=lambda i, answer: journal.append({"row": todo[i], "description": answer}))
+
+    journal = Journal(path)
+    with pytest.raises(RuntimeError):
+        run(journal, list(range(20)))
+    journal.close()
+
+    down.clear()
+    journal = Journal(path, resume=True)
+    done = {r["row"] for r in journal.load()}
+    assert done == {i for i, p in enumerate(prompts) if p in sent} and 12 not in done
+    sent.clear()
+    run(journal, [i for i in range(20) if i not in done])
+    journal.close()
+
+    assert sent == [p for i, p in enumerate(prompts) if i not in done]
+    assert {r["row"]: r["description"] for r in Journal(path, resume=True).load()} == {
+        i: p.upper() for i, p in enumerate(prompts)}
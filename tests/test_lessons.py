@@ -0,0 +1,61 @@
+import random
+
+import pandas as pd
+import pytest
+
+from lumiera.data.lessons import ChapterContext, extract_lesson_name, extract_relevant_context, lesson_names
+
+LINKS = [
+    "https://rebelway.academy/topic/04_functions-5/",
+    "https://rebelway.academy/topic/intro/",
+    "https://rebelway.academy/topic/12-vex_basics_2-13",
+    "http://example.com/a/b/03__for-loops__-7?x=1#frag",
+    "https://example.com/path;params/last;p",
+    "ftp://example.com/path/file;type=a",
+    "  \t https://example.com/sp\nace/10_new-line-2/",
+    "relative/path/99_x",
+    "mailto:someone@example.com",
+    "",
+    "/",
+    "https://example.com",
+]
+
+
+def random_url(rng: random.Random) -> str:
+    pieces = ["http://", "https://", "ftp://", "//", "/", "a", "B", "0", "12", "_", "-", ";", "?", "#",
+              "x.y", "topic", " ", "\t", "\n", ":", "%20", "é"]
+    return "".join(rng.choice(pieces) for _ in range(rng.randrange(0, 15)))
+
+
+def test_lesson_names_equal_extract_lesson_name():
+    rng = random.Random(0)
+    links = LINKS + [random_url(rng) for _ in range(3000)]
+    assert lesson_names(pd.Series(links)).tolist() == [extract_lesson_name(link) for link in links]
+    assert extract_lesson_name(LINKS[0]) == "Functions"
+
+
+def test_missing_links_stay_missing():
+    names = lesson_names(pd.Series([LINKS[0], None]))
+    assert names[0] == "Functions" and pd.isna(names[1])
+
+
+CHAPTER = ("Welcome to VEX! This chapter covers loops and functions. "
+           "Arrays come later? Attributes: point, prim and vertex. Loops again.")
+
+
+@pytest.mark.parametrize("lesson", [
+    "For Loops", "Functions", "Arrays 2", "Vertex Attributes", "Nothing Here", "", "Vex", "In", "!!!",
+])
+def test_chapter_context_equals_extract_relevant_context(lesson):
+    assert ChapterContext(CHAPTER).relevant(lesson) == extract_relevant_context(CHAPTER, lesson)
+
+
+def test_chapter_context_on_random_text():
+    rng = random.Random(1)
+    words = ["loop", "loops", "Vex", "array", "A", "in", "point", "for", "x1", "."]
+    for _ in range(500):
+        chapter = " ".join(rng.choice(words + [".", "!", "?"]) for _ in range(rng.randrange(0, 30)))
+        context = ChapterContext(chapter)
+        for _ in range(5):
+            lesson = " ".join(rng.choice(words) for _ in range(rng.randrange(0, 4)))
+            assert context.relevant(lesson) == extract_relevant_context(chapter, lesson)
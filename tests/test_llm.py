@@ -0,0 +1,64 @@
+import json
+import signal
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from lumiera.data.llm import RateLimiter, complete_all
+from tests.stub_chat_server import serve_in_thread, stub_answer
+
+
+def make_call(server):
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    def call(request: dict) -> str:
+        req = urllib.request.Request(
+            f"{base_url}/chat/completions",
+            data=json.dumps(request).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req) as resp:
+            return json.load(resp)["choices"][0]["message"]["content"]
+    return call
+
+
+def lesson(i: int) -> dict:
+    return {"model": "gpt-4o", "max_completion_tokens": 10,
+            "messages": [{"role": "user", "content": f"Lesson {i}"}]}
+
+
+def test_rate_limiter_paces_once_the_bucket_is_empty():
+    limiter = RateLimiter(rpm=600)
+    started = time.monotonic()
+    for _ in range(600):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.1
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started == pytest.approx(0.5, abs=0.1)
+
+
+def test_429s_are_retried_and_answers_stay_in_order():
+    server = serve_in_thread(latency=0, fail_rate=0.2, seed=1)
+    requests = [lesson(i) for i in range(10)]
+    try:
+        answers, stats = complete_all(requests, make_call(server), concurrency=8)
+    finally:
+        server.shutdown()
+    assert answers == [stub_answer(r["messages"]) for r in requests]
+    assert stats["retries"] == server.counts["429"] > 0
+
+
+def test_interrupt_drops_queued_requests():
+    server = serve_in_thread(latency=0.2)
+    main = threading.main_thread().ident
+    threading.Timer(0.5, signal.pthread_kill, (main, signal.SIGINT)).start()
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            complete_all([lesson(i) for i in range(40)], make_call(server), concurrency=2)
+        time.sleep(0.5)
+        assert server.counts["ok"] < 10
+    finally:
+        server.shutdown()
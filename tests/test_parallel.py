@@ -0,0 +1,55 @@
+import gzip
+import io
+import random
+
+import pytest
+
+from lumiera.backup.index import FileIndex, scan_sources
+from lumiera.backup.parallel import BlockWriter, gzip_member
+
+
+def sample(n: int) -> bytes:
+    rng = random.Random(n)
+    words = [b"lumiera", b"render", b"frame", b"\n", b" ", rng.randbytes(3)]
+    return b"".join(rng.choice(words) for _ in range(n))
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_blocks_are_standard_gzip_in_order(jobs):
+    data = sample(200_000)
+    out = io.BytesIO()
+    with BlockWriter(out, jobs=jobs, block_size=16 * 1024) as writer:
+        for i in range(0, len(data), 5000):
+            writer.write(data[i:i + 5000])
+    assert gzip.decompress(out.getvalue()) == data
+    assert (writer.bytes_in, writer.bytes_out) == (len(data), len(out.getvalue()))
+
+
+def test_parallel_output_matches_serial():
+    data = sample(300_000)
+    outputs = []
+    for jobs in (1, 8):
+        out = io.BytesIO()
+        with BlockWriter(out, jobs=jobs, block_size=10_000) as writer:
+            writer.write(data)
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    assert gzip_member(b"") and gzip.decompress(gzip_member(b"abc", 1)) == b"abc"
+
+
+def test_an_error_leaves_nothing_pending():
+    out = io.BytesIO()
+    with pytest.raises(RuntimeError):
+        with BlockWriter(out, jobs=4, block_size=1000) as writer:
+            writer.write(sample(50_000))
+            raise RuntimeError("stopped")
+    assert writer._executor is None
+
+
+def test_parallel_hashing_matches_serial(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(30):
+        (src / f"f{i}.bin").write_bytes(sample(1000 + i))
+    serial = scan_sources([src], FileIndex(), jobs=1)
+    assert scan_sources([src], FileIndex(), jobs=8) == serial
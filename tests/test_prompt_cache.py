@@ -0,0 +1,59 @@
+import time
+
+from lumiera.data.prompt_cache import PromptCache, request_key
+
+
+def request(prompt: str, **params) -> dict:
+    return {"model": "gpt-4o", "messages": [{"role": "user", "content": prompt}], **params}
+
+
+def entry_size(prompt: str, answer: str) -> int:
+    return len(request_key(request(prompt))) + len(answer)
+
+
+def test_key_covers_every_parameter():
+    assert request_key(request("a")) == request_key({"messages": request("a")["messages"], "model": "gpt-4o"})
+    assert request_key(request("a")) != request_key(request("a", temperature=0))
+
+
+def test_least_recently_used_answers_are_evicted(tmp_path):
+    cache = PromptCache(tmp_path / "prompts.sqlite3", max_bytes=3 * entry_size("p0", "x" * 100))
+    for i in range(3):
+        cache.put(request(f"p{i}"), "x" * 100)
+        time.sleep(0.01)
+    assert cache.get(request("p0")) == "x" * 100  # p0 is now the most recently used
+    cache.put(request("p3"), "x" * 100)
+
+    assert cache.get(request("p1")) is None
+    assert all(cache.get(request(p)) == "x" * 100 for p in ("p0", "p2", "p3"))
+    cache.close()
+
+
+def test_processes_sharing_the_file_stay_under_the_limit(tmp_path):
+    path = tmp_path / "prompts.sqlite3"
+    limit = 4 * entry_size("a0", "x" * 100)
+    first, second = PromptCache(path, max_bytes=limit), PromptCache(path, max_bytes=limit)
+    for i in range(6):
+        first.put(request(f"a{i}"), "x" * 100)
+        second.put(request(f"b{i}"), "x" * 100)
+        time.sleep(0.01)
+
+    total = first.db.execute("SELECT SUM(size) FROM answers").fetchone()[0]
+    assert total <= limit
+    assert second.get(request("b5")) == first.get(request("b5")) == "x" * 100
+    first.close()
+    second.close()
+
+
+def test_wrap_calls_through_once(tmp_path):
+    cache = PromptCache(tmp_path / "prompts.sqlite3")
+    calls = []
+
+    def call(req):
+        calls.append(req)
+        return "answer"
+
+    cached = cache.wrap(call)
+    assert cached(request("q")) == cached(request("q")) == "answer"
+    assert len(calls) == 1
+    cache.close()
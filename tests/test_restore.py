@@ -0,0 +1,92 @@
+import json
+import os
+
+import click
+import pytest
+
+from lumiera.backup.jobs import backup_job, restore_job
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    """A job backing up ~/notes (HOME is tmp_path); returns (config path, source dir)."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    src = tmp_path / "notes"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_text("alpha")
+    (src / "sub" / "b.txt").write_text("beta")
+
+    def configure(**options):
+        config = tmp_path / "config.json"
+        config.write_text(json.dumps({"bk_jobs": [{
+            "name": "notes", "source": [str(src)], "destination": str(tmp_path / "backups"), **options,
+        }]}))
+        return config
+    return configure, src
+
+
+@pytest.mark.parametrize("compression", ["gz", "zstd"])
+def test_full_restore(job, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    configure, src = job
+    config = configure(compression=compression)
+
+    backup_job(config, "notes")
+    (src / "a.txt").unlink()
+    (src / "sub" / "b.txt").write_text("changed")
+    restore_job(config, "notes")
+
+    assert (src / "a.txt").read_text() == "alpha"
+    assert (src / "sub" / "b.txt").read_text() == "beta"
+
+
+def test_selective_restore_and_listing(job, capsys):
+    configure, src = job
+    config = configure()
+    backup_job(config, "notes")
+    (src / "a.txt").unlink()
+    (src / "sub" / "b.txt").unlink()
+
+    restore_job(config, "notes", patterns=["notes/sub"])
+    assert (src / "sub" / "b.txt").read_text() == "beta"
+    assert not (src / "a.txt").exists()
+
+    capsys.readouterr()
+    restore_job(config, "notes", list_only=True)
+    listing = capsys.readouterr().out
+    assert "notes/a.txt" in listing and "notes/sub/b.txt" in listing
+
+
+def test_hardlink_restored_without_its_target(job):
+    configure, src = job
+    os.link(src / "a.txt", src / "link.txt")
+    config = configure()
+    backup_job(config, "notes")
+    (src / "a.txt").unlink()
+    (src / "link.txt").unlink()
+
+    restore_job(config, "notes", patterns=["notes/link.txt"])
+    assert (src / "link.txt").read_text() == "alpha"
+    assert not (src / "a.txt").exists()
+
+
+def test_symlink_restored_over_a_directory(job, capsys):
+    configure, src = job
+    (src / "ln").symlink_to("a.txt")
+    config = configure()
+    backup_job(config, "notes")
+
+    (src / "ln").unlink()
+    (src / "ln").mkdir()
+    restore_job(config, "notes", patterns=["notes/ln"])
+    assert os.readlink(src / "ln") == "a.txt"
+
+    # a directory with contents is not thrown away to make room for the link
+    (src / "ln").unlink()
+    (src / "ln").mkdir()
+    (src / "ln" / "keep.txt").write_text("mine")
+    with pytest.raises(click.Abort):
+        restore_job(config, "notes", patterns=["notes/ln"])
+    assert "Refusing to replace non-empty directory" in capsys.readouterr().out
+    assert (src / "ln" / "keep.txt").read_text() == "mine"
@@ -0,0 +1,156 @@
+import os
+import time
+
+from lumiera.backup.catalog import Catalog
+from lumiera.backup.chunks import ChunkStore, backup_chunked, manifest_name, restore_chunked, write_manifest
+from lumiera.backup.delta import write_meta
+from lumiera.backup.retention import GC_GRACE_SECONDS, collect_chunks, plan_prune, prune_job, select_keep
+
+
+def record(version: int, created: str, kind: str = "full", size: int = 100) -> dict:
+    return {"job": "docs", "version": version, "file": f"docs-{version}.tar.gz", "kind": kind,
+            "created": created, "bytes": size}
+
+
+def delta(dest, version: int, base: int, parent: int, files: dict[str, int]) -> None:
+    write_meta(dest, "docs", {"version": version, "kind": "delta", "base": base, "parent": parent,
+                              "files": {name: {"version": v} for name, v in files.items()}})
+
+
+def chain(dest) -> list[dict]:
+    """v1 full, v2/v3 deltas on it; v4 full, v5 delta on it."""
+    delta(dest, 2, 1, 1, {"a": 1, "b": 2})
+    delta(dest, 3, 1, 2, {"a": 3, "b": 2})
+    delta(dest, 5, 4, 4, {"a": 4, "b": 5})
+    return [
+        record(1, "2025-01-01T10:00:00+00:00"),
+        record(2, "2025-01-02T10:00:00+00:00", "delta"),
+        record(3, "2025-01-03T10:00:00+00:00", "delta"),
+        record(4, "2025-01-04T10:00:00+00:00"),
+        record(5, "2025-01-05T10:00:00+00:00", "delta"),
+    ]
+
+
+def test_select_keep_rules():
+    records = [
+        record(1, "2025-01-01T09:00:00+00:00"),
+        record(2, "2025-01-01T18:00:00+00:00"),
+        record(3, "2025-01-02T09:00:00+00:00"),
+        record(4, "2025-02-10T09:00:00+00:00"),
+    ]
+    assert select_keep(records, {}) == {1, 2, 3, 4}
+    assert select_keep(records, {"keep_last": 2}) == {3, 4}
+    assert select_keep(records, {"keep_daily": 3}) == {2, 3, 4}
+    assert select_keep(records, {"keep_monthly": 1}) == {4}
+    assert select_keep(records, {"keep_last": 1, "keep_monthly": 2}) == {3, 4}
+
+
+def test_kept_delta_keeps_the_archives_it_reads(tmp_path):
+    records = chain(tmp_path)
+    assert plan_prune(tmp_path, "docs", records, {"keep_last": 1}) == {4, 5}
+    # v3 reads "a" from itself and "b" from v2, which in turn needs nothing from v1's files
+    assert plan_prune(tmp_path, "docs", records[:3], {"keep_last": 1}) == {2, 3}
+
+
+def test_max_total_bytes_never_drops_the_newest(tmp_path):
+    records = chain(tmp_path)
+    assert plan_prune(tmp_path, "docs", records, {"max_total_bytes": 250}) == {4, 5}
+    # even a limit nothing fits under keeps the newest version and its chain
+    assert plan_prune(tmp_path, "docs", records, {"max_total_bytes": 1}) == {4, 5}
+
+
+def test_chunks_shared_across_jobs_survive_pruning(tmp_path):
+    catalog = Catalog(tmp_path)
+    store = ChunkStore(tmp_path / "chunks")
+    shared, old, new, other = (store.put(data)[0] for data in (b"shared", b"old", b"new", b"other"))
+    fresh = store.put(b"written by a backup still running")[0]
+    for digest in (shared, old, new, other):
+        past = time.time() - 2 * GC_GRACE_SECONDS
+        os.utime(store.path_for(digest), (past, past))
+
+    def add(job, version, chunks, created):
+        path = tmp_path / manifest_name(job, version)
+        write_manifest(path, {"entries": [{"path": "f", "chunks": chunks}]})
+        catalog.add({"job": job, "version": version, "file": path.name, "kind": "chunked",
+                     "created": created, "bytes": 10})
+
+    add("docs", 1, [shared, old], "2025-01-01T10:00:00+00:00")
+    add("docs", 2, [new], "2025-01-02T10:00:00+00:00")
+    add("photos", 1, [shared, other], "2025-01-01T10:00:00+00:00")
+
+    result = prune_job(tmp_path, "docs", {"keep_last": 1}, catalog=catalog)
+
+    assert result["removed"] == [1]
+    assert result["chunks_removed"] == 1
+    assert not store.path_for(old).exists()
+    for digest in (shared, new, other, fresh):
+        assert store.path_for(digest).exists()
+    assert not (tmp_path / manifest_name("docs", 1)).exists()
+    assert [r["version"] for r in catalog.versions("photos")] == [1]
+
+
+def backdate_chunks(dest) -> None:
+    past = time.time() - 2 * GC_GRACE_SECONDS
+    for chunk in (dest / "chunks").glob("*/*"):
+        os.utime(chunk, (past, past))
+
+
+def test_reused_chunks_are_not_swept_by_a_concurrent_prune(tmp_path):
+    src, dest = tmp_path / "src", tmp_path / "dest"
+    src.mkdir()
+    (src / "data.bin").write_bytes(os.urandom(600_000))
+    first, _ = backup_chunked([src], dest, "docs", 1)
+    backdate_chunks(dest)
+
+    # the second backup reuses every chunk unread; a prune that marks before its
+    # manifest is committed must still see the chunks as in use
+    backup_chunked([src], dest, "docs", 2, previous=first)
+    assert collect_chunks(dest, Catalog(tmp_path / "empty")) == (0, 0)
+
+
+def test_missing_chunks_are_stored_again(tmp_path):
+    src, dest = tmp_path / "src", tmp_path / "dest"
+    src.mkdir()
+    (src / "data.bin").write_bytes(os.urandom(600_000))
+    first, _ = backup_chunked([src], dest, "docs", 1)
+    for chunk in (dest / "chunks").glob("*/*"):
+        chunk.unlink()
+
+    second, stats = backup_chunked([src], dest, "docs", 2, previous=first)
+    assert stats["chunks_new"] > 0
+    restore_chunked(second, tmp_path / "out")
+    assert (tmp_path / "out" / "src" / "data.bin").read_bytes() == (src / "data.bin").read_bytes()
+
+
+def test_dry_run_reports_what_pruning_frees(tmp_path):
+    catalog = Catalog(tmp_path)
+    store = ChunkStore(tmp_path / "chunks")
+    shared = [store.put(os.urandom(50_000))[0] for _ in range(5)]
+    own = store.put(os.urandom(1_000))[0]
+    backdate_chunks(tmp_path)
+    for version, chunks in ((1, shared + [own]), (2, shared)):
+        path = tmp_path / manifest_name("docs", version)
+        write_manifest(path, {"entries": [{"path": "f", "chunks": chunks}]})
+        catalog.add({"job": "docs", "version": version, "file": path.name, "kind": "chunked",
+                     "created": f"2025-01-0{version}T10:00:00+00:00", "bytes": path.stat().st_size})
+
+    planned = prune_job(tmp_path, "docs", {"keep_last": 1}, dry_run=True, catalog=catalog)
+    done = prune_job(tmp_path, "docs", {"keep_last": 1}, catalog=catalog)
+    assert planned == done
+    assert done["chunks_removed"] == 1
+    assert done["freed"] < 5_000
+
+
+def test_max_total_bytes_counts_shared_chunks_once(tmp_path):
+    catalog = Catalog(tmp_path)
+    store = ChunkStore(tmp_path / "chunks")
+    shared = [store.put(os.urandom(50_000))[0] for _ in range(4)]
+    for version in (1, 2, 3):
+        path = tmp_path / manifest_name("docs", version)
+        write_manifest(path, {"entries": [{"path": "f", "chunks": shared}]})
+        catalog.add({"job": "docs", "version": version, "file": path.name, "kind": "chunked",
+                     "created": f"2025-01-0{version}T10:00:00+00:00", "bytes": path.stat().st_size})
+    # all three versions share the same ~200 kB of chunks, so they fit together in 250 kB
+    records = catalog.versions("docs")
+    assert plan_prune(tmp_path, "docs", records, {"max_total_bytes": 250_000}) == {1, 2, 3}
+    assert plan_prune(tmp_path, "docs", records, {"max_total_bytes": 150_000}) == {3}
@@ -0,0 +1,28 @@
+import json
+
+from lumiera.backup.scheduler import group_by_device, run_jobs, summary_table
+
+
+def test_bad_jobs_fail_alone(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    src = tmp_path / "notes"
+    src.mkdir()
+    (src / "a.txt").write_text("alpha")
+    (tmp_path / "blocker").write_text("a file, not a directory")
+    config_path = tmp_path / "config.json"
+    config = {"bk_jobs": [
+        {"name": "good", "source": [str(src)], "destination": str(tmp_path / "backups")},
+        {"name": "unset", "source": [str(src)]},
+        {"name": "blocked", "source": [str(src)], "destination": str(tmp_path / "blocker" / "backups")},
+    ]}
+    config_path.write_text(json.dumps(config))
+
+    groups, errors = group_by_device(config, ["good", "unset", "blocked", "missing"])
+    assert groups == [["good"]]
+    assert set(errors) == {"unset", "blocked", "missing"}
+
+    results = run_jobs(config_path, ["good", "unset", "blocked"])
+    assert [(r["job"], r["status"]) for r in results] == [
+        ("good", "backup"), ("unset", "failed"), ("blocked", "failed")]
+    assert "blocked" in summary_table(results)
+    assert (tmp_path / "backups").is_dir()
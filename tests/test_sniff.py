@@ -0,0 +1,33 @@
+import os
+import random
+
+import pytest
+
+from lumiera.export.project import render_code_file
+from lumiera.export.sniff import MAX_FILE_BYTES, SNIFF_BYTES, classify
+
+SOURCE = b"def f(x):\n    return x + 1\n\n" * 100
+
+
+@pytest.mark.parametrize("head, size, ext, reason", [
+    (SOURCE, len(SOURCE), ".py", None),
+    (b"", 0, ".py", None),
+    (b"abc\0def", 7, ".txt", "binary"),
+    (bytes(range(1, 32)) * 50, 1550, ".cfg", "binary"),
+    (random.Random(0).randbytes(SNIFF_BYTES).replace(b"\0", b"x"), 10_000, ".json", "binary"),
+    (SOURCE, MAX_FILE_BYTES + 1, ".py", "too large"),
+    (b"var a=1;" * 1000, 8000, ".json", "minified"),
+    (b"Prose. " * 1000, 7000, ".md", None),
+    (b"# Code generated by protoc. DO NOT EDIT.\n" + SOURCE, 5000, ".py", "generated"),
+    (b"# @generated\nx = 1\n", 20, ".py", None),
+    (SOURCE + b"\n# do not edit\n", len(SOURCE) + 15, ".py", None),
+])
+def test_classify(head, size, ext, reason):
+    assert classify(head, size, ext) == reason
+
+
+def test_skipped_files_export_as_a_placeholder(tmp_path):
+    path = tmp_path / "blob.json"
+    path.write_bytes(os.urandom(20_000))
+    assert render_code_file(str(path), path.relative_to(tmp_path)) == [
+        "path: blob.json [skipped: binary, 20,000 bytes]"]
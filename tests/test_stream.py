@@ -0,0 +1,42 @@
+import io
+import random
+
+import pytest
+
+from lumiera.export import stream
+from lumiera.export.project import render_code_file
+from lumiera.export.stream import STREAM_BYTES, StreamedContent
+
+
+def in_memory(data: bytes) -> str:
+    """What the non-streaming path renders for data."""
+    return data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def test_files_under_the_default_limit_stream(tmp_path):
+    path = tmp_path / "big.py"
+    data = b"\r\n  \n" + b"x = '\xc3\xa9\xe2\x82\xac'\r\n" * (STREAM_BYTES // 10) + b"\n\t \r\n"
+    assert STREAM_BYTES < len(data) < 1024 * 1024
+    path.write_bytes(data)
+
+    block = render_code_file(str(path), path.relative_to(tmp_path))
+    assert isinstance(block[1], StreamedContent)
+    out = io.StringIO()
+    block[1].write(out)
+    assert out.getvalue() == f"```python\n{in_memory(data)}\n```" == block[1].text()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_streaming_matches_the_in_memory_render(tmp_path, monkeypatch, seed):
+    # small chunks and windows, so \r\n pairs and multibyte characters land on their edges
+    monkeypatch.setattr(stream, "CHUNK_BYTES", 7)
+    monkeypatch.setattr(stream, "WINDOW_BYTES", 5)
+    rng = random.Random(seed)
+    pieces = [b" ", b"\t", b"\r", b"\n", b"\r\n", b"a", b"\xc3\xa9", b"\xe2\x82\xac", b"\xff", b"\xe2\x82"]
+    data = b"".join(rng.choice(pieces) for _ in range(rng.randrange(0, 80)))
+    path = tmp_path / "f.txt"
+    path.write_bytes(data)
+
+    out = io.StringIO()
+    StreamedContent(str(path), "```").write(out)
+    assert out.getvalue() == f"```\n{in_memory(data)}\n```"
@@ -0,0 +1,70 @@
+import json
+import random
+
+import pytest
+
+from lumiera.backup.catalog import Catalog
+from lumiera.backup.jobs import backup_job, verify_job
+from lumiera.backup.verify import verify_versions
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    """A ~/notes tree of incompressible files; returns configure(**job options) -> (config, dest)."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    src = tmp_path / "notes"
+    src.mkdir()
+    rng = random.Random(0)
+    for i in range(8):
+        (src / f"f{i}.bin").write_bytes(rng.randbytes(300_000))
+
+    def configure(**options):
+        config = tmp_path / "config.json"
+        dest = tmp_path / "backups"
+        config.write_text(json.dumps({"bk_jobs": [
+            {"name": "notes", "source": [str(src)], "destination": str(dest), **options}]}))
+        return config, dest
+    return configure, src
+
+
+def test_damage_is_pinned_to_the_members_it_hits(setup, capsys):
+    configure, _ = setup
+    config, dest = configure()
+    backup_job(config, "notes", jobs=4)
+    assert verify_job(config, "notes", jobs=4)
+
+    record = Catalog(dest).latest("notes")
+    archive = dest / record["file"]
+    data = bytearray(archive.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    archive.write_bytes(data)
+
+    assert not verify_job(config, "notes", jobs=4)
+    [report] = verify_versions(dest, [record], jobs=4)
+    assert report["checksums"] and report["checked"] == 8
+    assert 1 <= len(report["damaged"]) < 8
+    assert "damaged" in capsys.readouterr().out
+
+
+def test_a_delta_without_files_is_still_checksummed(setup):
+    configure, src = setup
+    config, dest = configure(full_every=5)
+    backup_job(config, "notes")
+    (src / "f0.bin").unlink()
+    backup_job(config, "notes")
+
+    record = Catalog(dest).latest("notes")
+    assert record["kind"] == "delta"
+    [report] = verify_versions(dest, [record])
+    assert report == {"version": 2, "file": record["file"], "checked": 0, "damaged": [], "checksums": True}
+    assert verify_job(config, "notes", all_versions=True)
+
+
+def test_missing_chunks_are_reported(setup):
+    configure, _ = setup
+    config, dest = configure(mode="chunked")
+    backup_job(config, "notes")
+    next((dest / "chunks").glob("*/*")).unlink()
+
+    [report] = verify_versions(dest, Catalog(dest).versions("notes"))
+    assert [reason for _, reason in report["damaged"]] == ["missing chunk"]